@@ -0,0 +1,807 @@
+import argparse
+import filecmp
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from itertools import groupby
+from converters import (
+    BlockMemo,
+    BlockType,
+    extract_title,
+    markdown_to_blocks,
+    markdown_to_html,
+    parse_block,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    strip_md_block,
+    text_to_textnodes,
+)
+from file_utils import copy_files, generate_page, generate_pages_recursive
+from htmlnode import LeafNode, ParentNode
+from manifest import GENERATOR_VERSION
+from scanner import DEFAULT_SCAN_THREADS, scan_tree
+from templates import load_template
+from textnode import TextNode, TextType
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SAMPLE_PAGE = os.path.join(PROJECT_ROOT, "content", "majesty", "index.md")
+TEMPLATE_PATH = os.path.join(PROJECT_ROOT, "template.html")
+
+
+def make_corpus(dest_dir, pages, sample_path=SAMPLE_PAGE):
+    # Fill dest_dir with copies of a sample page spread over a few directories
+    for i in range(pages):
+        page_dir = os.path.join(dest_dir, f"section{i % 10}")
+        os.makedirs(page_dir, exist_ok=True)
+        shutil.copyfile(sample_path, os.path.join(page_dir, f"page{i}.md"))
+
+
+def _same_tree(left, right):
+    comparison = filecmp.dircmp(left, right)
+    if comparison.left_only or comparison.right_only or comparison.funny_files:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(
+        left, right, comparison.common_files, shallow=False
+    )
+    if mismatch or errors:
+        return False
+    return all(
+        _same_tree(os.path.join(left, d), os.path.join(right, d))
+        for d in comparison.common_dirs
+    )
+
+
+def bench_parallel_build(pages=500, workers=None, template_path=TEMPLATE_PATH):
+    """Time a serial and a parallel build of the same corpus and compare them."""
+    workers = workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        make_corpus(content, pages)
+
+        start = time.perf_counter()
+        generate_pages_recursive(content, template_path, os.path.join(tmp, "serial"))
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        generate_pages_recursive(
+            content, template_path, os.path.join(tmp, "parallel"), workers=workers
+        )
+        parallel = time.perf_counter() - start
+
+        identical = _same_tree(
+            os.path.join(tmp, "serial"), os.path.join(tmp, "parallel")
+        )
+
+    print(f"pages:     {pages}")
+    print(f"serial:    {serial:.3f}s")
+    print(f"parallel:  {parallel:.3f}s ({workers} workers)")
+    print(f"speedup:   {serial / parallel:.2f}x")
+    print(f"identical: {identical}")
+    return {
+        "pages": pages,
+        "workers": workers,
+        "serial_s": serial,
+        "parallel_s": parallel,
+        "speedup": serial / parallel,
+        "identical": identical,
+    }
+
+
+def make_paragraph_document(paragraphs=2000, seed=0):
+    # Long paragraphs dense with bold, italic, code, links and images
+    rng = random.Random(seed)
+    pieces = [
+        "plain words go here",
+        "**bold text**",
+        "*italic text*",
+        "`inline code`",
+        "[a link](https://example.com/page)",
+        "![an image](/images/picture.png)",
+    ]
+    return "\n\n".join(
+        " ".join(rng.choice(pieces) for _ in range(40)) for _ in range(paragraphs)
+    )
+
+
+def _chained_text_to_textnodes(text):
+    nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def _best_of(func, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_inline_tokenizer(paragraphs=2000, repeat=5):
+    """Compare the single-pass tokenizer with the chained split_nodes_* passes."""
+    paragraph_list = make_paragraph_document(paragraphs).split("\n\n")
+
+    def run(tokenize):
+        return lambda texts: [tokenize(text) for text in texts]
+
+    if run(_chained_text_to_textnodes)(paragraph_list) != run(text_to_textnodes)(
+        paragraph_list
+    ):
+        raise ValueError("Tokenizer output differs from the chained pipeline")
+    chained = _best_of(run(_chained_text_to_textnodes), paragraph_list, repeat)
+    single = _best_of(run(text_to_textnodes), paragraph_list, repeat)
+
+    print(f"paragraphs:  {paragraphs}")
+    print(f"chained:     {chained:.3f}s")
+    print(f"single-pass: {single:.3f}s")
+    print(f"speedup:     {chained / single:.2f}x")
+    return {
+        "paragraphs": paragraphs,
+        "chained_s": chained,
+        "single_pass_s": single,
+        "speedup": chained / single,
+    }
+
+
+def _measure(func):
+    # Wall time without tracing, then peak traced memory from a second run
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_streaming_serializer(paragraphs=6000):
+    """Compare to_html() + write with write_html() on a multi-megabyte page."""
+    html_node = markdown_to_html(make_paragraph_document(paragraphs))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.html")
+
+        def joined():
+            with open(path, "w") as file:
+                file.write(html_node.to_html())
+
+        def streamed():
+            with open(path, "w") as file:
+                html_node.write_html(file)
+
+        joined_s, joined_peak = _measure(joined)
+        streamed_s, streamed_peak = _measure(streamed)
+        size = os.path.getsize(path)
+
+    print(f"page size: {size / 2**20:.1f} MiB")
+    print(f"to_html:   {joined_s:.3f}s, peak {joined_peak / 2**20:.1f} MiB")
+    print(f"streamed:  {streamed_s:.3f}s, peak {streamed_peak / 2**20:.1f} MiB")
+    return {
+        "bytes": size,
+        "to_html_s": joined_s,
+        "to_html_peak_bytes": joined_peak,
+        "streamed_s": streamed_s,
+        "streamed_peak_bytes": streamed_peak,
+    }
+
+
+def bench_large_page(paragraphs=20000):
+    """Compare peak memory of a whole-file and a streamed render of one page."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "content", "reference.md")
+        os.makedirs(os.path.dirname(source))
+        with open(source, "w") as file:
+            file.write("# API reference\n\n" + make_paragraph_document(paragraphs))
+
+        def render(dest, stream_threshold):
+            return lambda: generate_page(
+                source,
+                TEMPLATE_PATH,
+                os.path.join(tmp, dest),
+                os.path.dirname(source),
+                stream_threshold=stream_threshold,
+            )
+
+        whole_s, whole_peak = _measure(render("whole", None))
+        streamed_s, streamed_peak = _measure(render("streamed", 0))
+        if not filecmp.cmp(
+            os.path.join(tmp, "whole", "reference.html"),
+            os.path.join(tmp, "streamed", "reference.html"),
+            shallow=False,
+        ):
+            raise ValueError("Streamed page differs from the whole-file render")
+        size = os.path.getsize(source)
+
+    print(f"source size: {size / 2**20:.1f} MiB")
+    print(f"whole file:  {whole_s:.3f}s, peak {whole_peak / 2**20:.1f} MiB")
+    print(f"streamed:    {streamed_s:.3f}s, peak {streamed_peak / 2**20:.1f} MiB")
+    return {
+        "bytes": size,
+        "whole_s": whole_s,
+        "whole_peak_bytes": whole_peak,
+        "streamed_s": streamed_s,
+        "streamed_peak_bytes": streamed_peak,
+    }
+
+
+class _DictNode:
+    # Layout of the nodes before __slots__: an instance __dict__ plus an
+    # empty children list and props dict allocated for every node
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children if children is not None else []
+        self.props = props if props is not None else {}
+
+
+class _DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def _retained(build):
+    # Bytes still allocated once build() returns, with its result alive
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def _copy_tree(node, make_leaf, make_parent):
+    if isinstance(node, ParentNode):
+        children = [
+            _copy_tree(child, make_leaf, make_parent) for child in node.children
+        ]
+        return make_parent(node.tag, children, node.props or None)
+    return make_leaf(node.tag, node.value, node.props or None)
+
+
+def bench_node_memory(nodes=100000, paragraphs=2000):
+    """Per-node and whole-page memory of the slotted nodes vs the old layout."""
+    values = [str(i) for i in range(nodes)]
+    per_node = {
+        "LeafNode": _retained(lambda: [LeafNode("b", value) for value in values]),
+        "dict LeafNode": _retained(lambda: [_DictNode("b", value) for value in values]),
+        "TextNode": _retained(
+            lambda: [TextNode(value, TextType.TEXT) for value in values]
+        ),
+        "dict TextNode": _retained(
+            lambda: [_DictTextNode(value, "text") for value in values]
+        ),
+    }
+    list_size = _retained(lambda: [None for value in values])
+    per_node = {name: (size - list_size) / nodes for name, size in per_node.items()}
+
+    page = markdown_to_html(make_paragraph_document(paragraphs))
+    slotted = _retained(lambda: _copy_tree(page, LeafNode, ParentNode))
+    legacy = _retained(
+        lambda: _copy_tree(
+            page,
+            lambda tag, value, props: _DictNode(tag, value, None, props),
+            lambda tag, children, props: _DictNode(tag, None, children, props),
+        )
+    )
+
+    for name, size in per_node.items():
+        print(f"{name + ':':15} {size:.0f} bytes per node")
+    print(f"page (slots):   {slotted / 2**20:.1f} MiB")
+    print(f"page (dict):    {legacy / 2**20:.1f} MiB")
+    return {
+        "per_node_bytes": per_node,
+        "page_slots_bytes": slotted,
+        "page_dict_bytes": legacy,
+    }
+
+
+def _legacy_to_html(node):
+    # The recursive to_html with an f-string per node that render_html replaced
+    props = ""
+    if node.props:
+        props = " " + node.props_to_html()
+    if isinstance(node, LeafNode):
+        if not node.tag:
+            return node.value
+        return f"<{node.tag}{props}>{node.value}</{node.tag}>"
+    children_html = "".join(_legacy_to_html(child) for child in node.children)
+    return f"<{node.tag}{props}>{children_html}</{node.tag}>"
+
+
+def make_deep_tree(depth):
+    node = LeafNode("a", "bottom", {"href": "/deep"})
+    for level in range(depth):
+        node = ParentNode("div", [node, LeafNode(None, str(level))], {"class": "x"})
+    return node
+
+
+def bench_renderer(paragraphs=2000, depth=200, repeat=5):
+    """Compare the iterative render_html with the recursive to_html it replaced."""
+    wide = markdown_to_html(make_paragraph_document(paragraphs))
+    nav = [LeafNode("a", f"Page {i % 20}", {"href": f"/p{i % 20}"}) for i in range(50)]
+    wide.children.extend(ParentNode("nav", nav) for _ in range(paragraphs // 10))
+    results = {}
+    for name, tree in (("wide", wide), ("deep", make_deep_tree(depth))):
+        if tree.to_html() != _legacy_to_html(tree):
+            raise ValueError(f"render_html output differs on the {name} tree")
+        legacy = _best_of(_legacy_to_html, tree, repeat)
+        iterative = _best_of(ParentNode.to_html, tree, repeat)
+        print(
+            f"{name + ':':6} recursive {legacy * 1000:.2f} ms,"
+            f" iterative {iterative * 1000:.2f} ms, {legacy / iterative:.2f}x"
+        )
+        results[name] = {
+            "recursive_s": legacy,
+            "iterative_s": iterative,
+            "speedup": legacy / iterative,
+        }
+    # Far deeper than the recursive renderer could go
+    make_deep_tree(100000).to_html()
+    return results
+
+
+def _recursive_parse_block(md_block):
+    # Nested quotes and lists parsed by stripping one level, re-joining and
+    # re-splitting the rest at every level, as parse_block used to attempt
+    lines = md_block.strip().splitlines()
+    if lines and all(line.startswith(">") for line in lines):
+        inner = "\n".join(line[2:] if line[1:2] == " " else line[1:] for line in lines)
+        children = []
+        for block in markdown_to_blocks(inner):
+            # Runs of quoted and unquoted lines are separate blocks
+            for _, run in groupby(block.splitlines(), lambda l: l.startswith(">")):
+                children.append(_recursive_parse_block("\n".join(run)))
+        if len(children) == 1 and children[0].tag == "p":
+            return ParentNode("blockquote", children[0].children)
+        return ParentNode("blockquote", children)
+    if lines and lines[0].startswith("- "):
+        items = []
+        for line in lines:
+            if line.startswith("- "):
+                items.append([line[2:], []])
+            else:
+                items[-1][1].append(line[2:])
+        return ParentNode(
+            "ul",
+            [
+                ParentNode(
+                    "li",
+                    [LeafNode(None, text)]
+                    + ([_recursive_parse_block("\n".join(rest))] if rest else []),
+                )
+                for text, rest in items
+            ],
+        )
+    return parse_block(md_block)
+
+
+def make_nested_document(depth):
+    quote = "\n".join(">" * level + f" quoted {level}" for level in range(1, depth))
+    items = "\n".join("  " * level + f"- item {level}" for level in range(depth))
+    return quote, items
+
+
+def bench_nested_blocks(depths=(50, 100, 200, 400), repeat=3):
+    """Time the one-pass quote and list parser against recursive re-splitting."""
+    results = []
+    for depth in depths:
+        blocks = make_nested_document(depth)
+        for block in blocks:
+            if parse_block(block).to_html() != _recursive_parse_block(block).to_html():
+                raise ValueError(f"Nested parsers differ at depth {depth}")
+
+        def parse_all(parse):
+            return lambda blocks: [parse(block) for block in blocks]
+
+        recursive = _best_of(parse_all(_recursive_parse_block), blocks, repeat)
+        one_pass = _best_of(parse_all(parse_block), blocks, repeat)
+        print(
+            f"depth {depth:4}: recursive {recursive * 1000:7.2f} ms,"
+            f" one pass {one_pass * 1000:6.2f} ms, {recursive / one_pass:.1f}x"
+        )
+        results.append(
+            {"depth": depth, "recursive_s": recursive, "one_pass_s": one_pass}
+        )
+    return results
+
+
+def _legacy_block_to_block_type(md_block):
+    md_block = md_block.strip()
+    if re.match(r"^#{1,6}\s", md_block):
+        return BlockType.HEADING
+    if re.match(r"^```", md_block) and md_block.endswith("```"):
+        return BlockType.CODE
+    if all(line.startswith("> ") for line in md_block.splitlines()):
+        return BlockType.QUOTE
+    if all(re.match(r"^[-*+]\s", line) for line in md_block.splitlines()):
+        return BlockType.UNORDERED_LIST
+    if all(re.match(r"^\d+\.\s", line) for line in md_block.splitlines()):
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def _legacy_strip_md_block(md_block):
+    # strip_md_block as it was before classify_block replaced it
+    md_type = _legacy_block_to_block_type(md_block)
+    text = md_block.strip()
+    if md_type == BlockType.HEADING:
+        text = re.sub(r"^#{1,6}\s+", "", text)
+    elif md_type == BlockType.CODE:
+        text = re.sub(r"^```|```$", "", text).strip()
+    elif md_type == BlockType.QUOTE:
+        text = "\n".join(
+            line[2:] for line in text.splitlines() if line.startswith("> ")
+        )
+    elif md_type == BlockType.UNORDERED_LIST:
+        text = "\n".join(re.sub(r"^[-*+]\s+", "", line) for line in text.splitlines())
+    elif md_type == BlockType.ORDERED_LIST:
+        text = "\n".join(re.sub(r"^\d+\.\s+", "", line) for line in text.splitlines())
+    return text, md_type
+
+
+def make_mixed_blocks(blocks=20000, seed=0):
+    rng = random.Random(seed)
+    makers = [
+        lambda: "#" * rng.randint(1, 6) + " A heading with some words",
+        lambda: "```\n" + "\n".join(["code = line * 2"] * rng.randint(1, 20)) + "\n```",
+        lambda: "\n".join(["> quoted text line"] * rng.randint(1, 8)),
+        lambda: "\n".join(["- list item text"] * rng.randint(1, 12)),
+        lambda: "\n".join(f"{i}. ordered item" for i in range(rng.randint(1, 12))),
+        lambda: "\n".join(["A plain paragraph line of text."] * rng.randint(1, 6)),
+        lambda: "- list that turns\ninto a paragraph",
+    ]
+    return [rng.choice(makers)() for _ in range(blocks)]
+
+
+def bench_block_classifier(blocks=20000, repeat=5):
+    """Compare classify_block with the regex-per-line strip_md_block it replaced."""
+    corpus = make_mixed_blocks(blocks)
+
+    def run(strip):
+        return lambda items: [strip(block) for block in items]
+
+    if run(_legacy_strip_md_block)(corpus) != run(strip_md_block)(corpus):
+        raise ValueError("Block classifier output differs from the legacy one")
+    legacy = _best_of(run(_legacy_strip_md_block), corpus, repeat)
+    single = _best_of(run(strip_md_block), corpus, repeat)
+
+    print(f"blocks:      {blocks}")
+    print(f"legacy:      {legacy:.3f}s")
+    print(f"single-scan: {single:.3f}s")
+    print(f"speedup:     {legacy / single:.2f}x")
+    return {
+        "blocks": blocks,
+        "legacy_s": legacy,
+        "single_scan_s": single,
+        "speedup": legacy / single,
+    }
+
+
+# Synthetic corpus shapes: number of pages, blocks per page and the share of
+# words in a paragraph that carry inline markup
+CORPUS_SHAPES = {
+    "many-small": {"pages": 2000, "blocks": 8, "inline": 0.1},
+    "few-huge": {"pages": 4, "blocks": 20000, "inline": 0.1},
+    "inline-heavy": {"pages": 200, "blocks": 60, "inline": 0.8},
+}
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog static site generator markdown "
+    "block inline parser node tree template page content build render"
+).split()
+
+
+def _make_paragraph(rng, inline):
+    words = []
+    for _ in range(rng.randint(20, 60)):
+        word = rng.choice(WORDS)
+        if rng.random() < inline:
+            word = rng.choice(
+                [
+                    f"**{word}**",
+                    f"*{word}*",
+                    f"`{word}`",
+                    f"[{word}](/{word}/)",
+                    f"![{word}](/images/{word}.png)",
+                ]
+            )
+        words.append(word)
+    return " ".join(words)
+
+
+def make_page_markdown(title, blocks, inline, rng):
+    """Build a page of mixed blocks that the converters can parse."""
+    parts = [f"# {title}"]
+    for _ in range(blocks - 1):
+        kind = rng.random()
+        if kind < 0.55:
+            parts.append(_make_paragraph(rng, inline))
+        elif kind < 0.65:
+            parts.append("## " + " ".join(rng.sample(WORDS, 4)))
+        elif kind < 0.75:
+            items = [" ".join(rng.sample(WORDS, 5)) for _ in range(rng.randint(2, 8))]
+            parts.append("\n".join("- " + item for item in items))
+        elif kind < 0.82:
+            items = range(1, rng.randint(3, 9))
+            parts.append("\n".join(f"{i}. " + rng.choice(WORDS) for i in items))
+        elif kind < 0.9:
+            lines = range(rng.randint(1, 4))
+            parts.append("\n".join("> " + _make_paragraph(rng, inline) for _ in lines))
+        else:
+            lines = range(rng.randint(2, 15))
+            code = "\n".join(f"value_{i} = render(node, {i})" for i in lines)
+            parts.append(f"```\n{code}\n```")
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(dest_dir, shape="many-small", seed=0, **overrides):
+    """Write a synthetic content/ tree of the given shape into dest_dir.
+
+    overrides replace the shape's pages, blocks or inline settings. Returns
+    the settings that were used.
+    """
+    settings = dict(CORPUS_SHAPES[shape], **overrides)
+    rng = random.Random(seed)
+    for i in range(settings["pages"]):
+        page_dir = os.path.join(dest_dir, f"section{i % 20}")
+        os.makedirs(page_dir, exist_ok=True)
+        markdown = make_page_markdown(
+            f"Page {i}", settings["blocks"], settings["inline"], rng
+        )
+        with open(os.path.join(page_dir, f"page{i}.md"), "w") as file:
+            file.write(markdown)
+    return settings
+
+
+def generate_static(dest_dir, files=100, size=64 * 1024, seed=0):
+    rng = random.Random(seed)
+    for i in range(files):
+        asset_dir = os.path.join(dest_dir, f"assets{i % 5}")
+        os.makedirs(asset_dir, exist_ok=True)
+        with open(os.path.join(asset_dir, f"asset{i}.bin"), "wb") as file:
+            file.write(rng.randbytes(size))
+
+
+def time_stages(content_dir, template_path, static_dir, work_dir):
+    """Time each stage of the page pipeline separately over a content tree.
+
+    parse_block includes block classification and text_to_textnodes, which
+    is also timed on its own over the same blocks.
+    """
+    stages = dict.fromkeys(
+        [
+            "read",
+            "extract_title",
+            "markdown_to_blocks",
+            "text_to_textnodes",
+            "parse_block",
+            "to_html",
+            "template_fill",
+            "write",
+            "copy_files",
+        ],
+        0.0,
+    )
+    template = load_template(template_path)
+    clock = time.perf_counter
+    pages = 0
+    bytes_written = 0
+    for root, dirs, files in os.walk(content_dir):
+        for file_name in files:
+            if not file_name.endswith(".md"):
+                continue
+            pages += 1
+            path = os.path.join(root, file_name)
+
+            start = clock()
+            with open(path, "r") as file:
+                content = file.read()
+            stages["read"] += clock() - start
+
+            start = clock()
+            title = extract_title(content)
+            stages["extract_title"] += clock() - start
+
+            start = clock()
+            blocks = markdown_to_blocks(content)
+            stages["markdown_to_blocks"] += clock() - start
+
+            stripped = [strip_md_block(block)[0] for block in blocks]
+            start = clock()
+            for text in stripped:
+                text_to_textnodes(text)
+            stages["text_to_textnodes"] += clock() - start
+
+            start = clock()
+            html_node = ParentNode("div", [parse_block(block) for block in blocks])
+            stages["parse_block"] += clock() - start
+
+            start = clock()
+            html = html_node.to_html()
+            stages["to_html"] += clock() - start
+
+            start = clock()
+            page = template.render({"Title": title, "Content": html})
+            stages["template_fill"] += clock() - start
+
+            start = clock()
+            out_path = os.path.join(work_dir, f"page{pages}.html")
+            with open(out_path, "w") as file:
+                file.write(page)
+            stages["write"] += clock() - start
+            bytes_written += len(page)
+
+    start = clock()
+    copy_files(static_dir, os.path.join(work_dir, "static"), clean_dest=True)
+    stages["copy_files"] += clock() - start
+    return {"pages": pages, "bytes_written": bytes_written, "stages": stages}
+
+
+def bench_suite(shape="many-small", json_path=None, seed=0, **overrides):
+    """Generate a corpus, time every stage plus a full build and report as JSON."""
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        static = os.path.join(tmp, "static")
+        work = os.path.join(tmp, "work")
+        os.makedirs(work)
+        settings = generate_corpus(content, shape, seed, **overrides)
+        generate_static(static, seed=seed)
+        result = time_stages(content, TEMPLATE_PATH, static, work)
+
+        start = time.perf_counter()
+        generate_pages_recursive(content, TEMPLATE_PATH, os.path.join(tmp, "public"))
+        result["full_build_s"] = time.perf_counter() - start
+
+    result = {
+        "generator_version": GENERATOR_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "shape": shape,
+        "settings": settings,
+        "seed": seed,
+        **result,
+    }
+    for stage, seconds in result["stages"].items():
+        print(f"{stage + ':':20} {seconds:8.3f}s")
+    print(f"{'full build:':20} {result['full_build_s']:8.3f}s")
+    if json_path:
+        with open(json_path, "w") as file:
+            json.dump(result, file, indent=2)
+    return result
+
+
+def bench_block_memo(pages=300, duplicate_percent=60, repeat=3):
+    """Parse pages sharing a pool of repeated blocks with and without BlockMemo."""
+    rng = random.Random(0)
+    shared = make_page_markdown("Shared", 40, 0.3, rng).split("\n\n")[1:]
+    documents = []
+    for i in range(pages):
+        unique = make_page_markdown(f"Page {i}", 40, 0.3, rng).split("\n\n")
+        blocks = [unique[0]] + [
+            rng.choice(shared) if rng.random() * 100 < duplicate_percent else block
+            for block in unique[1:]
+        ]
+        documents.append("\n\n".join(blocks))
+
+    def run(memo_factory):
+        def parse(docs):
+            memo = memo_factory()
+            return [markdown_to_html(doc, memo).to_html() for doc in docs]
+
+        return parse
+
+    if run(lambda: None)(documents) != run(BlockMemo)(documents):
+        raise ValueError("Memoized output differs from the unmemoized output")
+    plain = _best_of(run(lambda: None), documents, repeat)
+    memoized = _best_of(run(BlockMemo), documents, repeat)
+    memo = BlockMemo()
+    run(lambda: memo)(documents)
+
+    print(f"pages:      {pages} ({duplicate_percent}% shared blocks)")
+    print(f"plain:      {plain:.3f}s")
+    print(f"memoized:   {memoized:.3f}s")
+    print(f"speedup:    {plain / memoized:.2f}x")
+    print(f"memo stats: {memo.stats()}")
+    return {
+        "pages": pages,
+        "duplicate_percent": duplicate_percent,
+        "plain_s": plain,
+        "memoized_s": memoized,
+        "speedup": plain / memoized,
+        "memo": memo.stats(),
+    }
+
+
+def _walk_tree(root):
+    # The os.walk scan that scan_tree replaced
+    found = []
+    for dirpath, dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            found.append((os.path.relpath(path, root), os.stat(path)))
+    return found
+
+
+def bench_tree_scan(files=20000, fanout=20, repeat=3):
+    """Compare os.walk + relpath + stat with scan_tree, serial and threaded."""
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(files):
+            directory = os.path.join(
+                tmp, f"d{i % fanout}", f"d{i // fanout % fanout}"
+            )
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"page{i}.md"), "w") as file:
+                file.write("x")
+        walked = sorted(rel_path for rel_path, _ in _walk_tree(tmp))
+        if [entry.rel_path for entry in scan_tree(tmp)] != walked:
+            raise ValueError("scan_tree found different files than os.walk")
+        walk = _best_of(_walk_tree, tmp, repeat)
+        serial = _best_of(partial(scan_tree, threads=1), tmp, repeat)
+        threaded = _best_of(scan_tree, tmp, repeat)
+
+    print(f"files:      {files} in {fanout * fanout} directories")
+    print(f"os.walk:    {walk:.3f}s")
+    print(f"scan_tree:  {serial:.3f}s serial")
+    print(f"            {threaded:.3f}s with {DEFAULT_SCAN_THREADS} threads")
+    return {
+        "files": files,
+        "walk_s": walk,
+        "scan_serial_s": serial,
+        "scan_threaded_s": threaded,
+    }
+
+
+BENCHMARKS = {
+    "parallel": bench_parallel_build,
+    "inline": bench_inline_tokenizer,
+    "streaming": bench_streaming_serializer,
+    "memory": bench_node_memory,
+    "blocks": bench_block_classifier,
+    "memo": bench_block_memo,
+    "large-page": bench_large_page,
+    "scan": bench_tree_scan,
+    "render": bench_renderer,
+    "nested": bench_nested_blocks,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the site generator")
+    parser.add_argument("benchmark", choices=["suite", *BENCHMARKS])
+    parser.add_argument(
+        "args", nargs="*", type=int, help="sizes passed to single benchmarks"
+    )
+    parser.add_argument("--shape", choices=CORPUS_SHAPES, default="many-small")
+    parser.add_argument("--pages", type=int, help="override the shape's page count")
+    parser.add_argument("--blocks", type=int, help="override blocks per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the suite results to this file")
+    options = parser.parse_args(argv)
+
+    if options.benchmark != "suite":
+        return BENCHMARKS[options.benchmark](*options.args)
+    overrides = {}
+    if options.pages is not None:
+        overrides["pages"] = options.pages
+    if options.blocks is not None:
+        overrides["blocks"] = options.blocks
+    return bench_suite(options.shape, options.json, options.seed, **overrides)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import gzip
+import io
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from output_writer import (
+    DEFAULT_MAX_PENDING,
+    DEFAULT_THREADS,
+    SIDECAR_SUFFIXES,
+    remove_sidecars,
+    replace_if_changed,
+    temp_path,
+    write_if_changed,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Outputs worth precompressing; images and fonts are compressed already
+COMPRESSIBLE_SUFFIXES = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt")
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Outputs submitted without their bytes are compressed this much at a time
+CHUNK_SIZE = 2**20
+
+
+def is_compressible(path: str) -> bool:
+    return path.lower().endswith(COMPRESSIBLE_SUFFIXES)
+
+
+def _gzip_file(out):
+    # gzip.compress() marks its output with this platform's OS byte while
+    # GzipFile does not, so both kinds of submissions go through GzipFile to
+    # produce identical sidecars
+    return gzip.GzipFile("", "wb", GZIP_LEVEL, out, mtime=0)
+
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "kB", "MB"):
+        if size < 1000 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1000
+
+
+class Compressor:
+    """Writes precompressed .gz and .br sidecars next to output files.
+
+    submit() queues an output, with its bytes if they are still in memory,
+    and returns at once. Outputs submitted without their bytes are read and
+    compressed a chunk at a time, so large pages are never loaded whole.
+    zlib and brotli release the GIL, so the sidecars are compressed by
+    `threads` threads while the build goes on. Like OutputWriter, it only
+    blocks while max_pending files are waiting. .br sidecars are written when
+    the brotli module is installed. gzip output is made with mtime 0, so both
+    sidecars are deterministic and are left untouched when their bytes did
+    not change. close() waits for every queued file; failures are collected
+    in errors by path.
+    """
+
+    def __init__(
+        self,
+        threads: int = DEFAULT_THREADS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        use_brotli: bool = True,
+    ):
+        if threads < 1:
+            raise ValueError("Compressor needs at least one thread")
+        self.threads = threads
+        self.brotli = brotli if use_brotli else None
+        self.files = 0
+        self.input_bytes = 0
+        self.gzip_bytes = 0
+        self.brotli_bytes = 0
+        # Time spent compressing, summed over the threads
+        self.seconds = 0.0
+        self.written: List[str] = []
+        self.errors: Dict[str, Exception] = {}
+        self.closed = False
+        self._lock = threading.Lock()
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(threads)
+
+    def __repr__(self) -> str:
+        return (
+            f"Compressor(threads={self.threads}, brotli={self.brotli is not None},"
+            f" files={self.files}, errors={len(self.errors)})"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def sidecars_missing(self, path: str) -> bool:
+        """Whether an unchanged output still lacks one of its sidecars."""
+        if not is_compressible(path):
+            return False
+        if not os.path.exists(path + ".gz"):
+            return True
+        return self.brotli is not None and not os.path.exists(path + ".br")
+
+    def submit(self, path: str, data: Optional[bytes] = None):
+        """Compress the output at path, whose contents are data if given."""
+        if self.closed:
+            raise ValueError("Cannot submit to a closed Compressor")
+        if not is_compressible(path):
+            return
+        self._pending.acquire()
+        try:
+            self._executor.submit(self._compress, path, data)
+        except BaseException:
+            self._pending.release()
+            raise
+
+    def _compress(self, path: str, data: Optional[bytes]):
+        try:
+            start = time.perf_counter()
+            if data is None:
+                size, sizes, written = self._compress_file(path)
+            else:
+                size, sizes, written = self._compress_bytes(path, data)
+            elapsed = time.perf_counter() - start
+        except Exception as error:
+            with self._lock:
+                self.errors[path] = error
+            return
+        finally:
+            self._pending.release()
+        with self._lock:
+            self.files += 1
+            self.input_bytes += size
+            self.gzip_bytes += sizes[".gz"]
+            self.brotli_bytes += sizes.get(".br", 0)
+            self.seconds += elapsed
+            self.written.extend(written)
+
+    def _compress_bytes(
+        self, path: str, data: bytes
+    ) -> Tuple[int, Dict[str, int], List[str]]:
+        buffer = io.BytesIO()
+        with _gzip_file(buffer) as gz:
+            gz.write(data)
+        sidecars = {".gz": buffer.getvalue()}
+        if self.brotli is not None:
+            sidecars[".br"] = self.brotli.compress(data, quality=BROTLI_QUALITY)
+        written = [
+            path + suffix
+            for suffix, body in sidecars.items()
+            if write_if_changed(path + suffix, body)
+        ]
+        sizes = {suffix: len(body) for suffix, body in sidecars.items()}
+        return len(data), sizes, written
+
+    def _compress_file(self, path: str) -> Tuple[int, Dict[str, int], List[str]]:
+        suffixes = [".gz"] if self.brotli is None else [".gz", ".br"]
+        sizes = {}
+        written = []
+        for suffix in suffixes:
+            sidecar = path + suffix
+            tmp_path = temp_path(sidecar)
+            try:
+                with open(path, "rb") as source, open(tmp_path, "wb") as out:
+                    if suffix == ".gz":
+                        with _gzip_file(out) as gz:
+                            shutil.copyfileobj(source, gz, CHUNK_SIZE)
+                    else:
+                        compressor = self.brotli.Compressor(quality=BROTLI_QUALITY)
+                        while True:
+                            chunk = source.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            out.write(compressor.process(chunk))
+                        out.write(compressor.finish())
+                sizes[suffix] = os.path.getsize(tmp_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            if replace_if_changed(tmp_path, sidecar):
+                written.append(sidecar)
+        return os.path.getsize(path), sizes, written
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._executor.shutdown(wait=True)
+
+    def summary(self) -> str:
+        """Describe what was compressed, e.g. for the end of a build."""
+        if not self.files:
+            return "Compressed 0 file(s)"
+        sizes = {"gzip": self.gzip_bytes}
+        if self.brotli is not None:
+            sizes["brotli"] = self.brotli_bytes
+        total = max(1, self.input_bytes)
+        compressed = ", ".join(
+            f"{_format_size(size)} {name} ({100 * size / total:.1f}%)"
+            for name, size in sizes.items()
+        )
+        return (
+            f"Compressed {self.files} file(s) of {_format_size(self.input_bytes)}"
+            f" to {compressed} in {self.seconds:.3f}s"
+            f" across {self.threads} thread(s)"
+        )
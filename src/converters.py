@@ -1,15 +1,35 @@
+from highlight import HighlightCache, highlight_code
 from htmlnode import HTMLNode, LeafNode, ParentNode
 from textnode import TextNode, TextType
+from collections import OrderedDict
 from enum import Enum, auto
+from html import escape
+from typing import Dict, List, Optional, Tuple
 import copy
 import re
 
 
+# Bump whenever a change here alters the HTML produced for the same markdown,
+# so cached renders from older versions are not reused
+CONVERTER_VERSION = 6
+
 MD_IMAGE_SEC_RGX = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
 MD_HTML_SEC_RGX = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
 MD_IMAGE_RGX = r"!\[.*?\]\(.*?\)"
 MD_HTML_RGX = r"(?<!!)\[.*?\]\(.*?\)"
 
+MD_INLINE_DELIMITER_RGX = re.compile(r"\*\*|\*|`")
+MD_IMAGE_OR_LINK_RGX = re.compile(f"{MD_IMAGE_SEC_RGX}|{MD_HTML_SEC_RGX}")
+MD_HEADING_PREFIX_RGX = re.compile(r"#{1,6}\s+")
+MD_ULIST_PREFIX_RGX = re.compile(r"[-*+]\s+")
+MD_OLIST_PREFIX_RGX = re.compile(r"\d+\.\s+")
+MD_TITLE_RGX = re.compile(r"^# (.+)", re.MULTILINE)
+MD_CODE_LANGUAGE_RGX = re.compile(r"```([\w+#.-]+)[ \t]*\n")
+SLUG_STRIP_RGX = re.compile(r"[^\w\s-]")
+SLUG_SEPARATOR_RGX = re.compile(r"[\s-]+")
+HEADING_LEVELS = {f"h{level}": level for level in range(1, 7)}
+INLINE_DELIMITER_TYPES = {"**": TextType.BOLD, "*": TextType.ITALIC, "`": TextType.CODE}
+
 
 class BlockType(Enum):
     PARAGRAPH = auto()
@@ -73,94 +93,94 @@ def extract_markdown_links(text):
     return matches
 
 
-def split_nodes_image(old_nodes):
+def _split_nodes_pattern(old_nodes, pattern, text_type):
     new_nodes = []
-    last_end = 0
     for old_node in old_nodes:
         if old_node.text_type != TextType.TEXT.value:
             new_nodes.append(old_node)
             continue
-        # Use re.finditer to find all matches of the pattern
-        i = 0
-        matches = extract_markdown_images(old_node.text)
-        split_nodes = []
-        for match in re.finditer(MD_IMAGE_RGX, old_node.text):
+        last_end = 0
+        for match in re.finditer(pattern, old_node.text):
             start, end = match.span()
 
             # Add the text before the match as a normal text node
             if start > last_end:
-                split_nodes.append(
-                    TextNode(old_node.text[last_end:start], TextType.TEXT)
-                )
+                new_nodes.append(TextNode(old_node.text[last_end:start], TextType.TEXT))
 
-            # Add the matched delimiter as a specific type node
-            split_nodes.append(TextNode(matches[i][0], TextType.IMAGE, matches[i][1]))
+            # Add the matched section as a specific type node
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
 
             # Update the last_end to the end of the current match
             last_end = end
-            i += 1
 
         # Add any remaining text after the last match
         if last_end < len(old_node.text):
-            split_nodes.append(TextNode(old_node.text[last_end:], TextType.TEXT))
-
-        new_nodes.extend(split_nodes)
-        # print("\nNEW NODES: {new_nodes}")
+            new_nodes.append(TextNode(old_node.text[last_end:], TextType.TEXT))
     return new_nodes
 
 
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    last_end = 0
-    # print(f"\n||old_nodes = {old_nodes}")
-    for old_node in old_nodes:
-        if old_node.text_type != TextType.TEXT.value:
-            new_nodes.append(old_node)
-            continue
-        # print(f"\n||old_node.text = {old_node.text}")
-        # Use re.finditer to find all matches of the pattern
-        i = 0
-        matches = extract_markdown_links(old_node.text)
-        # print(f"\n||matches = {matches}")
-        split_nodes = []
-        for match in re.finditer(MD_HTML_RGX, old_node.text):
-            start, end = match.span()
-            # print(f"\n||match = {match}")
-            # Add the text before the match as a normal text node
-            if start > last_end:
-                split_nodes.append(
-                    TextNode(old_node.text[last_end:start], TextType.TEXT)
-                )
-                # print(
-                #    f"\n||append text = {old_node.text[last_end:start], TextType.TEXT}"
-                # )
-
-            # Add the matched delimiter as a specific type node
-            # print(
-            #    f"\n||append html = {TextNode(matches[i][0], TextType.LINK, matches[i][1])}"
-            # )
+def split_nodes_image(old_nodes):
+    return _split_nodes_pattern(old_nodes, MD_IMAGE_SEC_RGX, TextType.IMAGE)
 
-            split_nodes.append(TextNode(matches[i][0], TextType.LINK, matches[i][1]))
 
-            # Update the last_end to the end of the current match
-            last_end = end
-            i += 1
+def split_nodes_link(old_nodes):
+    return _split_nodes_pattern(old_nodes, MD_HTML_SEC_RGX, TextType.LINK)
 
-        # Add any remaining text after the last match
-        if last_end < len(old_node.text):
-            split_nodes.append(TextNode(old_node.text[last_end:], TextType.TEXT))
 
-        new_nodes.extend(split_nodes)
-    return new_nodes
+def _append_text_run(nodes, text):
+    # A run of plain text between delimiters can only hold images and links
+    if "[" not in text:
+        nodes.append(TextNode(text, TextType.TEXT))
+        return
+    last_end = 0
+    for match in MD_IMAGE_OR_LINK_RGX.finditer(text):
+        start, end = match.span()
+        if start > last_end:
+            nodes.append(TextNode(text[last_end:start], TextType.TEXT))
+        if match.group(1) is not None:
+            nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        else:
+            nodes.append(TextNode(match.group(3), TextType.LINK, match.group(4)))
+        last_end = end
+    if last_end < len(text):
+        nodes.append(TextNode(text[last_end:], TextType.TEXT))
 
 
 def text_to_textnodes(text: str):
+    """Split inline markdown into TextNodes in a single left-to-right scan.
+
+    Produces the same nodes as chaining split_nodes_delimiter for "**", "*"
+    and "`" followed by split_nodes_image and split_nodes_link, including
+    their precedence: bold spans are literal, a "**" cannot appear inside an
+    italic or code span, and a "*" cannot appear inside a code span.
+    """
     nodes = []
-    nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    pos = 0
+    while pos < len(text):
+        match = MD_INLINE_DELIMITER_RGX.search(text, pos)
+        if match is None:
+            _append_text_run(nodes, text[pos:])
+            break
+        start, content_start = match.span()
+        if start > pos:
+            _append_text_run(nodes, text[pos:start])
+
+        delimiter = match.group()
+        end = text.find(delimiter, content_start)
+        if delimiter == "*" and text.startswith("**", end):
+            end = -1
+        elif delimiter == "`" and text.find("*", content_start, end) != -1:
+            end = -1
+        if end == -1:
+            raise ValueError(
+                f"Invalid markdown, formatted section not closed\n-------------\n{text[start:]}\n---------------\n"
+            )
+
+        if end > content_start:
+            nodes.append(
+                TextNode(text[content_start:end], INLINE_DELIMITER_TYPES[delimiter])
+            )
+        pos = end + len(delimiter)
     return nodes
 
 
@@ -170,56 +190,91 @@ def markdown_to_blocks(markdown: str):
     return [block.strip() for block in blocks]
 
 
-def block_to_block_type(md_block: str):
-    md_block = md_block.strip()
-
-    if re.match(r"^#{1,6}\s", md_block):
-        md_type = BlockType.HEADING
-    elif re.match(r"^```", md_block) and md_block.endswith("```"):
-        md_type = BlockType.CODE
-    elif all(line.startswith("> ") for line in md_block.splitlines()):
-        md_type = BlockType.QUOTE
-    elif all(re.match(r"^[-*+]\s", line) for line in md_block.splitlines()):
-        md_type = BlockType.UNORDERED_LIST
-    elif all(re.match(r"^\d+\.\s", line) for line in md_block.splitlines()):
-        md_type = BlockType.ORDERED_LIST
-    else:
-        md_type = BlockType.PARAGRAPH
+def iter_markdown_blocks(lines):
+    """Yield the same blocks as markdown_to_blocks from an iterable of lines.
 
-    return md_type
+    lines is typically a file opened in text mode, so only the block being
+    assembled is held in memory. Blocks are separated by two or more newlines
+    in a row: the newline ending a line plus at least one empty line.
+    """
+    parts = []
+    newlines = 0
+    for line in lines:
+        if line == "\n":
+            newlines += 1
+            continue
+        if newlines >= 2:
+            yield "".join(parts).strip()
+            parts = []
+        elif newlines:
+            parts.append("\n")
+        if line.endswith("\n"):
+            parts.append(line[:-1])
+            newlines = 1
+        else:
+            parts.append(line)
+            newlines = 0
+    yield "".join(parts).strip()
+    if newlines >= 2:
+        yield ""
+
+
+def classify_block(md_block: str):
+    """Classify a block and strip its markdown syntax in a single scan.
+
+    Dispatches on the first character of the stripped block so each block is
+    split into lines at most once and only the relevant patterns are tried.
+    Returns (stripped_text, block_type).
+    """
+    text = md_block.strip()
+    first = text[:1]
+
+    if first == "#":
+        # Remove the leading # and any spaces
+        match = MD_HEADING_PREFIX_RGX.match(text)
+        if match:
+            return text[match.end() :], BlockType.HEADING
+    elif first == "`":
+        # Remove the leading and trailing ```
+        if text.startswith("```") and text.endswith("```"):
+            return (text[3:-3] if len(text) >= 6 else text[3:]).strip(), BlockType.CODE
+
+    lines = text.splitlines()
+    if first == ">" or not lines:
+        # Remove the leading > and space from each line
+        if all(line.startswith("> ") for line in lines):
+            return "\n".join(line[2:] for line in lines), BlockType.QUOTE
+    elif first in "-*+":
+        # Remove the leading -, *, or + and spaces from each line
+        items = _strip_list_items(lines, MD_ULIST_PREFIX_RGX)
+        if items is not None:
+            return items, BlockType.UNORDERED_LIST
+    elif first.isdigit():
+        # Remove the leading number and dot from each line
+        items = _strip_list_items(lines, MD_OLIST_PREFIX_RGX)
+        if items is not None:
+            return items, BlockType.ORDERED_LIST
 
+    # For paragraphs, no special stripping needed beyond whitespace
+    return text, BlockType.PARAGRAPH
 
-def strip_md_block(md_block: str):
-    # Determine the block type
-    md_type = block_to_block_type(md_block)
 
-    # Strip the Markdown-specific characters and leading/trailing whitespace
-    stripped_text = md_block.strip()
+def _strip_list_items(lines, prefix_rgx):
+    items = []
+    for line in lines:
+        match = prefix_rgx.match(line)
+        if match is None:
+            return None
+        items.append(line[match.end() :])
+    return "\n".join(items)
+
+
+def block_to_block_type(md_block: str):
+    return classify_block(md_block)[1]
 
-    if md_type == BlockType.HEADING:
-        # Remove the leading # and any spaces
-        stripped_text = re.sub(r"^#{1,6}\s+", "", stripped_text)
-    elif md_type == BlockType.CODE:
-        # Remove the leading and trailing ```
-        stripped_text = re.sub(r"^```|```$", "", stripped_text).strip()
-    elif md_type == BlockType.QUOTE:
-        # Remove the leading > and spaces for each line
-        stripped_text = "\n".join(
-            line[2:] for line in stripped_text.splitlines() if line.startswith("> ")
-        )
-    elif md_type == BlockType.UNORDERED_LIST:
-        # Remove the leading -, *, or + and spaces for each line
-        stripped_text = "\n".join(
-            re.sub(r"^[-*+]\s+", "", line) for line in stripped_text.splitlines()
-        )
-    elif md_type == BlockType.ORDERED_LIST:
-        # Remove the leading number and dot for each line
-        stripped_text = "\n".join(
-            re.sub(r"^\d+\.\s+", "", line) for line in stripped_text.splitlines()
-        )
-    # For paragraphs, no special stripping needed beyond whitespace
 
-    return stripped_text, md_type
+def strip_md_block(md_block: str):
+    return classify_block(md_block)
 
 
 def parse_markdown(markdown: str):
@@ -301,41 +356,173 @@ def markdown_to_html(markdown: str) -> HTMLNode:
 """
 
 
-def parse_block(md_block: str) -> HTMLNode:
-    stripped_text, block_type = strip_md_block(md_block)
+def slugify(text: str) -> str:
+    """Turn heading text into an id, e.g. "A *Rich* Tapestry!" -> "a-rich-tapestry"."""
+    slug = SLUG_SEPARATOR_RGX.sub("-", SLUG_STRIP_RGX.sub("", text.lower()))
+    return slug.strip("-") or "section"
+
+
+def inline_text(nodes) -> str:
+    """Return the text of inline nodes, with image alt text."""
+    return "".join(node.value or node.props.get("alt", "") for node in nodes)
+
+
+def _quote_line(line: str):
+    # Count the leading > markers of a line, each optionally followed by a
+    # space, and return (depth, text after the markers)
+    depth = 0
+    pos = 0
+    while line.startswith(">", pos):
+        depth += 1
+        pos += 2 if line.startswith(" ", pos + 1) else 1
+    return depth, line[pos:]
+
+
+def _blockquote(children):
+    if not children:
+        return None
+    # A quote of a single paragraph holds its text directly, as flat quotes
+    # always have
+    if len(children) == 1 and children[0].tag == "p":
+        return ParentNode("blockquote", children[0].children)
+    return ParentNode("blockquote", children)
+
+
+def parse_quote(lines):
+    """Parse the lines of a quote block, nested quotes included, in one pass.
+
+    Every line starts with one or more > markers giving its depth. A stack
+    holds the children of the open quotes: deeper lines open quotes, shallower
+    lines close them, and the text lines between markers and blank quoted lines
+    form paragraphs inside each quote. Quoted text is inline markdown only, so
+    a quoted "# Note" or "- a" stays literal text. Returns None if a line is
+    not quoted or the quote is empty.
+    """
+    stack = [[]]
+    text_lines = []
+
+    def end_block():
+        if text_lines:
+            text_nodes = text_to_textnodes("\n".join(text_lines))
+            children = [text_node_to_html_node(node) for node in text_nodes]
+            stack[-1].append(ParentNode("p", children))
+            text_lines.clear()
+
+    for line in lines:
+        if not (line == ">" or line.startswith(("> ", ">>"))):
+            return None
+        depth, text = _quote_line(line)
+        if depth != len(stack) or not text:
+            end_block()
+        while len(stack) > depth:
+            quote = _blockquote(stack.pop())
+            if quote is not None:
+                stack[-1].append(quote)
+        while len(stack) < depth:
+            stack.append([])
+        if text:
+            text_lines.append(text)
+    end_block()
+    while len(stack) > 1:
+        quote = _blockquote(stack.pop())
+        if quote is not None:
+            stack[-1].append(quote)
+    return _blockquote(stack[0])
+
+
+def _list_line(line: str):
+    text = line.lstrip(" ")
+    match = MD_ULIST_PREFIX_RGX.match(text)
+    if match:
+        return len(line) - len(text), "ul", text[match.end() :]
+    match = MD_OLIST_PREFIX_RGX.match(text)
+    if match:
+        return len(line) - len(text), "ol", text[match.end() :]
+    return None
+
+
+def _list_node(tag, items):
+    return ParentNode(tag, [ParentNode("li", children) for children in items])
+
+
+def parse_list(lines):
+    """Parse the lines of a list block, nested lists included, in one pass.
+
+    Every line is an item; items indented further than the one before open
+    a list inside it, and items indented less close lists until one at their
+    indentation or less is open. A stack holds the (indent, tag, items) of
+    the open lists. Returns None if a line is not an item or an item's type
+    differs from its siblings'.
+    """
+    stack = []
+    for line in lines:
+        item = _list_line(line)
+        if item is None:
+            return None
+        indent, tag, text = item
+        while len(stack) > 1 and indent < stack[-1][0]:
+            _, closed_tag, closed_items = stack.pop()
+            stack[-1][2][-1].append(_list_node(closed_tag, closed_items))
+        if not stack or indent > stack[-1][0]:
+            stack.append((indent, tag, []))
+        elif tag != stack[-1][1]:
+            return None
+        stack[-1][2].append([LeafNode(None, text.strip())])
+    while len(stack) > 1:
+        _, closed_tag, closed_items = stack.pop()
+        stack[-1][2][-1].append(_list_node(closed_tag, closed_items))
+    return _list_node(*stack[0][1:]) if stack else None
+
+
+def code_block(
+    code: str,
+    language: Optional[str] = None,
+    highlight_cache: Optional[HighlightCache] = None,
+) -> HTMLNode:
+    """Build the <pre><code> of a code block.
+
+    The code is never parsed as inline markdown. It is escaped, or
+    highlighted if a highlighter handles its language.
+    """
+    html = highlight_code(code, language, highlight_cache) if language else None
+    if html is None:
+        html = escape(code, quote=False)
+    props = {"class": f"language-{language}"} if language else None
+    return ParentNode("pre", [LeafNode("code", html, props)])
+
+
+def parse_block(
+    md_block: str, highlight_cache: Optional[HighlightCache] = None
+) -> HTMLNode:
+    # Quotes and lists may nest, so they are parsed line by line
+    first = md_block.lstrip()[:1]
+    node = None
+    if first == ">":
+        node = parse_quote(md_block.strip().splitlines())
+    elif first and (first in "-*+" or first.isdigit()):
+        node = parse_list(md_block.strip().splitlines())
+    if node is not None:
+        return node
 
-    # Check if the stripped text contains nested Markdown blocks
-    if re.search(r"\n{2,}", stripped_text):
-        nested_node = parse_markdown(stripped_text)
-        match block_type:
-            case BlockType.QUOTE:
-                return ParentNode("blockquote", [nested_node])
-            case BlockType.UNORDERED_LIST:
-                items = [
-                    ParentNode("li", [parse_block(item.strip())])
-                    for item in stripped_text.splitlines()
-                ]
-                return ParentNode("ul", items)
-            case BlockType.ORDERED_LIST:
-                items = [
-                    ParentNode("li", [parse_block(item.strip())])
-                    for item in stripped_text.splitlines()
-                ]
-                return ParentNode("ol", items)
-            case _:
-                return nested_node
+    stripped_text, block_type = strip_md_block(md_block)
+    if block_type == BlockType.CODE:
+        text = md_block.strip()
+        match = MD_CODE_LANGUAGE_RGX.match(text)
+        if match is None:
+            return code_block(stripped_text, None, highlight_cache)
+        code = text[match.end() : -3].strip()
+        return code_block(code, match.group(1), highlight_cache)
 
-    # Otherwise, create text nodes for inline elements
     text_nodes = text_to_textnodes(stripped_text)
     html_children = [text_node_to_html_node(node) for node in text_nodes]
 
     match block_type:
         case BlockType.HEADING:
+            heading = md_block.lstrip()
+            level = len(heading) - len(heading.lstrip("#"))
             return ParentNode(
-                "h1", html_children
-            )  # Assuming all headings as <h1> for now
-        case BlockType.CODE:
-            return ParentNode("pre", [ParentNode("code", html_children)])
+                f"h{level}", html_children, {"id": slugify(inline_text(html_children))}
+            )
         case BlockType.QUOTE:
             return ParentNode("blockquote", html_children)
         case BlockType.UNORDERED_LIST:
@@ -362,15 +549,172 @@ def parse_block(md_block: str) -> HTMLNode:
             raise ValueError("Unsupported block type provided")
 
 
-def markdown_to_html(markdown: str) -> HTMLNode:
+class BlockMemo:
+    """Bounded LRU memo of parse_block results keyed by the block's text.
+
+    Lets blocks repeated across pages, such as shared notices, footers and
+    boilerplate code samples, be parsed once per process. The returned nodes
+    are shared between pages and must not be mutated.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._nodes = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"BlockMemo(maxsize={self.maxsize}, stats={self.stats()})"
+
+    def parse_block(
+        self, md_block: str, highlight_cache: Optional[HighlightCache] = None
+    ) -> HTMLNode:
+        node = self._nodes.get(md_block)
+        if node is not None:
+            self._nodes.move_to_end(md_block)
+            self.hits += 1
+            return node
+        self.misses += 1
+        node = parse_block(md_block, highlight_cache)
+        self._nodes[md_block] = node
+        if len(self._nodes) > self.maxsize:
+            self._nodes.popitem(last=False)
+        return node
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._nodes),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        self._nodes.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_shared_block_memo = None
+
+
+def shared_block_memo() -> BlockMemo:
+    """Return the process-wide BlockMemo, creating it on first use."""
+    global _shared_block_memo
+    if _shared_block_memo is None:
+        _shared_block_memo = BlockMemo()
+    return _shared_block_memo
+
+
+class Outline:
+    """The headings of one page, collected while its blocks are parsed.
+
+    add_block() is given every top-level block node in document order and
+    records (level, text, slug) for each heading, so the title, the table of
+    contents and the page's anchors come from the parse itself. A slug
+    already used on the page gets a -1, -2, ... suffix.
+    """
+
+    def __init__(self):
+        self.headings: List[Tuple[int, str, str]] = []
+        self.title: Optional[str] = None
+        self._slugs = set()
+        self._suffixes: Dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return f"Outline(title='{self.title}', headings={len(self.headings)})"
+
+    def add_block(self, node: HTMLNode) -> HTMLNode:
+        """Record node if it is a heading and return it, renamed if needed."""
+        level = HEADING_LEVELS.get(node.tag)
+        if level is None:
+            return node
+        slug = node.props["id"]
+        if slug in self._slugs:
+            suffix = self._suffixes.get(slug, 1)
+            while f"{slug}-{suffix}" in self._slugs:
+                suffix += 1
+            self._suffixes[slug] = suffix + 1
+            slug = f"{slug}-{suffix}"
+            # Memoized nodes are shared between pages, so copy rather than
+            # change the id in place
+            node = ParentNode(node.tag, node.children, {"id": slug})
+        self._slugs.add(slug)
+        text = inline_text(node.children)
+        self.headings.append((level, text, slug))
+        if level == 1 and self.title is None:
+            self.title = text
+        return node
+
+    def require_title(self) -> str:
+        if self.title is None:
+            raise ValueError("No H1 title found in the markdown string.")
+        return self.title
+
+
+def _toc_list(items):
+    return ParentNode("ul", [ParentNode("li", children) for children in items])
+
+
+def table_of_contents(headings, min_level: int = 2) -> Optional[HTMLNode]:
+    """Build nested lists linking to the headings from min_level down.
+
+    headings are Outline.headings. Deeper headings are listed inside the
+    entry before them. Returns None if there are no such headings.
+    """
+    stack = []
+    for level, text, slug in headings:
+        if level < min_level:
+            continue
+        while len(stack) > 1 and level < stack[-1][0]:
+            _, items = stack.pop()
+            stack[-1][1][-1].append(_toc_list(items))
+        if not stack or level > stack[-1][0]:
+            stack.append((level, []))
+        stack[-1][1].append([LeafNode("a", text, {"href": f"#{slug}"})])
+    while len(stack) > 1:
+        _, items = stack.pop()
+        stack[-1][1][-1].append(_toc_list(items))
+    return _toc_list(stack[0][1]) if stack else None
+
+
+def markdown_to_html(
+    markdown: str,
+    memo: BlockMemo = None,
+    outline: Optional[Outline] = None,
+    highlight_cache: Optional[HighlightCache] = None,
+) -> HTMLNode:
+    """Parse markdown into a div of block nodes.
+
+    Headings are given unique ids and, with an Outline, recorded in it.
+    Highlighted code blocks are cached in highlight_cache if one is given.
+    """
     blocks = markdown_to_blocks(markdown)
-    nodes = [parse_block(block) for block in blocks]
+    parse = memo.parse_block if memo is not None else parse_block
+    add_block = (outline if outline is not None else Outline()).add_block
+    nodes = [add_block(parse(block, highlight_cache)) for block in blocks]
     return ParentNode("div", nodes)
 
 
 def extract_title(markdown_string):
-    match = re.search(r"^# (.+)", markdown_string, re.MULTILINE)
+    match = MD_TITLE_RGX.search(markdown_string)
     if match:
         return match.group(1)
     else:
         raise ValueError("No H1 title found in the markdown string.")
+
+
+def extract_title_from_blocks(blocks):
+    """The title Outline finds, from an iterable of markdown blocks.
+
+    Blocks are classified one at a time and only headings are parsed, so a
+    `# ` line inside a code block is never taken for the title. No block after
+    the title is read.
+    """
+    for block in blocks:
+        if block_to_block_type(block) is not BlockType.HEADING:
+            continue
+        node = parse_block(block)
+        if HEADING_LEVELS.get(node.tag) == 1:
+            return inline_text(node.children)
+    raise ValueError("No H1 title found in the markdown string.")
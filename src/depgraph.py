@@ -0,0 +1,205 @@
+import json
+import os
+import posixpath
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+from htmlnode import HTMLNode
+
+DEPGRAPH_FORMAT = 2
+
+
+def node_references(node: HTMLNode) -> Tuple[List[str], List[str]]:
+    """Return the (links, images) URLs of the a and img nodes under node.
+
+    These are the nodes built from TextType.LINK and TextType.IMAGE text
+    nodes, listed in document order.
+    """
+    links = []
+    images = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag == "a":
+            links.append(node.props.get("href", ""))
+        elif node.tag == "img":
+            images.append(node.props.get("src", ""))
+        stack.extend(reversed(node.children))
+    return links, images
+
+
+def resolve_url(url: str, source: str) -> List[Tuple[str, str]]:
+    """Return the ("page", source) and ("asset", path) inputs url could refer to.
+
+    source is the markdown file, relative to the content root, whose output
+    holds the link; relative URLs are resolved against that output's
+    location. Pages are markdown sources and assets are paths relative to the
+    static root. External URLs and links within the same page refer to no
+    inputs.
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return []
+    path = unquote(parts.path)
+    if not path.startswith("/"):
+        base = posixpath.dirname("/" + source.replace(os.sep, "/"))
+        path = posixpath.join(base, path)
+    target = posixpath.normpath(path).lstrip("/")
+    if target in ("", "."):
+        return [("page", "index.md")]
+    if path.endswith("/"):
+        return [("page", os.path.normpath(posixpath.join(target, "index.md")))]
+    candidates = [("asset", os.path.normpath(target))]
+    if target.endswith(".html"):
+        candidates.append(("page", os.path.normpath(target[:-5] + ".md")))
+    else:
+        candidates.append(("page", os.path.normpath(target + ".md")))
+        candidates.append(
+            ("page", os.path.normpath(posixpath.join(target, "index.md")))
+        )
+    return candidates
+
+
+def resolve_anchor(url: str, source: str) -> Optional[Tuple[List[str], str]]:
+    """Return (pages, fragment) for a link into a heading of a page.
+
+    pages are the sources the link could point into, as with resolve_url,
+    or source itself for a bare #fragment. Returns None for links without a
+    fragment and for external links.
+    """
+    parts = urlsplit(url)
+    if not parts.fragment or parts.scheme or parts.netloc:
+        return None
+    if not parts.path:
+        return [source], unquote(parts.fragment)
+    pages = [target for kind, target in resolve_url(url, source) if kind == "page"]
+    return pages, unquote(parts.fragment)
+
+
+class DependencyGraph:
+    """Records which inputs every page was built from.
+
+    Each page (a markdown source relative to the content root) is stored with
+    the hash of its source, the template it was rendered with, the URLs
+    of the links and images it contains and the ids of its headings.
+    dependents() turns a set of changed inputs into the smallest set of pages
+    to rebuild, and broken_references() finds links and images that point at
+    no page, asset or heading.
+    """
+
+    def __init__(self, path: Optional[str] = None, data: Optional[Dict] = None):
+        self.path: Optional[str] = path
+        data = data if data is not None else {}
+        self.pages: Dict[str, Dict] = data.get("pages", {})
+
+    def __repr__(self) -> str:
+        return f"DependencyGraph(path='{self.path}', pages={len(self.pages)} pages)"
+
+    @classmethod
+    def load(cls, path: str) -> "DependencyGraph":
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("format") != DEPGRAPH_FORMAT:
+            return cls(path)
+        return cls(path, data)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the dependency graph to")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {"format": DEPGRAPH_FORMAT, "pages": self.pages}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def record_page(
+        self,
+        source: str,
+        source_hash: str,
+        template: str,
+        links: Iterable[str],
+        images: Iterable[str],
+        anchors: Iterable[str] = (),
+    ):
+        self.pages[source] = {
+            "hash": source_hash,
+            "template": os.path.normpath(template),
+            "links": list(links),
+            "images": list(images),
+            "anchors": list(anchors),
+        }
+
+    def is_current(self, source: str, source_hash: str) -> bool:
+        entry = self.pages.get(source)
+        return entry is not None and entry["hash"] == source_hash
+
+    def forget_page(self, source: str):
+        self.pages.pop(source, None)
+
+    def dependents(
+        self,
+        changed_pages: Iterable[str] = (),
+        changed_assets: Iterable[str] = (),
+        changed_templates: Iterable[str] = (),
+    ) -> Set[str]:
+        """Return the pages that must be rebuilt after the given inputs changed.
+
+        A page depends on its own source, its template and the images it
+        embeds. Linked pages and assets are not dependencies: the link is
+        rendered the same whatever it points at.
+        """
+        changed_assets = {os.path.normpath(asset) for asset in changed_assets}
+        changed_templates = {os.path.normpath(path) for path in changed_templates}
+        rebuild = {source for source in changed_pages if source in self.pages}
+        for source, entry in self.pages.items():
+            if entry["template"] in changed_templates:
+                rebuild.add(source)
+            elif changed_assets and any(
+                target in changed_assets
+                for url in entry["images"]
+                for kind, target in resolve_url(url, source)
+                if kind == "asset"
+            ):
+                rebuild.add(source)
+        return rebuild
+
+    def anchor_index(self) -> Dict[str, Set[str]]:
+        """Map every page to the set of its heading ids."""
+        return {source: set(entry["anchors"]) for source, entry in self.pages.items()}
+
+    def broken_references(
+        self, assets: Iterable[str], sources: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, str]]:
+        """Return (source, url) for links and images that resolve to nothing.
+
+        Pages are the sources recorded in the graph and assets are the paths
+        under the static root. Links with a #fragment into a page must also
+        name one of its headings. Only the given sources are checked if any
+        are passed.
+        """
+        inputs = {("asset", os.path.normpath(asset)) for asset in assets}
+        inputs.update(("page", source) for source in self.pages)
+        anchors = self.anchor_index()
+        broken = []
+        for source in sorted(self.pages if sources is None else sources):
+            entry = self.pages.get(source)
+            if entry is None:
+                continue
+            for url in entry["links"] + entry["images"]:
+                candidates = resolve_url(url, source)
+                if candidates and not any(c in inputs for c in candidates):
+                    broken.append((source, url))
+                    continue
+                anchor = resolve_anchor(url, source)
+                if anchor is None:
+                    continue
+                pages = [page for page in anchor[0] if page in anchors]
+                if pages and not any(anchor[1] in anchors[page] for page in pages):
+                    broken.append((source, url))
+        return broken
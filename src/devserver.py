@@ -0,0 +1,300 @@
+import functools
+import http.server
+import os
+import threading
+import time
+from file_utils import (
+    PageBuildError,
+    generate_page,
+    generate_pages_recursive,
+    remove_output,
+    sync_files,
+)
+from depgraph import DependencyGraph
+from feeds import SiteIndex, describe_markdown, page_url, write_feeds
+from images import ImageIndex
+from manifest import BuildManifest, hash_file
+from scanner import scan_tree
+
+
+def snapshot(paths):
+    """Map every file under paths (files or directories) to (mtime_ns, size)."""
+    state = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in scan_tree(path):
+                state[entry.path] = (entry.stat.st_mtime_ns, entry.stat.st_size)
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+class TreeWatcher:
+    """Polls a set of files and directories for added, changed or deleted files."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.state = snapshot(self.paths)
+
+    def poll(self):
+        state = snapshot(self.paths)
+        changed = {
+            path
+            for path in state.keys() | self.state.keys()
+            if state.get(path) != self.state.get(path)
+        }
+        self.state = state
+        return changed
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(directory, host="localhost", port=8000):
+    """Serve directory over HTTP from a daemon thread and return the server."""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _is_within(path, directory):
+    return os.path.abspath(path).startswith(os.path.abspath(directory) + os.sep)
+
+
+class DevServer:
+    """Keeps a warm build process that rebuilds only what each edit touches.
+
+    Blocks are memoized for the life of the process, so blocks shared between
+    pages stay parsed across rebuilds.
+    """
+
+    def __init__(
+        self,
+        content_dir,
+        static_dir,
+        template_path,
+        dest_dir,
+        manifest_path=None,
+        log_to_console=True,
+        render_cache=None,
+        depgraph_path=None,
+        site_index_path=None,
+        site_url=None,
+        highlight_cache=None,
+        image_index_path=None,
+        image_widths=(),
+        image_cache_dir=None,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.manifest = (
+            BuildManifest.load(manifest_path) if manifest_path else BuildManifest()
+        )
+        self.graph = (
+            DependencyGraph.load(depgraph_path) if depgraph_path else DependencyGraph()
+        )
+        self.site_index = (
+            SiteIndex.load(site_index_path) if site_index_path else SiteIndex()
+        )
+        self.site_url = site_url
+        self.log_to_console = log_to_console
+        self.render_cache = render_cache
+        self.highlight_cache = highlight_cache
+        self.images = (
+            ImageIndex.load(image_index_path) if image_index_path else ImageIndex()
+        )
+        self.image_widths = image_widths
+        self.image_cache_dir = image_cache_dir
+
+    def log(self, message):
+        if self.log_to_console:
+            print(message)
+
+    def save_manifest(self):
+        if self.manifest.path:
+            self.manifest.save()
+        if self.graph.path:
+            self.graph.save()
+        if self.site_index.path:
+            self.site_index.save()
+        if self.images.path:
+            self.images.save()
+
+    def write_feeds(self):
+        if self.site_url is None:
+            return []
+        return write_feeds(self.site_index, self.dest_dir, self.site_url)
+
+    def warn_broken_references(self, sources=None):
+        for source, url in self.graph.broken_references(self.manifest.assets, sources):
+            self.log(f"Warning: {source}: broken reference {url}")
+
+    def update_images(self):
+        return self.images.update(
+            self.static_dir, self.dest_dir, self.image_widths, self.image_cache_dir
+        )
+
+    def build(self):
+        written = sync_files(self.static_dir, self.dest_dir, manifest=self.manifest)
+        written.extend(self.update_images())
+        rebuild = self.graph.dependents(changed_assets=self.images.changed_images)
+        try:
+            written.extend(
+                generate_pages_recursive(
+                    self.content_dir,
+                    self.template_path,
+                    self.dest_dir,
+                    manifest=self.manifest,
+                    render_cache=self.render_cache,
+                    memoize_blocks=True,
+                    highlight_cache=self.highlight_cache,
+                    images=self.images,
+                    dependency_graph=self.graph,
+                    site_index=self.site_index,
+                    rebuild=rebuild,
+                )
+            )
+        except PageBuildError as error:
+            # Keep serving; the failed pages are retried on the next change
+            self.log(f"Error: {error}")
+        written.extend(self.write_feeds())
+        self.warn_broken_references()
+        self.save_manifest()
+        return written
+
+    def rebuild(self, changed):
+        """Bring dest_dir up to date after the given files changed.
+
+        A template change goes through the manifest, which rebuilds every page.
+        Otherwise static assets are synced if one of them changed, and only the
+        changed markdown files plus the pages the dependency graph says embed
+        a changed asset are rendered or removed. Returns the list of files
+        written.
+        """
+        written = []
+        template = os.path.abspath(self.template_path)
+        if any(os.path.abspath(path) == template for path in changed):
+            written.extend(self.build())
+            return written
+
+        sources = {
+            os.path.relpath(path, self.content_dir)
+            for path in changed
+            if _is_within(path, self.content_dir) and path.endswith(".md")
+        }
+        if any(_is_within(path, self.static_dir) for path in changed):
+            synced = sync_files(self.static_dir, self.dest_dir, manifest=self.manifest)
+            written.extend(synced)
+            written.extend(self.update_images())
+            changed_assets = [os.path.relpath(path, self.dest_dir) for path in synced]
+            changed_assets.extend(self.images.changed_images)
+            changed_assets.extend(
+                os.path.relpath(path, self.static_dir)
+                for path in changed
+                if _is_within(path, self.static_dir) and not os.path.exists(path)
+            )
+            sources |= self.graph.dependents(changed_assets=changed_assets)
+
+        for source in sorted(sources):
+            path = os.path.join(self.content_dir, source)
+            if not os.path.exists(path):
+                self.graph.forget_page(source)
+                self.site_index.forget_page(source)
+                output = self.manifest.forget_page(source)
+                if output:
+                    remove_output(output, self.dest_dir)
+                    self.log(f"Page removed: {output}")
+                continue
+            page_info = {}
+            try:
+                output = generate_page(
+                    path,
+                    self.template_path,
+                    self.dest_dir,
+                    self.content_dir,
+                    render_cache=self.render_cache,
+                    memoize_blocks=True,
+                    highlight_cache=self.highlight_cache,
+                    images=self.images,
+                    page_info=page_info,
+                )
+                source_hash = hash_file(path)
+                if not page_info:
+                    with open(path, "r") as file:
+                        page_info = describe_markdown(file.read())
+            except Exception as error:
+                # A bad page, or one deleted or locked mid-edit, must not stop
+                # the watch loop; it is retried on its next change
+                self.manifest.forget_page(source)
+                self.graph.forget_page(source)
+                self.site_index.forget_page(source)
+                self.log(f"Error: {path}: {error}")
+                continue
+            self.manifest.record_page(source, source_hash, output)
+            self.graph.record_page(
+                source,
+                source_hash,
+                self.template_path,
+                page_info["links"],
+                page_info["images"],
+                page_info["anchors"],
+            )
+            self.site_index.record_page(
+                source,
+                source_hash,
+                page_url(output, self.dest_dir),
+                os.path.getmtime(path),
+                page_info,
+            )
+            written.append(output)
+
+        if sources:
+            written.extend(self.write_feeds())
+        self.warn_broken_references(sources)
+        self.save_manifest()
+        return written
+
+    def report(self, written, elapsed, changed, watcher):
+        message = f"Rebuilt {len(written)} file(s) in {elapsed * 1000:.1f} ms"
+        # Edit-to-page latency runs from the newest edit until the output is
+        # on disk, so it includes the time spent waiting for the next poll
+        edits = [watcher.state[path][0] for path in changed if path in watcher.state]
+        if edits:
+            latency = (time.time_ns() - max(edits)) / 1e6
+            message += f", {latency:.1f} ms after the edit"
+        self.log(message)
+
+    def watch(self, host="localhost", port=8000, interval=0.1):
+        """Build, serve dest_dir and rebuild on every change until interrupted."""
+        self.build()
+        server = start_server(self.dest_dir, host, port)
+        watcher = TreeWatcher([self.content_dir, self.static_dir, self.template_path])
+        self.log(f"Serving {self.dest_dir} at http://{host}:{server.server_port}/")
+        try:
+            while True:
+                time.sleep(interval)
+                changed = watcher.poll()
+                if not changed:
+                    continue
+                start = time.perf_counter()
+                try:
+                    written = self.rebuild(changed)
+                except Exception as error:
+                    # Keep watching; the next change retries the rebuild
+                    self.log(f"Error: rebuild failed: {error}")
+                    continue
+                self.report(written, time.perf_counter() - start, changed, watcher)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
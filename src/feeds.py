@@ -0,0 +1,327 @@
+import json
+import os
+import re
+import time
+from html import escape, unescape
+from typing import Dict, List, Optional
+from converters import HEADING_LEVELS, Outline, markdown_to_html
+from depgraph import node_references
+from htmlnode import HTMLNode
+from output_writer import remove_sidecars, write_if_changed
+
+SITE_INDEX_FORMAT = 1
+SEARCH_INDEX_VERSION = 1
+SUMMARY_LENGTH = 200
+FEED_ITEMS = 20
+
+TERM_RGX = re.compile(r"\w\w+")
+MARKUP_RGX = re.compile(r"<[^>]*>")
+
+
+# Elements whose text never runs into the text around them
+BLOCK_TAGS = {"div", "p", "pre", "blockquote", "ul", "ol", "li"}
+BLOCK_TAGS.update(f"h{level}" for level in range(1, 7))
+
+
+def node_text(node: HTMLNode) -> str:
+    """Return the text of the leaves under node, with image alt text.
+
+    Markup in code blocks is dropped, so highlighted code gives its plain text.
+    """
+    parts = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if node.tag == "img":
+            parts.append(node.props.get("alt", ""))
+        elif node.tag == "pre":
+            # Code blocks hold escaped and possibly highlighted HTML
+            for child in node.children:
+                parts.append(unescape(MARKUP_RGX.sub("", child.value or "")))
+            parts.append("\n")
+            continue
+        elif node.value:
+            parts.append(node.value)
+        if node.tag in BLOCK_TAGS:
+            stack.append("\n")
+        stack.extend(reversed(node.children))
+    return "".join(parts)
+
+
+class PageInfo:
+    """Collects what the dependency graph, feeds and search index use of a page.
+
+    Blocks are added one at a time as they are parsed, so streamed pages are
+    described without holding the whole page.
+    """
+
+    def __init__(self, title: str):
+        self.title = title
+        self.links: List[str] = []
+        self.images: List[str] = []
+        self.terms = set()
+        self.summary = ""
+        self.anchors: List[str] = []
+
+    def add_block(self, node: HTMLNode):
+        if node.tag in HEADING_LEVELS:
+            self.anchors.append(node.props["id"])
+        links, images = node_references(node)
+        self.links.extend(links)
+        self.images.extend(images)
+        text = node_text(node)
+        self.terms.update(TERM_RGX.findall(text.lower()))
+        # The first paragraph that is more than an image summarizes the page
+        if (
+            not self.summary
+            and node.tag == "p"
+            and any(child.tag != "img" for child in node.children)
+        ):
+            self.summary = " ".join(text.split())[:SUMMARY_LENGTH]
+
+    def add_page(self, body: HTMLNode):
+        for block in body.children:
+            self.add_block(block)
+
+    def to_dict(self) -> Dict:
+        return {
+            "title": self.title,
+            "links": self.links,
+            "images": self.images,
+            "terms": sorted(self.terms),
+            "summary": self.summary,
+            "anchors": self.anchors,
+        }
+
+
+def describe_markdown(markdown: str) -> Dict:
+    outline = Outline()
+    body = markdown_to_html(markdown, outline=outline)
+    info = PageInfo(outline.require_title())
+    info.add_page(body)
+    return info.to_dict()
+
+
+def page_url(output: str, dest_dir: str) -> str:
+    """Return the URL path an output file is served at, e.g. /blog/ or /a.html."""
+    url = "/" + os.path.relpath(output, dest_dir).replace(os.sep, "/")
+    if url.endswith("/index.html"):
+        url = url[: -len("index.html")]
+    return url
+
+
+class SiteIndex:
+    """The title, URL, summary, date and search terms of every page.
+
+    Entries are keyed by markdown source and carry the source hash, so an
+    incremental build only describes the pages it renders and the sitemap,
+    feed and search index can still be written for the whole site.
+    """
+
+    def __init__(self, path: Optional[str] = None, data: Optional[Dict] = None):
+        self.path: Optional[str] = path
+        data = data if data is not None else {}
+        self.pages: Dict[str, Dict] = data.get("pages", {})
+        # The site URL the feeds were last written for
+        self.site_url: Optional[str] = data.get("site_url")
+        # Set when an entry is added, changed or removed since loading
+        self.changed = False
+
+    def __repr__(self) -> str:
+        return f"SiteIndex(path='{self.path}', pages={len(self.pages)} pages)"
+
+    @classmethod
+    def load(cls, path: str) -> "SiteIndex":
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("format") != SITE_INDEX_FORMAT:
+            return cls(path)
+        return cls(path, data)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the site index to")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "format": SITE_INDEX_FORMAT,
+            "site_url": self.site_url,
+            "pages": self.pages,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def record_page(
+        self, source: str, source_hash: str, url: str, date: float, info: Dict
+    ):
+        entry = {
+            "hash": source_hash,
+            "url": url,
+            "date": date,
+            "title": info["title"],
+            "summary": info["summary"],
+            "terms": info["terms"],
+        }
+        if self.pages.get(source) != entry:
+            self.pages[source] = entry
+            self.changed = True
+
+    def is_current(self, source: str, source_hash: str) -> bool:
+        entry = self.pages.get(source)
+        return entry is not None and entry["hash"] == source_hash
+
+    def forget_page(self, source: str):
+        if self.pages.pop(source, None) is not None:
+            self.changed = True
+
+    def entries(self) -> List[Dict]:
+        return [self.pages[source] for source in sorted(self.pages)]
+
+
+def _iso_date(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+_DAY_NAMES = "Mon Tue Wed Thu Fri Sat Sun".split()
+_MONTH_NAMES = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+
+def _rfc822_date(timestamp: float) -> str:
+    # Same as email.utils.formatdate(usegmt=True), without importing email
+    t = time.gmtime(timestamp)
+    return (
+        f"{_DAY_NAMES[t.tm_wday]}, {t.tm_mday:02d} {_MONTH_NAMES[t.tm_mon - 1]}"
+        f" {t.tm_year:04d} {t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d} GMT"
+    )
+
+
+def render_sitemap(index: SiteIndex, site_url: str) -> str:
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for entry in sorted(index.entries(), key=lambda entry: entry["url"]):
+        lines.append(
+            f"<url><loc>{escape(site_url + entry['url'])}</loc>"
+            f"<lastmod>{_iso_date(entry['date'])}</lastmod></url>"
+        )
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def render_feed(index: SiteIndex, site_url: str, limit: int = FEED_ITEMS) -> str:
+    """Render an RSS 2.0 feed of the most recently changed pages."""
+    entries = sorted(
+        index.entries(), key=lambda entry: (-entry["date"], entry["url"])
+    )[:limit]
+    home = next((e for e in index.entries() if e["url"] == "/"), None)
+    title = home["title"] if home else site_url
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0"><channel>',
+        f"<title>{escape(title)}</title>",
+        f"<link>{escape(site_url)}/</link>",
+        f"<description>{escape(home['summary'] if home else title)}</description>",
+    ]
+    for entry in entries:
+        link = escape(site_url + entry["url"])
+        lines.append(
+            f"<item><title>{escape(entry['title'])}</title><link>{link}</link>"
+            f"<guid>{link}</guid>"
+            f"<pubDate>{_rfc822_date(entry['date'])}</pubDate>"
+            f"<description>{escape(entry['summary'])}</description></item>"
+        )
+    lines.append("</channel></rss>")
+    return "\n".join(lines) + "\n"
+
+
+def build_search_index(index: SiteIndex) -> Dict:
+    """Build a compact inverted index from every term to the pages holding it.
+
+    Terms are sorted and front coded: each is stored as the length of the
+    prefix it shares with the previous term plus the remaining suffix.
+    Posting lists hold page numbers as gaps from the previous number.
+    """
+    entries = index.entries()
+    postings: Dict[str, List[int]] = {}
+    for number, entry in enumerate(entries):
+        for term in entry["terms"]:
+            postings.setdefault(term, []).append(number)
+    prefixes, suffixes, gaps = [], [], []
+    previous = ""
+    for term in sorted(postings):
+        shared = os.path.commonprefix([previous, term])
+        prefixes.append(len(shared))
+        suffixes.append(term[len(shared) :])
+        numbers = postings[term]
+        gaps.append([numbers[0]] + [b - a for a, b in zip(numbers, numbers[1:])])
+        previous = term
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "pages": [[entry["url"], entry["title"]] for entry in entries],
+        "prefixes": prefixes,
+        "suffixes": suffixes,
+        "postings": gaps,
+    }
+
+
+def decode_search_index(data: Dict) -> Dict[str, List[int]]:
+    """Expand a search index back into term -> page numbers."""
+    terms = {}
+    term = ""
+    for shared, suffix, gaps in zip(
+        data["prefixes"], data["suffixes"], data["postings"]
+    ):
+        term = term[:shared] + suffix
+        numbers = []
+        number = 0
+        for gap in gaps:
+            number += gap
+            numbers.append(number)
+        terms[term] = numbers
+    return terms
+
+
+FEED_FILES = ("sitemap.xml", "rss.xml", "search_index.json")
+
+
+def write_feeds(index: SiteIndex, dest_dir: str, site_url: str) -> List[str]:
+    """Write sitemap.xml, rss.xml and search_index.json into dest_dir.
+
+    Nothing is rendered if the index and site URL did not change since the
+    index was loaded and the files are all there. Files whose contents did
+    not change are left untouched, and rewritten files lose their .gz and .br
+    sidecars. Returns the list of files written.
+    """
+    site_url = site_url.rstrip("/")
+    if site_url != index.site_url:
+        index.site_url = site_url
+        index.changed = True
+    if not index.changed and all(
+        os.path.exists(os.path.join(dest_dir, name)) for name in FEED_FILES
+    ):
+        return []
+    search_index = json.dumps(build_search_index(index), separators=(",", ":"))
+    outputs = {
+        "sitemap.xml": render_sitemap(index, site_url),
+        "rss.xml": render_feed(index, site_url),
+        "search_index.json": search_index,
+    }
+    os.makedirs(dest_dir, exist_ok=True)
+    written = []
+    for name, text in outputs.items():
+        path = os.path.join(dest_dir, name)
+        if write_if_changed(path, text.encode()):
+            remove_sidecars(path)
+            written.append(path)
+    return written
@@ -1,9 +1,35 @@
+import io
 import os
 import shutil
-from converters import *
+import time
+from functools import partial
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+from converters import (
+    Outline,
+    extract_title_from_blocks,
+    iter_markdown_blocks,
+    markdown_to_html,
+    parse_block,
+    shared_block_memo,
+    table_of_contents,
+)
+from feeds import PageInfo, describe_markdown, page_url
+from highlight import highlighter_fingerprint
+from htmlnode import ParentNode
+from instrumentation import NULL_PROFILER, Profiler
+from manifest import hash_file
+from output_writer import DEFAULT_THREADS, OutputWriter, remove_sidecars
+from scanner import scan_tree
+from templates import load_template
 
-def copy_files(src_dir, dest_dir, log_to_console=False, clean_dest=False):
+
+def copy_files(
+    src_dir, dest_dir, log_to_console=False, clean_dest=False, compressor=None
+):
     if not os.path.exists(src_dir):
         raise ValueError(f"Source directory '{src_dir}' does not exist.")
     if not os.path.isdir(src_dir):
@@ -16,68 +42,645 @@ def copy_files(src_dir, dest_dir, log_to_console=False, clean_dest=False):
     # Ensure the destination directory exists
     os.makedirs(dest_dir, exist_ok=True)
 
-    for root, dirs, files in os.walk(src_dir):
-        # Create corresponding directories in the destination
-        for dir_name in dirs:
-            src_path = os.path.join(root, dir_name)
-            rel_path = os.path.relpath(src_path, src_dir)
-            dest_path = os.path.join(dest_dir, rel_path)
-            os.makedirs(dest_path, exist_ok=True)
+    # Directories come before their contents, so their parents already exist
+    for entry in scan_tree(src_dir, dirs=True):
+        dest_path = os.path.join(dest_dir, entry.rel_path)
+        if entry.is_dir:
+            if not os.path.isdir(dest_path):
+                os.mkdir(dest_path)
             if log_to_console:
                 print(f"Directory copied: {dest_path}")
-
-        # Copy files
-        for file_name in files:
-            src_file = os.path.join(root, file_name)
-            rel_path = os.path.relpath(src_file, src_dir)
-            dest_file = os.path.join(dest_dir, rel_path)
-            shutil.copy2(src_file, dest_file)
+        else:
+            shutil.copy2(entry.path, dest_path)
+            if compressor is not None:
+                compressor.submit(dest_path)
             if log_to_console:
-                print(f"File copied: {dest_file}")
+                print(f"File copied: {dest_path}")
 
 
 # Example usage
 # copy_files("/path/to/source", "/path/to/destination", log_to_console=True, clean_dest=True)
 
+# ioctl request for cloning a whole file on copy-on-write filesystems
+# (btrfs, XFS, ...), from linux/fs.h
+FICLONE = 0x40049409
+
+
+def _reflink_file(src_file, dest_file):
+    if fcntl is None:
+        raise OSError("Reflinks are not supported on this platform")
+    with open(src_file, "rb") as src, open(dest_file, "wb") as dest:
+        fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+    shutil.copystat(src_file, dest_file)
+
+
+def _place_file(src_file, dest_file, link=None):
+    # Never write into an existing destination: it may be a hardlink to the
+    # source of an earlier sync
+    if os.path.lexists(dest_file):
+        os.remove(dest_file)
+    if link == "hardlink":
+        try:
+            os.link(src_file, dest_file)
+            return
+        except OSError:
+            pass
+    elif link == "reflink":
+        try:
+            _reflink_file(src_file, dest_file)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src_file, dest_file)
 
-def generate_page(from_path, template_path, dest_path, root_dir):
-    # Read the markdown file into a string
-    with open(from_path, "r") as file:
-        content = file.read()
 
-    # Placeholder for parsing logic (could be converting markdown to HTML)
-    title = extract_title(content)
-    parsed_content = markdown_to_html(content).to_html()
+def _asset_up_to_date(record, dest_file, compare, previous):
+    try:
+        dest_stat = os.stat(dest_file)
+    except FileNotFoundError:
+        return False
+    if dest_stat.st_size != record["size"]:
+        return False
+    if compare == "hash":
+        if previous is not None and previous.get("hash") == record["hash"]:
+            return True
+        return hash_file(dest_file) == record["hash"]
+    return dest_stat.st_mtime_ns == record["mtime_ns"]
 
-    # Read the HTML template into a string
-    with open(template_path, "r") as template_file:
-        template_content = template_file.read()
 
-    # Combine template and parsed content (placeholder)
+def sync_files(
+    src_dir,
+    dest_dir,
+    manifest=None,
+    compare="mtime",
+    link=None,
+    log_to_console=False,
+    compressor=None,
+):
+    """Mirror src_dir into dest_dir, copying only files that changed.
+
+    compare is "mtime" (size and modification time, the default) or "hash"
+    (sha256 of the contents, reusing the manifest's hash while the source's
+    size and mtime are unchanged). link is None, "hardlink" or "reflink";
+    files fall back to a plain copy where the filesystem refuses the link.
+    With a BuildManifest, files placed by an earlier sync whose source has
+    since been deleted are removed. With a Compressor, files that were copied
+    or still lack their sidecars are compressed; without one, the sidecars of
+    files that were copied are removed. Returns the list of files written.
+    """
+    if not os.path.exists(src_dir):
+        raise ValueError(f"Source directory '{src_dir}' does not exist.")
+    if not os.path.isdir(src_dir):
+        raise ValueError(f"Source path '{src_dir}' is not a directory.")
+    if compare not in ("mtime", "hash"):
+        raise ValueError(f"Unsupported compare mode '{compare}'")
+    if link not in (None, "hardlink", "reflink"):
+        raise ValueError(f"Unsupported link mode '{link}'")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    previous_assets = manifest.assets if manifest is not None else {}
+    assets = {}
+    written = []
 
-    full_content = template_content.replace("{{ Title }}", title)
-    full_content = full_content.replace("{{ Content }}", parsed_content)
+    dest_dirs = {dest_dir}
+    for entry in scan_tree(src_dir):
+        rel_path = entry.rel_path
+        dest_file = os.path.join(dest_dir, rel_path)
+        record = {"size": entry.stat.st_size, "mtime_ns": entry.stat.st_mtime_ns}
+        previous = previous_assets.get(rel_path)
+        if compare == "hash":
+            if (
+                previous is not None
+                and "hash" in previous
+                and previous["size"] == record["size"]
+                and previous["mtime_ns"] == record["mtime_ns"]
+            ):
+                record["hash"] = previous["hash"]
+            else:
+                record["hash"] = hash_file(entry.path)
+        assets[rel_path] = record
 
+        if _asset_up_to_date(record, dest_file, compare, previous):
+            if compressor is not None and compressor.sidecars_missing(dest_file):
+                compressor.submit(dest_file)
+            continue
+        # Only create each destination directory once, and only if needed
+        dest_root = os.path.dirname(dest_file)
+        if dest_root not in dest_dirs:
+            os.makedirs(dest_root, exist_ok=True)
+            dest_dirs.add(dest_root)
+        _place_file(entry.path, dest_file, link)
+        written.append(dest_file)
+        if compressor is not None:
+            compressor.submit(dest_file)
+        else:
+            remove_sidecars(dest_file)
+        if log_to_console:
+            print(f"File copied: {dest_file}")
+
+    for rel_path in set(previous_assets) - set(assets):
+        dest_file = os.path.join(dest_dir, rel_path)
+        remove_output(dest_file, dest_dir)
+        if log_to_console:
+            print(f"File removed: {dest_file}")
+
+    if manifest is not None:
+        manifest.assets = assets
+    return written
+
+
+# Markdown files larger than this are parsed and written block by block
+STREAM_THRESHOLD = 16 * 2**20
+
+
+def page_output_path(from_path, root_dir, dest_path):
     # Determine the new file path in the destination directory (excluding the root folder)
     relative_path = os.path.relpath(from_path, root_dir)
-    dest_file_path = os.path.join(
-        dest_path, os.path.splitext(relative_path)[0] + ".html"
-    )
+    return os.path.join(dest_path, os.path.splitext(relative_path)[0] + ".html")
+
+
+def generate_page(
+    from_path,
+    template_path,
+    dest_path,
+    root_dir,
+    slots=None,
+    profiler=NULL_PROFILER,
+    render_cache=None,
+    memoize_blocks=False,
+    writer=None,
+    page_info=None,
+    stream_threshold=STREAM_THRESHOLD,
+    highlight_cache=None,
+    images=None,
+):
+    if stream_threshold is not None and os.path.getsize(from_path) > stream_threshold:
+        return _generate_page_streaming(
+            from_path,
+            template_path,
+            dest_path,
+            root_dir,
+            slots,
+            profiler,
+            page_info,
+            highlight_cache,
+            images,
+        )
+
+    # Read the markdown file into a string
+    with profiler.stage("read", from_path):
+        with open(from_path, "r") as file:
+            content = file.read()
+
+    # Reuse the title and body rendered for identical markdown by an earlier
+    # build, e.g. when only the template changed
+    cached = None
+    if render_cache is not None:
+        with profiler.stage("render_cache", from_path):
+            # Pages carry the output of the highlighters and the sizes of
+            # their images, whose relative URLs resolve against the page's
+            # directory
+            context = highlighter_fingerprint()
+            if images is not None:
+                source_dir = os.path.dirname(os.path.relpath(from_path, root_dir))
+                context += f"{images.fingerprint()}\0{source_dir}"
+            cache_key = render_cache.key(content, context)
+            cached = render_cache.get(cache_key)
+        profiler.count("render_cache_hits" if cached else "render_cache_misses")
+
+    if cached:
+        title, body, headings, info = cached
+        if page_info is not None:
+            page_info.update(info)
+    else:
+        memo = shared_block_memo() if memoize_blocks else None
+        if memo is not None:
+            hits, misses = memo.hits, memo.misses
+        # The title and headings are collected while the blocks are parsed
+        outline = Outline()
+        with profiler.stage("markdown_to_html", from_path):
+            body = markdown_to_html(content, memo, outline, highlight_cache)
+            if images is not None:
+                source = os.path.relpath(from_path, root_dir)
+                body.children = [
+                    images.annotate(block, source) for block in body.children
+                ]
+        title = outline.require_title()
+        headings = outline.headings
+        if memo is not None:
+            profiler.count("block_memo_hits", memo.hits - hits)
+            profiler.count("block_memo_misses", memo.misses - misses)
+        if page_info is not None:
+            info = PageInfo(title)
+            info.add_page(body)
+            page_info.update(info.to_dict())
+        if render_cache is not None:
+            # Serialized from the body itself, so the entry never depends on
+            # how the template uses it
+            with profiler.stage("render_cache", from_path):
+                with render_cache.open_entry(
+                    cache_key, title, headings, page_info
+                ) as cache_file:
+                    body.write_html(cache_file)
+
+    # The compiled template is cached, so it is only read and parsed again
+    # when the file changes
+    with profiler.stage("load_template", from_path):
+        template = load_template(template_path)
+    values = dict(slots) if slots else {}
+    values["Title"] = title
+    values["TableOfContents"] = table_of_contents(headings) or ""
+    values["Content"] = body
 
-    # Ensure destination directory exists
+    dest_file_path = page_output_path(from_path, root_dir, dest_path)
+
+    if writer is not None:
+        # Render in memory, encoding as the page streams, and leave the disk
+        # I/O to the writer's threads, which skip outputs that already hold
+        # the same bytes
+        with profiler.stage("write", from_path):
+            buffer = io.BytesIO()
+            text = io.TextIOWrapper(buffer, encoding="utf-8")
+            template.render_to(text, values)
+            text.flush()
+            data = buffer.getvalue()
+        writer.write(dest_file_path, data)
+        size = len(data)
+    else:
+        # Ensure destination directory exists
+        os.makedirs(os.path.dirname(dest_file_path), exist_ok=True)
+        # Write the generated HTML to the destination, streaming the page
+        # body
+        with profiler.stage("write", from_path):
+            with open(dest_file_path, "w") as dest_file:
+                template.render_to(dest_file, values)
+        size = os.path.getsize(dest_file_path)
+        # Sidecars of the old page no longer match; a Compressor writes new
+        # ones
+        remove_sidecars(dest_file_path)
+    if profiler.enabled:
+        profiler.count("pages")
+        profiler.count("bytes_written", size)
+    return dest_file_path
+
+
+def _parse_blocks(blocks, info, highlight_cache=None, images=None, source=None):
+    outline = Outline()
+    for block in blocks:
+        node = outline.add_block(parse_block(block, highlight_cache))
+        if images is not None:
+            node = images.annotate(node, source)
+        if info is not None:
+            info.add_block(node)
+        yield node
+
+
+def _generate_page_streaming(
+    from_path,
+    template_path,
+    dest_path,
+    root_dir,
+    slots,
+    profiler,
+    page_info,
+    highlight_cache=None,
+    images=None,
+):
+    # Only the block being parsed is held in memory: the body is a ParentNode
+    # whose children are parsed lazily while the template streams it to disk.
+    # Blocks are not memoized or cached, as that would keep them alive. The
+    # title is read ahead of the body, and there is no table of contents as
+    # the headings are only known once the body has been written.
+    template = load_template(template_path)
+    dest_file_path = page_output_path(from_path, root_dir, dest_path)
     os.makedirs(os.path.dirname(dest_file_path), exist_ok=True)
+    tmp_path = f"{dest_file_path}.{os.getpid()}.tmp"
+    with open(from_path, "r") as file:
+        with profiler.stage("extract_title", from_path):
+            # Read from the blocks, as Outline does for parsed pages
+            title = extract_title_from_blocks(iter_markdown_blocks(file))
+        file.seek(0)
+        values = dict(slots) if slots else {}
+        values["Title"] = title
+        info = PageInfo(title) if page_info is not None else None
+        blocks = _parse_blocks(
+            iter_markdown_blocks(file),
+            info,
+            highlight_cache,
+            images,
+            os.path.relpath(from_path, root_dir),
+        )
+        values["Content"] = ParentNode("div", blocks)
+        # Written next to the output and renamed into place, so a page that
+        # fails halfway leaves the previous output intact
+        try:
+            with profiler.stage("write", from_path):
+                with open(tmp_path, "w") as dest_file:
+                    template.render_to(dest_file, values)
+            os.replace(tmp_path, dest_file_path)
+            remove_sidecars(dest_file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    if info is not None:
+        page_info.update(info.to_dict())
+    if profiler.enabled:
+        profiler.count("pages")
+        profiler.count("streamed_pages")
+        profiler.count("bytes_written", os.path.getsize(dest_file_path))
+    return dest_file_path
+
+
+def remove_output(output_path, dest_dir_path):
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    remove_sidecars(output_path)
+    # Prune directories left empty by the removal, but never the output root
+    directory = os.path.dirname(output_path)
+    dest_root = os.path.abspath(dest_dir_path)
+    while os.path.abspath(directory).startswith(dest_root + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+class PageBuildError(ValueError):
+    """Raised after a build in which one or more pages failed to render."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        details = "\n".join(f"{path}: {error!r}" for path, error in errors.items())
+        super().__init__(f"{len(errors)} page(s) failed to build:\n{details}")
+
+
+class _WriteBuffer:
+    """Holds the files rendered in a worker process for the parent's writer."""
+
+    def __init__(self):
+        self.files = []
+
+    def write(self, path, data):
+        self.files.append((path, data))
 
-    # Write the generated HTML to the destination
-    with open(dest_file_path, "w") as dest_file:
-        dest_file.write(full_content)
 
+def _generate_page_job(
+    job, profile=False, buffer_writes=False, collect_page_info=False, **page_options
+):
+    # Runs in worker processes, so failures are returned rather than raised and
+    # timings travel back as a plain snapshot
+    profiler = Profiler() if profile else NULL_PROFILER
+    buffer = _WriteBuffer() if buffer_writes else None
+    if buffer is not None:
+        page_options["writer"] = buffer
+    page_info = {} if collect_page_info else None
+    start = time.perf_counter()
+    try:
+        output = generate_page(
+            *job, profiler=profiler, page_info=page_info, **page_options
+        )
+        error = None
+    except Exception as caught:
+        output, error = None, caught
+    return (
+        job[0],
+        output,
+        error,
+        profiler.snapshot() if profile else None,
+        buffer.files if buffer is not None else None,
+        page_info,
+        time.perf_counter() - start,
+    )
+
+
+def render_pages(jobs, workers=1, profile=False, writer=None, **page_options):
+    """Yield (from_path, output_path, error, timings, page_info, seconds) per job.
+
+    With more than one worker the jobs are spread across a process pool.
+    Results always come back in job order, so the outcome is identical to a
+    serial build. timings is a Profiler snapshot when profile is set, and
+    page_options are passed on to generate_page. With an OutputWriter, workers
+    send the rendered pages back and this process hands them to the writer.
+    With collect_page_info, page_info is the PageInfo.to_dict() of every page,
+    and is empty for render cache hits on entries written without it. seconds
+    is the time the page took to render in its worker.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        run_job = partial(
+            _generate_page_job, profile=profile, writer=writer, **page_options
+        )
+        results = map(run_job, jobs)
+        executor = None
+    else:
+        # Imported here as multiprocessing is slow to import and only
+        # parallel builds need it
+        from concurrent.futures import ProcessPoolExecutor
+
+        run_job = partial(
+            _generate_page_job,
+            profile=profile,
+            buffer_writes=writer is not None,
+            **page_options,
+        )
+        workers = min(workers, len(jobs))
+        chunksize = max(1, len(jobs) // (workers * 4))
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(run_job, jobs, chunksize=chunksize)
+    try:
+        for from_path, output, error, timings, files, page_info, seconds in results:
+            for path, data in files or ():
+                writer.write(path, data)
+            yield from_path, output, error, timings, page_info, seconds
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def generate_pages_recursive(
+    dir_path_content,
+    template_path,
+    dest_dir_path,
+    manifest=None,
+    log_to_console=False,
+    workers=1,
+    profiler=NULL_PROFILER,
+    render_cache=None,
+    memoize_blocks=False,
+    writer_threads=DEFAULT_THREADS,
+    dependency_graph=None,
+    site_index=None,
+    rebuild=(),
+    highlight_cache=None,
+    images=None,
+    compressor=None,
+):
+    """Render every markdown file under dir_path_content into dest_dir_path.
+
+    Pages are rendered in sorted path order across `workers` processes;
+    failures are raised together as a PageBuildError once every other page
+    has been written. Returns the list of output files that were written.
+
+    manifest: a BuildManifest; only pages out of date in it are rendered, and
+        outputs whose source was deleted are removed. Without one every page
+        is rendered.
+    rebuild: sources rendered even if the manifest has them up to date.
+    profiler: collects stage timings for the scan and every page.
+    render_cache: a RenderCache of previously rendered bodies.
+    memoize_blocks: parse blocks repeated across pages once per process.
+    writer_threads: threads of the OutputWriter; 0 writes synchronously.
+    dependency_graph, site_index: record the references and the feed entry of
+        every rendered page.
+    highlight_cache: a HighlightCache reused for code blocks across builds.
+    images: an ImageIndex giving img nodes the size of their image.
+    compressor: a Compressor making sidecars for pages that changed.
+    """
+    start_time = time.perf_counter()
+    full_rebuild = True
+    if manifest is not None:
+        template_hash = hash_file(template_path)
+        highlighters = highlighter_fingerprint()
+        full_rebuild = manifest.needs_full_rebuild(template_hash, highlighters)
+    seen = set()
+    jobs = []
+    pending = {}
+    stores = [store for store in (dependency_graph, site_index) if store is not None]
+
+    with profiler.stage("scan"):
+        for entry in scan_tree(dir_path_content, suffix=".md"):
+            from_path = entry.path
+            job = (from_path, template_path, dest_dir_path, dir_path_content)
+            if manifest is None and not stores:
+                jobs.append(job)
+                continue
+            source = entry.rel_path
+            seen.add(source)
+            source_hash = hash_file(from_path)
+            output = os.path.join(dest_dir_path, source[: -len(".md")] + ".html")
+            if (
+                manifest is None
+                or full_rebuild
+                or source in rebuild
+                or manifest.is_stale(source, source_hash, output)
+            ):
+                jobs.append(job)
+                pending[from_path] = (source, source_hash)
+            else:
+                manifest.record_page(source, source_hash, output)
+                if compressor is not None and compressor.sidecars_missing(output):
+                    compressor.submit(output)
+
+    generated = []
+    errors = {}
+    writer = None
+    if writer_threads and jobs:
+        writer = OutputWriter(writer_threads, compressor=compressor)
+    # The speedup is the time the pages took to render over the wall time
+    # spent rendering them
+    render_start = time.perf_counter()
+    page_seconds = 0.0
+    try:
+        for from_path, output, error, timings, page_info, seconds in render_pages(
+            jobs,
+            workers,
+            profiler.enabled,
+            writer=writer,
+            collect_page_info=bool(stores),
+            render_cache=render_cache,
+            memoize_blocks=memoize_blocks,
+            highlight_cache=highlight_cache,
+            images=images,
+        ):
+            page_seconds += seconds
+            if timings is not None:
+                profiler.merge(timings)
+            if error is not None:
+                errors[from_path] = error
+                continue
+            generated.append((from_path, output, page_info))
+    finally:
+        if writer is not None:
+            with profiler.stage("write_wait"):
+                writer.close()
+    render_seconds = time.perf_counter() - render_start
+
+    if writer is not None:
+        if profiler.enabled:
+            profiler.count("outputs_unchanged", len(writer.unchanged))
+        failed_writes = {output: from_path for from_path, output, _ in generated}
+        for output, error in writer.errors.items():
+            errors[failed_writes[output]] = error
+        generated = [page for page in generated if page[0] not in errors]
+    # Pages the writer handled were passed to the compressor already
+    compressed = set(writer.written + writer.unchanged) if writer else set()
+    for from_path, error in errors.items():
+        if manifest is not None:
+            # Forget the page so the next build retries it
+            manifest.forget_page(pending[from_path][0])
+        for store in stores:
+            store.forget_page(pending[from_path][0])
+    for from_path, output, page_info in generated:
+        if manifest is not None:
+            manifest.record_page(*pending[from_path], output)
+        if stores:
+            source, source_hash = pending[from_path]
+            if not page_info and not all(
+                store.is_current(source, source_hash) for store in stores
+            ):
+                # A render cache hit on an entry stored without page info, for
+                # a page that was never described
+                with open(from_path, "r") as file:
+                    page_info = describe_markdown(file.read())
+            if page_info and dependency_graph is not None:
+                dependency_graph.record_page(
+                    source,
+                    source_hash,
+                    template_path,
+                    page_info["links"],
+                    page_info["images"],
+                    page_info["anchors"],
+                )
+            if page_info and site_index is not None:
+                site_index.record_page(
+                    source,
+                    source_hash,
+                    page_url(output, dest_dir_path),
+                    os.path.getmtime(from_path),
+                    page_info,
+                )
+        if compressor is not None and output not in compressed:
+            # Streamed pages are written in place rather than by the writer
+            compressor.submit(output)
+        if log_to_console:
+            print(f"Page generated: {output}")
+    generated = [output for _, output, _ in generated]
+
+    if manifest is not None:
+        for source in set(manifest.pages) - seen:
+            output = manifest.forget_page(source)
+            remove_output(output, dest_dir_path)
+            if log_to_console:
+                print(f"Page removed: {output}")
+        manifest.record_build(template_hash, highlighters)
+    for store in stores:
+        for source in set(store.pages) - seen:
+            store.forget_page(source)
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path):
-    for root, dirs, files in os.walk(dir_path_content):
-        for file in files:
-            if file.endswith(".md"):  # Look for markdown files
-                from_path = os.path.join(root, file)
-                generate_page(from_path, template_path, dest_dir_path, dir_path_content)
+    if log_to_console:
+        elapsed = time.perf_counter() - start_time
+        unchanged = f", {len(writer.unchanged)} unchanged on disk" if writer else ""
+        used_workers = max(1, min(workers, len(jobs)))
+        speedup = ""
+        if used_workers > 1 and render_seconds > 0:
+            speedup = f" ({page_seconds / render_seconds:.1f}x speedup)"
+        print(
+            f"Generated {len(generated)} page(s) in {elapsed:.3f}s"
+            f" with {used_workers} worker(s){speedup}{unchanged}"
+        )
+    if errors:
+        raise PageBuildError(errors)
+    return generated
 
 
 # Example usage
@@ -0,0 +1,236 @@
+import builtins
+import io
+import keyword
+import os
+import tokenize
+from html import escape
+from typing import Callable, Dict, Optional, Tuple
+from manifest import hash_bytes
+
+# Bump when the HTML around highlighted code changes, so cached snippets from
+# older versions are not reused
+HIGHLIGHT_VERSION = 1
+
+# Highlighters by language: (highlight(code) -> HTML, id used in cache keys)
+_highlighters: Dict[str, Tuple[Callable[[str], str], str]] = {}
+_pygments_highlighters: Dict[str, Optional[Tuple[Callable[[str], str], str]]] = {}
+_fingerprint: Optional[str] = None
+
+
+def register_highlighter(
+    language: str, highlight: Callable[[str], str], version: str = "1"
+):
+    """Highlight ```language code blocks with highlight(code).
+
+    highlight returns the HTML placed inside <code> and must escape the code
+    itself. Its name and version are part of the cache key, so bump version
+    when its output changes. Registered highlighters take precedence over
+    Pygments.
+    """
+    global _fingerprint
+    _highlighters[language.lower()] = (highlight, _highlighter_name(highlight, version))
+    _fingerprint = None
+
+
+def unregister_highlighter(language: str):
+    global _fingerprint
+    _highlighters.pop(language.lower(), None)
+    _fingerprint = None
+
+
+def _highlighter_name(highlight: Callable[[str], str], version: str) -> str:
+    return f"{highlight.__module__}.{highlight.__qualname__}:{version}"
+
+
+def _pygments_highlighter(language: str):
+    # Pygments is optional and only imported once a code block names a
+    # language no registered highlighter handles
+    if language in _pygments_highlighters:
+        return _pygments_highlighters[language]
+    found = None
+    try:
+        from pygments import __version__, highlight
+        from pygments.formatters import HtmlFormatter
+        from pygments.lexers import get_lexer_by_name
+        from pygments.util import ClassNotFound
+    except ImportError:
+        pass
+    else:
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            pass
+        else:
+            formatter = HtmlFormatter(nowrap=True)
+            found = (
+                lambda code: highlight(code, lexer, formatter).rstrip("\n"),
+                f"pygments-{__version__}",
+            )
+    _pygments_highlighters[language] = found
+    return found
+
+
+# Pygments token classes for the Python tokens highlight_python marks up
+_PYTHON_CLASSES = {
+    tokenize.COMMENT: "c",
+    tokenize.NUMBER: "m",
+    tokenize.OP: "o",
+    tokenize.STRING: "s",
+}
+_PYTHON_BUILTINS = frozenset(dir(builtins))
+
+
+def _python_class(token: tokenize.TokenInfo) -> Optional[str]:
+    if token.type == tokenize.NAME:
+        if keyword.iskeyword(token.string) or keyword.issoftkeyword(token.string):
+            return "k"
+        return "nb" if token.string in _PYTHON_BUILTINS else None
+    if tokenize.tok_name[token.type].startswith("FSTRING"):
+        return "s"
+    return _PYTHON_CLASSES.get(token.type)
+
+
+def highlight_python(code: str) -> str:
+    """Highlight Python with the standard library tokenizer.
+
+    Tokens get the same classes as Pygments' short names, so one stylesheet
+    covers both. Code the tokenizer rejects is only escaped.
+    """
+    offsets = [0]
+    for line in code.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    parts = []
+    position = 0
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type == tokenize.ERRORTOKEN and not token.string.isspace():
+                return escape(code, quote=False)
+            css_class = _python_class(token)
+            if css_class is None or not token.string:
+                continue
+            (start_row, start_col), (end_row, end_col) = token.start, token.end
+            start = offsets[start_row - 1] + start_col
+            end = offsets[end_row - 1] + end_col
+            parts.append(escape(code[position:start], quote=False))
+            text = escape(code[start:end], quote=False)
+            parts.append(f'<span class="{css_class}">{text}</span>')
+            position = end
+    except (tokenize.TokenError, SyntaxError):
+        return escape(code, quote=False)
+    parts.append(escape(code[position:], quote=False))
+    return "".join(parts)
+
+
+# Highlighters used when neither a registered highlighter nor Pygments
+# handles a language, so a build without Pygments still highlights code
+_builtin_highlighters: Dict[str, Tuple[Callable[[str], str], str]] = {
+    language: (highlight_python, _highlighter_name(highlight_python, "1"))
+    for language in ("python", "py")
+}
+
+
+def find_highlighter(language: str) -> Optional[Tuple[Callable[[str], str], str]]:
+    """Return (highlight, name) for language, or None if nothing handles it."""
+    language = language.lower()
+    found = _highlighters.get(language)
+    if found is None:
+        found = _pygments_highlighter(language)
+    if found is None:
+        found = _builtin_highlighters.get(language)
+    return found
+
+
+def highlighter_fingerprint() -> str:
+    """Identify every highlighter a build can use.
+
+    Covers the registered and built-in highlighters and the installed
+    Pygments version, so caches and incremental builds notice when
+    highlighted output may change.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        try:
+            from pygments import __version__ as pygments_version
+        except ImportError:
+            pygments_version = None
+        parts = [f"{HIGHLIGHT_VERSION}", f"pygments={pygments_version}"]
+        for prefix, highlighters in (
+            ("builtin", _builtin_highlighters),
+            ("registered", _highlighters),
+        ):
+            parts.extend(
+                f"{prefix}:{language}={name}"
+                for language, (_, name) in sorted(highlighters.items())
+            )
+        _fingerprint = hash_bytes("\0".join(parts).encode())
+    return _fingerprint
+
+
+class HighlightCache:
+    """On-disk cache of highlighted code blocks.
+
+    Entries are keyed by the hash of the language, the highlighter's name
+    and the code, so a snippet is only highlighted again when one of them
+    changes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"HighlightCache(directory='{self.directory}')"
+
+    def key(self, language: str, highlighter: str, code: str) -> str:
+        return hash_bytes(
+            f"{HIGHLIGHT_VERSION}\0{language}\0{highlighter}\0{code}".encode()
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".html")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), "r") as file:
+                html = file.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return html
+
+    def put(self, key: str, html: str):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(html)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith(".html"):
+                os.remove(os.path.join(self.directory, name))
+
+
+def highlight_code(
+    code: str, language: str, cache: Optional[HighlightCache] = None
+) -> Optional[str]:
+    """Return code highlighted as HTML, or None if no highlighter handles it."""
+    found = find_highlighter(language)
+    if found is None:
+        return None
+    highlight, name = found
+    if cache is None:
+        return highlight(code)
+    key = cache.key(language.lower(), name, code)
+    html = cache.get(key)
+    if html is None:
+        html = highlight(code)
+        cache.put(key, html)
+    return html
@@ -1,8 +1,78 @@
 from functools import reduce
-from typing import List, Dict, Optional
+from types import MappingProxyType
+from typing import List, Dict, Optional, Tuple
+
+# Shared, immutable stand-ins for the children and props of nodes that have
+# none, so a page of leaves doesn't allocate an empty list and dict per node
+EMPTY_CHILDREN = ()
+EMPTY_PROPS = MappingProxyType({})
+
+# Rendered (open, close) tags by tag and props items. Pages repeat a handful
+# of tags and attribute sets (<p>, <li>, the same link or image on every
+# page), so most tags are rendered once per process
+TAG_CACHE_SIZE = 4096
+_tag_cache: Dict[tuple, Tuple[str, str]] = {}
+
+
+def render_tags(tag: str, props) -> Tuple[str, str]:
+    """Return the opening and closing tag of an element, cached by contents."""
+    key = (tag, *props.items()) if props else tag
+    tags = _tag_cache.get(key)
+    if tags is None:
+        attributes = "".join(f' {name}="{value}"' for name, value in props.items())
+        tags = (f"<{tag}{attributes}>", f"</{tag}>")
+        if len(_tag_cache) >= TAG_CACHE_SIZE:
+            _tag_cache.clear()
+        _tag_cache[key] = tags
+    return tags
+
+
+def render_html(node: "HTMLNode") -> str:
+    """Render node to a string without recursion.
+
+    The chunks of the whole tree are appended to one list and joined once,
+    so no intermediate string is built per parent node.
+    """
+    parts = []
+    _render(node, parts.append)
+    return "".join(parts)
+
+
+def _render(root: "HTMLNode", emit):
+    # Walks the tree with an explicit stack of child iterators, so deep
+    # nesting can't hit the recursion limit and children may be generators.
+    # emit receives each leaf in one chunk and each parent's tags separately.
+    stack = [(iter((root,)), None)]
+    while stack:
+        children, close = stack[-1]
+        for node in children:
+            node_type = type(node)
+            if node_type is LeafNode:
+                if node.tag:
+                    open_tag, close_tag = render_tags(node.tag, node.props)
+                    emit(open_tag + node.value + close_tag)
+                else:
+                    emit(node.value)
+            elif node_type is ParentNode:
+                if not node.tag:
+                    raise ValueError("Tag is required for ParentNode")
+                if not node.children:
+                    raise ValueError("Children are required for ParentNode")
+                open_tag, close_tag = render_tags(node.tag, node.props)
+                emit(open_tag)
+                stack.append((iter(node.children), close_tag))
+                break
+            else:
+                emit(node.to_html())
+        else:
+            stack.pop()
+            if close is not None:
+                emit(close)
 
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: Optional[str] = None,
@@ -16,16 +86,26 @@ class HTMLNode:
         self.props: Dict[str, str] = props if props is not None else {}
 
     def __repr__(self) -> str:
-        return f"HTMLNode(tag='{self.tag}', value='{self.value}', children={len(self.children)} children, props={self.props})"
+        return f"HTMLNode(tag='{self.tag}', value='{self.value}', children={len(self.children)} children, props={dict(self.props)})"
 
     def to_html(self):
         raise NotImplemented
 
+    def write_html(self, out):
+        """Serialize the node into out, which can be any object with write(str).
+
+        Chunks are written as the tree is walked, so the full document is never
+        built as one string.
+        """
+        _render(self, out.write)
+
     def props_to_html(self):
         return " ".join(f'{key}="{value}"' for key, value in self.props.items())
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: Optional[str] = None,
@@ -34,7 +114,9 @@ class LeafNode(HTMLNode):
     ):
         if value is None:
             raise ValueError()
-        super().__init__(tag, value, None, props)
+        super().__init__(
+            tag, value, EMPTY_CHILDREN, props if props is not None else EMPTY_PROPS
+        )
 
     def to_html(self) -> str:
         props = ""
@@ -48,6 +130,8 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: Optional[str] = None,
@@ -56,19 +140,9 @@ class ParentNode(HTMLNode):
     ):
         if not children:
             raise ValueError("INIT: Children are required for ParentNode")
-        super().__init__(tag, None, children, props)
+        super().__init__(
+            tag, None, children, props if props is not None else EMPTY_PROPS
+        )
 
     def to_html(self) -> str:
-        props = ""
-        children_html = ""
-        if not self.tag:
-            raise ValueError("Tag is required for ParentNode")
-        if self.children:
-            children_html = children_html = "".join(
-                child.to_html() for child in self.children
-            )
-        else:
-            raise ValueError("Children are required for ParentNode")
-        if self.props:
-            props = " " + self.props_to_html()
-        return f"<{self.tag}{props}>{children_html}</{self.tag}>"
+        return render_html(self)
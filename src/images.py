@@ -0,0 +1,448 @@
+import copy
+import json
+import os
+import posixpath
+import shutil
+import struct
+import zlib
+from operator import add
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from depgraph import resolve_url
+from htmlnode import HTMLNode, LeafNode
+from manifest import hash_bytes, hash_file
+from scanner import scan_tree
+
+IMAGE_INDEX_FORMAT = 1
+# Bump when resize_png produces different pixels, so cached variants from
+# older versions are not reused
+RESIZE_VERSION = 1
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Channels per pixel of each PNG color type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# Start of frame markers hold a JPEG's size; C4, C8 and CC are other segments
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length or payload
+JPEG_STANDALONE_MARKERS = set(range(0xD0, 0xD8)) | {0x01}
+
+
+def _jpeg_size(file) -> Optional[Tuple[int, int]]:
+    # Walk the segments after the SOI marker, reading only their headers,
+    # until the frame header is found
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        kind = marker[1]
+        while kind == 0xFF:
+            fill = file.read(1)
+            if not fill:
+                return None
+            kind = fill[0]
+        if kind in JPEG_STANDALONE_MARKERS:
+            continue
+        if kind in (0xD9, 0xDA):
+            # End of image, or the scan data started before any frame header
+            return None
+        header = file.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+        if kind in JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """Return the (width, height) of a PNG, JPEG or GIF file, or None.
+
+    Only the headers are read, the pixels are never decoded.
+    """
+    with open(path, "rb") as file:
+        head = file.read(24)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            return _jpeg_size(file)
+    return None
+
+
+def _png_chunks(data: bytes):
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos : pos + 8])
+        yield kind, data[pos + 8 : pos + 8 + length]
+        pos += length + 12
+
+
+def _png_chunk(kind: bytes, body: bytes) -> bytes:
+    crc = zlib.crc32(kind + body)
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", crc)
+
+
+def _paeth(left: int, up: int, up_left: int) -> int:
+    estimate = left + up - up_left
+    to_left, to_up = abs(estimate - left), abs(estimate - up)
+    to_up_left = abs(estimate - up_left)
+    if to_left <= to_up and to_left <= to_up_left:
+        return left
+    return up if to_up <= to_up_left else up_left
+
+
+def _unfilter_rows(raw: bytes, stride: int, height: int, bpp: int) -> List[bytes]:
+    rows = []
+    previous = bytes(stride)
+    pos = 0
+    for _ in range(height):
+        kind = raw[pos]
+        row = bytearray(raw[pos + 1 : pos + 1 + stride])
+        pos += stride + 1
+        if kind == 1:
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif kind == 2:
+            row = bytearray((a + b) & 0xFF for a, b in zip(row, previous))
+        elif kind == 3:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(stride):
+                if i >= bpp:
+                    predictor = _paeth(row[i - bpp], previous[i], previous[i - bpp])
+                else:
+                    predictor = previous[i]
+                row[i] = (row[i] + predictor) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"Unknown PNG filter type {kind}")
+        rows.append(bytes(row))
+        previous = row
+    return rows
+
+
+def _spans(size: int, new_size: int) -> List[Tuple[int, int]]:
+    # The source range each output pixel covers; never empty
+    spans = []
+    for i in range(new_size):
+        start = i * size // new_size
+        spans.append((start, max(start + 1, (i + 1) * size // new_size)))
+    return spans
+
+
+def resize_png(data: bytes, width: int) -> bytes:
+    """Scale a PNG down to width pixels wide, keeping its aspect ratio.
+
+    Pixels are averaged over the area each output pixel covers, except in
+    palette images, which keep the nearest source pixel. Only 8-bit,
+    non-interlaced images are supported; others raise a ValueError.
+    """
+    header, palette, idat = None, [], []
+    for kind, body in _png_chunks(data):
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind in (b"PLTE", b"tRNS"):
+            palette.append((kind, body))
+        elif kind == b"IDAT":
+            idat.append(body)
+    if header is None:
+        raise ValueError("PNG file has no IHDR chunk")
+    src_width, src_height, depth, color_type, _, _, interlace = header
+    if depth != 8 or interlace or color_type not in PNG_CHANNELS:
+        raise ValueError("Only 8-bit non-interlaced PNG files can be resized")
+    if not 0 < width < src_width:
+        raise ValueError(f"Can't resize a {src_width}px wide PNG to {width}px")
+    height = max(1, round(src_height * width / src_width))
+    channels = PNG_CHANNELS[color_type]
+    rows = _unfilter_rows(
+        zlib.decompress(b"".join(idat)), src_width * channels, src_height, channels
+    )
+
+    columns = _spans(src_width, width)
+    out = []
+    for top, bottom in _spans(src_height, height):
+        if color_type == 3:
+            row = rows[top]
+            out.append(bytes(row[left] for left, _ in columns))
+            continue
+        sums = rows[top]
+        for row in rows[top + 1 : bottom]:
+            sums = list(map(add, sums, row))
+        line = bytearray()
+        for left, right in columns:
+            count = (right - left) * (bottom - top)
+            end = right * channels
+            for channel in range(left * channels, left * channels + channels):
+                total = sum(sums[channel:end:channels])
+                line.append((total + count // 2) // count)
+        out.append(bytes(line))
+
+    # Rows after the first use the Up filter, which suits photos
+    raw = [b"\x00" + out[0]]
+    for previous, row in zip(out, out[1:]):
+        raw.append(b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, previous)))
+    chunks = [
+        PNG_SIGNATURE,
+        _png_chunk(
+            b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+        ),
+    ]
+    chunks.extend(_png_chunk(kind, body) for kind, body in palette)
+    chunks.append(_png_chunk(b"IDAT", zlib.compress(b"".join(raw), 9)))
+    chunks.append(_png_chunk(b"IEND", b""))
+    return b"".join(chunks)
+
+
+def variant_path(path: str, width: int) -> str:
+    """Return the path or URL of the width pixels wide variant of an image."""
+    base, suffix = posixpath.splitext(path)
+    return f"{base}-{width}w{suffix}"
+
+
+def _attributes_key(entry: Optional[Dict]):
+    if entry is None:
+        return None
+    return entry["width"], entry["height"], entry["variants"]
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ImageIndex:
+    """The size and resized variants of every image under the static directory.
+
+    Entries are keyed by path relative to the static root and carry the
+    file's size, mtime and hash, so an unchanged image is never read again.
+    Pages use the index to give their img nodes width and height attributes,
+    and a srcset listing the variants.
+    """
+
+    def __init__(self, path: Optional[str] = None, data: Optional[Dict] = None):
+        self.path: Optional[str] = path
+        data = data if data is not None else {}
+        self.images: Dict[str, Dict] = data.get("images", {})
+        self._fingerprint: Optional[str] = None
+        # Images whose attributes changed in the last update()
+        self.changed_images: List[str] = []
+
+    def __repr__(self) -> str:
+        return f"ImageIndex(path='{self.path}', images={len(self.images)} images)"
+
+    @classmethod
+    def load(cls, path: str) -> "ImageIndex":
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("format") != IMAGE_INDEX_FORMAT:
+            return cls(path)
+        return cls(path, data)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the image index to")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {"format": IMAGE_INDEX_FORMAT, "images": self.images}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def update(
+        self,
+        static_dir: str,
+        dest_dir: str,
+        widths: Iterable[int] = (),
+        cache_dir: Optional[str] = None,
+    ) -> List[str]:
+        """Index the images under static_dir and write their variants.
+
+        A PNG variant is made for each of widths narrower than the image and
+        written into dest_dir next to the image, as name-<width>w.png. With a
+        cache_dir, variants are kept there by source hash, so they are only
+        resized once and reused across builds. Variants of images that were
+        deleted, or of widths no longer asked for, are removed. Returns the
+        list of files written; changed_images lists the images whose size or
+        variants changed, and so the pages that show them.
+        """
+        widths = sorted(set(widths))
+        images = {}
+        written = []
+        for entry in scan_tree(static_dir):
+            rel_path = entry.rel_path
+            if not rel_path.lower().endswith(IMAGE_SUFFIXES):
+                continue
+            stat = entry.stat
+            previous = self.images.get(rel_path)
+            if (
+                previous is not None
+                and previous["size"] == stat.st_size
+                and previous["mtime_ns"] == stat.st_mtime_ns
+            ):
+                record = dict(previous)
+            else:
+                try:
+                    size = read_image_size(entry.path)
+                    source_hash = hash_file(entry.path)
+                except OSError:
+                    continue
+                if size is None:
+                    continue
+                record = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "hash": source_hash,
+                    "width": size[0],
+                    "height": size[1],
+                }
+                previous = None
+            record["variants"] = []
+            if rel_path.lower().endswith(".png"):
+                wanted = [width for width in widths if width < record["width"]]
+                variants = self._write_variants(
+                    entry.path, rel_path, record, wanted, previous, dest_dir, cache_dir
+                )
+                written.extend(variants)
+            images[rel_path] = record
+
+        for rel_path, old in self.images.items():
+            kept = images.get(rel_path, {}).get("variants", [])
+            for width in set(old.get("variants", [])) - set(kept):
+                _remove_file(os.path.join(dest_dir, variant_path(rel_path, width)))
+        self.changed_images = sorted(
+            rel_path
+            for rel_path in set(images) | set(self.images)
+            if _attributes_key(images.get(rel_path))
+            != _attributes_key(self.images.get(rel_path))
+        )
+        self.images = images
+        self._fingerprint = None
+        return written
+
+    def _write_variants(
+        self, path, rel_path, record, widths, previous, dest_dir, cache_dir
+    ):
+        written = []
+        data = None
+        for width in widths:
+            dest_file = os.path.join(dest_dir, variant_path(rel_path, width))
+            if (
+                previous is not None
+                and width in previous.get("variants", [])
+                and os.path.exists(dest_file)
+            ):
+                record["variants"].append(width)
+                continue
+            cached = None
+            if cache_dir is not None:
+                cached = os.path.join(
+                    cache_dir, f"{record['hash']}-{RESIZE_VERSION}-{width}.png"
+                )
+            if cached is None or not os.path.exists(cached):
+                if data is None:
+                    with open(path, "rb") as file:
+                        data = file.read()
+                try:
+                    variant = resize_png(data, width)
+                except ValueError:
+                    # Unsupported PNG; the page still gets its size
+                    return written
+                if cached is not None:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    tmp_path = f"{cached}.{os.getpid()}.tmp"
+                    with open(tmp_path, "wb") as file:
+                        file.write(variant)
+                    os.replace(tmp_path, cached)
+            os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+            if cached is not None:
+                shutil.copyfile(cached, dest_file)
+            else:
+                with open(dest_file, "wb") as file:
+                    file.write(variant)
+            record["variants"].append(width)
+            written.append(dest_file)
+        return written
+
+    def fingerprint(self) -> str:
+        """Hash what attributes() depends on, for keying cached page renders."""
+        if self._fingerprint is None:
+            sizes = {
+                rel_path: _attributes_key(entry)
+                for rel_path, entry in self.images.items()
+            }
+            self._fingerprint = hash_bytes(json.dumps(sizes, sort_keys=True).encode())
+        return self._fingerprint
+
+    def attributes(self, url: str, source: str) -> Optional[Dict[str, str]]:
+        """Return the props to add to an img with src url on the page source."""
+        for kind, target in resolve_url(url, source):
+            entry = self.images.get(target) if kind == "asset" else None
+            if entry is None:
+                continue
+            width = entry["width"]
+            props = {"width": str(width), "height": str(entry["height"])}
+            if entry["variants"]:
+                path = urlsplit(url).path
+                srcset = [f"{variant_path(path, w)} {w}w" for w in entry["variants"]]
+                srcset.append(f"{path} {width}w")
+                props["srcset"] = ", ".join(srcset)
+                props["sizes"] = f"(max-width: {width}px) 100vw, {width}px"
+            return props
+        return None
+
+    def annotate(self, node: HTMLNode, source: str) -> HTMLNode:
+        """Return node with attributes() added to the img nodes under it.
+
+        Nodes may be shared with other pages through the block memo, so the
+        nodes on the way to a changed img are copied instead of modified.
+        """
+        found = []
+        stack = [(node, ())]
+        while stack:
+            current, path = stack.pop()
+            if current.tag == "img":
+                props = self.attributes(current.props.get("src", ""), source)
+                if props:
+                    props = {**current.props, **props}
+                    found.append((path, LeafNode("img", current.value, props)))
+                continue
+            stack.extend(
+                (child, path + (index,)) for index, child in enumerate(current.children)
+            )
+        if not found:
+            return node
+        if not found[0][0]:
+            return found[0][1]
+        root = copy.copy(node)
+        root.children = list(node.children)
+        copies = {id(root)}
+        for path, img in found:
+            parent = root
+            for index in path[:-1]:
+                child = parent.children[index]
+                if id(child) not in copies:
+                    child = copy.copy(child)
+                    child.children = list(child.children)
+                    copies.add(id(child))
+                    parent.children[index] = child
+                parent = child
+            parent.children[path[-1]] = img
+        return root
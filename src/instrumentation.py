@@ -0,0 +1,177 @@
+import cProfile
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+class _StageTimer:
+    __slots__ = ("profiler", "name", "page", "start")
+
+    def __init__(self, profiler, name, page):
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start, self.page)
+        return False
+
+
+class _NullStageTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE_TIMER = _NullStageTimer()
+
+
+class Profiler:
+    """Collects timers per stage and per page, plus named counters.
+
+    Stages are timed with `with profiler.stage("name", page):`. Results from
+    worker processes are merged in with merge(snapshot). report() hands the
+    results to every sink, e.g. ConsoleSink, JsonSink or CProfileSink.
+    """
+
+    enabled = True
+
+    def __init__(self, sinks: Optional[List] = None):
+        self.sinks = list(sinks) if sinks else []
+        self.stages: Dict[str, List[float]] = {}
+        self.pages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        for sink in self.sinks:
+            if hasattr(sink, "start"):
+                sink.start(self)
+
+    def __repr__(self) -> str:
+        return f"Profiler(stages={list(self.stages)}, pages={len(self.pages)} pages)"
+
+    def stage(self, name: str, page: Optional[str] = None) -> _StageTimer:
+        return _StageTimer(self, name, page)
+
+    def add_time(self, name: str, seconds: float, page: Optional[str] = None):
+        totals = self.stages.setdefault(name, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+        if page is not None:
+            self.add_time_to_page(page, name, seconds)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict:
+        return {"stages": self.stages, "pages": self.pages, "counters": self.counters}
+
+    def merge(self, snapshot: Dict):
+        for name, (seconds, calls) in snapshot["stages"].items():
+            totals = self.stages.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+        for page, page_stages in snapshot["pages"].items():
+            for name, seconds in page_stages.items():
+                self.add_time_to_page(page, name, seconds)
+        for name, amount in snapshot["counters"].items():
+            self.count(name, amount)
+
+    def add_time_to_page(self, page: str, name: str, seconds: float):
+        page_stages = self.pages.setdefault(page, {})
+        page_stages[name] = page_stages.get(name, 0.0) + seconds
+
+    def slowest_pages(self, limit: int = 10):
+        totals = [(sum(stages.values()), page) for page, stages in self.pages.items()]
+        return sorted(totals, reverse=True)[:limit]
+
+    def report(self):
+        for sink in self.sinks:
+            sink.emit(self)
+
+
+class NullProfiler:
+    """Stands in for a Profiler when instrumentation is disabled."""
+
+    enabled = False
+    sinks = ()
+
+    def stage(self, name, page=None):
+        return _NULL_STAGE_TIMER
+
+    def add_time(self, name, seconds, page=None):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def merge(self, snapshot):
+        pass
+
+    def report(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class ConsoleSink:
+    """Prints the slowest pages, counters and per-stage totals."""
+
+    def __init__(self, top: int = 10):
+        self.top = top
+
+    def emit(self, profiler: Profiler):
+        print("Slowest pages:")
+        for seconds, page in profiler.slowest_pages(self.top):
+            print(f"  {seconds * 1000:9.2f} ms  {page}")
+        for name, amount in sorted(profiler.counters.items()):
+            print(f"{name}: {amount}")
+        print("Stage totals:")
+        for name, (seconds, calls) in sorted(
+            profiler.stages.items(), key=lambda item: item[1][0], reverse=True
+        ):
+            print(f"  {name:20} {seconds:9.3f}s  {calls:7} call(s)")
+
+
+class JsonSink:
+    """Writes the collected timings and counters to a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, profiler: Profiler):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w") as file:
+            json.dump(profiler.snapshot(), file, indent=1, sort_keys=True)
+
+
+class CProfileSink:
+    """Runs cProfile from the profiler's creation until report().
+
+    Only the calling process is profiled; work done in page worker processes
+    is not included.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cprofile = cProfile.Profile()
+
+    def start(self, profiler: Profiler):
+        self.cprofile.enable()
+
+    def emit(self, profiler: Profiler):
+        self.cprofile.disable()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.cprofile.dump_stats(self.path)
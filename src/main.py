@@ -1,16 +1,307 @@
-from textnode import TextNode, TextType
-from htmlnode import HTMLNode, LeafNode
-from converters import *
-from file_utils import copy_files, generate_page, generate_pages_recursive
+import argparse
+import os
+import shutil
+import sys
 
+# Only argparse, os, shutil and sys are imported up front. Every command
+# imports what it needs when it runs, so `--help` and no-op builds don't pay
+# for the parser, the dev server or multiprocessing; check with
+# `python3 -X importtime src/main.py --help`.
+
+CONTENT_DIR = "content"
+STATIC_DIR = "static"
+OUTPUT_DIR = "public"
 TEMPLATE_PATH = "./template.html"
+CACHE_DIR = "./.cache"
+WORKERS = os.cpu_count() or 1
+DEV_SERVER_HOST = "localhost"
+DEV_SERVER_PORT = 8888
+# Absolute URL the site is published at, used by the sitemap and RSS feed.
+# Without it, from here or --site-url, the feeds are not written
+SITE_URL = None
+NO_SITE_URL_WARNING = (
+    "Warning: no --site-url given, so sitemap.xml, rss.xml and"
+    " search_index.json are not written"
+)
+RENDER_CACHE_MAX_BYTES = 256 * 2**20
+# Widths of the resized variants made of every PNG; none unless asked for
+IMAGE_WIDTHS = ()
+
+# Files kept in the cache directory between builds
+MANIFEST_FILE = "build_manifest.json"
+DEPGRAPH_FILE = "depgraph.json"
+SITE_INDEX_FILE = "site_index.json"
+IMAGE_INDEX_FILE = "image_index.json"
+RENDER_CACHE_SUBDIR = "render"
+HIGHLIGHT_CACHE_SUBDIR = "highlight"
+IMAGE_CACHE_SUBDIR = "images"
+PROFILE_FILE = "build_profile.json"
+CPROFILE_FILE = "build.prof"
+
+COMMANDS = ("build", "serve", "watch", "clean", "bench")
+
+
+def build_profiler(options):
+    from instrumentation import (
+        NULL_PROFILER,
+        ConsoleSink,
+        CProfileSink,
+        JsonSink,
+        Profiler,
+    )
+
+    if not options.profile and not options.cprofile:
+        return NULL_PROFILER
+    sinks = [ConsoleSink(), JsonSink(os.path.join(options.cache_dir, PROFILE_FILE))]
+    if options.cprofile:
+        sinks.append(CProfileSink(os.path.join(options.cache_dir, CPROFILE_FILE)))
+    return Profiler(sinks)
+
+
+def build(options):
+    from depgraph import DependencyGraph
+    from feeds import FEED_FILES, SiteIndex, write_feeds
+    from file_utils import PageBuildError, generate_pages_recursive, sync_files
+    from highlight import HighlightCache
+    from images import ImageIndex
+    from manifest import BuildManifest
+    from render_cache import RenderCache
+
+    profiler = build_profiler(options)
+    cache_dir = options.cache_dir
+    # The output directory is not wiped so unchanged pages and assets can be
+    # kept between builds
+    manifest = BuildManifest.load(os.path.join(cache_dir, MANIFEST_FILE))
+    graph = DependencyGraph.load(os.path.join(cache_dir, DEPGRAPH_FILE))
+    site_index = SiteIndex.load(os.path.join(cache_dir, SITE_INDEX_FILE))
+    images = ImageIndex.load(os.path.join(cache_dir, IMAGE_INDEX_FILE))
+    compressor = None
+    if options.compress:
+        # Sidecars are compressed in the background while the build goes on
+        from compress import Compressor
+
+        compressor = Compressor()
+    try:
+        with profiler.stage("sync_files"):
+            synced = sync_files(
+                options.static,
+                options.output,
+                manifest=manifest,
+                compare=options.asset_compare,
+                link=options.asset_link,
+                log_to_console=True,
+                compressor=compressor,
+            )
+        changed_assets = [os.path.relpath(path, options.output) for path in synced]
+        with profiler.stage("images"):
+            for path in images.update(
+                options.static,
+                options.output,
+                options.image_widths,
+                os.path.join(cache_dir, IMAGE_CACHE_SUBDIR),
+            ):
+                print(f"Image variant written: {path}")
+        changed_assets.extend(images.changed_images)
+        generate_pages_recursive(
+            options.content,
+            options.template,
+            options.output,
+            manifest=manifest,
+            log_to_console=True,
+            workers=options.workers,
+            profiler=profiler,
+            render_cache=RenderCache(
+                os.path.join(cache_dir, RENDER_CACHE_SUBDIR), RENDER_CACHE_MAX_BYTES
+            ),
+            memoize_blocks=True,
+            dependency_graph=graph,
+            site_index=site_index,
+            rebuild=graph.dependents(changed_assets=changed_assets),
+            highlight_cache=HighlightCache(
+                os.path.join(cache_dir, HIGHLIGHT_CACHE_SUBDIR)
+            ),
+            images=images,
+            compressor=compressor,
+        )
+        feeds = []
+        if options.site_url is None:
+            print(NO_SITE_URL_WARNING)
+        else:
+            with profiler.stage("write_feeds"):
+                feeds = write_feeds(site_index, options.output, options.site_url)
+                for path in feeds:
+                    print(f"Feed written: {path}")
+        if compressor is not None and options.site_url is not None:
+            for name in FEED_FILES:
+                path = os.path.join(options.output, name)
+                if path in feeds or compressor.sidecars_missing(path):
+                    compressor.submit(path)
+        for source, url in graph.broken_references(manifest.assets):
+            print(f"Warning: {source}: broken reference {url}")
+    except PageBuildError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        if compressor is not None:
+            with profiler.stage("compress_wait"):
+                compressor.close()
+            for path, error in compressor.errors.items():
+                print(f"Warning: {path}: not compressed: {error}")
+            print(compressor.summary())
+        # Keep the pages that did build even if others failed
+        manifest.save()
+        graph.save()
+        site_index.save()
+        images.save()
+        profiler.report()
+    return 0
+
+
+def serve(options):
+    from devserver import DevServer
+    from highlight import HighlightCache
+    from render_cache import RenderCache
+
+    if options.site_url is None:
+        print(NO_SITE_URL_WARNING)
+    cache_dir = options.cache_dir
+    server = DevServer(
+        options.content,
+        options.static,
+        options.template,
+        options.output,
+        os.path.join(cache_dir, MANIFEST_FILE),
+        render_cache=RenderCache(
+            os.path.join(cache_dir, RENDER_CACHE_SUBDIR), RENDER_CACHE_MAX_BYTES
+        ),
+        depgraph_path=os.path.join(cache_dir, DEPGRAPH_FILE),
+        site_index_path=os.path.join(cache_dir, SITE_INDEX_FILE),
+        site_url=options.site_url,
+        highlight_cache=HighlightCache(os.path.join(cache_dir, HIGHLIGHT_CACHE_SUBDIR)),
+        image_index_path=os.path.join(cache_dir, IMAGE_INDEX_FILE),
+        image_widths=options.image_widths,
+        image_cache_dir=os.path.join(cache_dir, IMAGE_CACHE_SUBDIR),
+    )
+    server.watch(options.host, options.port)
+    return 0
+
+
+def clean(options):
+    paths = [options.output]
+    if not options.keep_cache:
+        paths.append(options.cache_dir)
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            print(f"Removed {path}")
+    return 0
+
+
+def bench(options):
+    import benchmarks
+
+    benchmarks.main(options.bench_args)
+    return 0
+
+
+def parse_widths(text):
+    try:
+        widths = [int(width) for width in text.split(",") if width.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid widths '{text}'")
+    if any(width <= 0 for width in widths):
+        raise argparse.ArgumentTypeError(f"widths must be positive: '{text}'")
+    return widths
+
+
+def build_parser():
+    paths = argparse.ArgumentParser(add_help=False)
+    paths.add_argument("--content", default=CONTENT_DIR, help="markdown sources")
+    paths.add_argument("--static", default=STATIC_DIR, help="assets copied as is")
+    paths.add_argument("--output", default=OUTPUT_DIR, help="site output directory")
+    paths.add_argument("--template", default=TEMPLATE_PATH, help="page template")
+    paths.add_argument(
+        "--cache-dir", default=CACHE_DIR, help="manifest, caches and profiles"
+    )
+    paths.add_argument(
+        "--site-url", default=SITE_URL, help="absolute URL for the sitemap and feed"
+    )
+    paths.add_argument(
+        "--image-widths",
+        type=parse_widths,
+        default=IMAGE_WIDTHS,
+        help="widths of resized PNG variants, e.g. 480,960",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="main.sh",
+        description="Build the static site. Runs `build` if no command is given.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    build_command = commands.add_parser(
+        "build", parents=[paths], help="build the site incrementally"
+    )
+    build_command.add_argument("--workers", type=int, default=WORKERS)
+    build_command.add_argument(
+        "--profile", action="store_true", help="report per-stage timings"
+    )
+    build_command.add_argument(
+        "--cprofile", action="store_true", help="also write a cProfile dump"
+    )
+    build_command.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz sidecars, and .br ones if brotli is installed",
+    )
+    build_command.add_argument(
+        "--asset-compare",
+        choices=["mtime", "hash"],
+        default="mtime",
+        help="how static files are checked for changes",
+    )
+    build_command.add_argument(
+        "--asset-link",
+        choices=["hardlink", "reflink"],
+        help="link static files into the output instead of copying them",
+    )
+    build_command.set_defaults(run=build)
+
+    serve_command = commands.add_parser(
+        "serve",
+        aliases=["watch"],
+        parents=[paths],
+        help="serve the site and rebuild it on every change",
+    )
+    serve_command.add_argument("--host", default=DEV_SERVER_HOST)
+    serve_command.add_argument("--port", type=int, default=DEV_SERVER_PORT)
+    serve_command.set_defaults(run=serve)
+
+    clean_command = commands.add_parser(
+        "clean", parents=[paths], help="remove the output and cache directories"
+    )
+    clean_command.add_argument(
+        "--keep-cache", action="store_true", help="only remove the output directory"
+    )
+    clean_command.set_defaults(run=clean)
 
+    bench_command = commands.add_parser(
+        "bench", help="run benchmarks.py, e.g. `bench suite --shape few-huge`"
+    )
+    bench_command.add_argument("bench_args", nargs=argparse.REMAINDER)
+    bench_command.set_defaults(run=bench)
+    return parser
 
-def main():
 
-    copy_files("static", "public", clean_dest=True, log_to_console=True)
-    generate_pages_recursive("content", TEMPLATE_PATH, "public")
-    pass
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # `main.sh` and `main.sh --profile` keep building as they always have
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "build")
+    options = build_parser().parse_args(argv)
+    return options.run(options)
 
 
-main()
+# Worker processes re-import this module when they are spawned
+if __name__ == "__main__":
+    sys.exit(main())
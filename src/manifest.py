@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+# Bump whenever a change to the generator alters the HTML it produces, so
+# that every page is rebuilt on the next incremental run.
+GENERATOR_VERSION = "0.8.0"
+MANIFEST_FORMAT = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+class BuildManifest:
+    """Records what the last build produced so the next one can skip work.
+
+    The manifest maps each markdown source (relative to the content root) to
+    the hash of its contents and the output file that was written for it,
+    along with the template hash, highlighter fingerprint and generator version
+    used for the build.
+    Static assets mirrored by sync_files are tracked separately in `assets`.
+    """
+
+    def __init__(self, path: Optional[str] = None, data: Optional[Dict] = None):
+        self.path: Optional[str] = path
+        data = data if data is not None else {}
+        self.generator_version: Optional[str] = data.get("generator_version")
+        self.template_hash: Optional[str] = data.get("template_hash")
+        self.highlighters: Optional[str] = data.get("highlighters")
+        self.pages: Dict[str, Dict[str, str]] = data.get("pages", {})
+        self.assets: Dict[str, Dict] = data.get("assets", {})
+
+    def __repr__(self) -> str:
+        return f"BuildManifest(path='{self.path}', pages={len(self.pages)} pages)"
+
+    @classmethod
+    def load(cls, path: str) -> "BuildManifest":
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("format") != MANIFEST_FORMAT:
+            return cls(path)
+        return cls(path, data)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given to save the build manifest to")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "format": MANIFEST_FORMAT,
+            "generator_version": self.generator_version,
+            "template_hash": self.template_hash,
+            "highlighters": self.highlighters,
+            "pages": self.pages,
+            "assets": self.assets,
+        }
+        # Write to a temporary file first so an interrupted build never
+        # leaves a truncated manifest behind.
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def needs_full_rebuild(
+        self, template_hash: str, highlighters: Optional[str] = None
+    ) -> bool:
+        return (
+            self.generator_version != GENERATOR_VERSION
+            or self.template_hash != template_hash
+            or self.highlighters != highlighters
+        )
+
+    def is_stale(self, source: str, source_hash: str, output: str) -> bool:
+        entry = self.pages.get(source)
+        if entry is None:
+            return True
+        if entry["hash"] != source_hash or entry["output"] != output:
+            return True
+        return not os.path.exists(output)
+
+    def record_page(self, source: str, source_hash: str, output: str):
+        self.pages[source] = {"hash": source_hash, "output": output}
+
+    def forget_page(self, source: str) -> Optional[str]:
+        entry = self.pages.pop(source, None)
+        return entry["output"] if entry else None
+
+    def record_build(self, template_hash: str, highlighters: Optional[str] = None):
+        self.generator_version = GENERATOR_VERSION
+        self.template_hash = template_hash
+        self.highlighters = highlighters
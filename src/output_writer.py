@@ -0,0 +1,177 @@
+import os
+import queue
+import threading
+from typing import Dict, List
+
+DEFAULT_THREADS = 4
+DEFAULT_MAX_PENDING = 64
+
+_STOP = object()
+COMPARE_CHUNK_SIZE = 2**16
+# Precompressed copies a Compressor writes next to an output
+SIDECAR_SUFFIXES = (".gz", ".br")
+
+
+def remove_sidecars(path: str):
+    """Remove the sidecars of path, which no longer match a rewritten output."""
+    for suffix in SIDECAR_SUFFIXES:
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def temp_path(path: str) -> str:
+    """Return a temporary file name next to path, unique to this thread."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Atomically replace path with data unless it already holds exactly data.
+
+    The data goes to a temporary file next to path which is then renamed over
+    it, so readers never see a partly written file. Returns True if the file
+    was written and False if it was left untouched.
+    """
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as file:
+                if file.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def _same_contents(first: str, second: str) -> bool:
+    if os.path.getsize(first) != os.path.getsize(second):
+        return False
+    with open(first, "rb") as first_file, open(second, "rb") as second_file:
+        while True:
+            chunk = first_file.read(COMPARE_CHUNK_SIZE)
+            if chunk != second_file.read(COMPARE_CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+def replace_if_changed(tmp_path: str, path: str) -> bool:
+    """Rename tmp_path over path unless path already holds the same bytes.
+
+    The files are compared a chunk at a time, so neither is read into memory
+    whole. tmp_path is gone either way. Returns True if path was replaced.
+    """
+    try:
+        try:
+            unchanged = _same_contents(tmp_path, path)
+        except FileNotFoundError:
+            unchanged = False
+        if unchanged:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+class OutputWriter:
+    """Writes output files from background threads while pages keep rendering.
+
+    write() queues a file and returns at once. It only blocks while
+    max_pending files are already waiting, so a slow disk throttles rendering
+    instead of the whole site piling up in memory. Each directory is created
+    once, files are written with write_if_changed, and failures are collected
+    in errors by path. close(), or leaving a `with` block, waits until every
+    queued file is on disk. With a Compressor, every
+    file that changed, or still lacks its .gz or .br sidecar, is handed to it;
+    without one, the sidecars of a file that changed are removed.
+    """
+
+    def __init__(
+        self,
+        threads: int = DEFAULT_THREADS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        compressor=None,
+    ):
+        if threads < 1:
+            raise ValueError("OutputWriter needs at least one thread")
+        self.written: List[str] = []
+        self.unchanged: List[str] = []
+        self.errors: Dict[str, Exception] = {}
+        self.closed = False
+        self.compressor = compressor
+        self._queue = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._directories = set()
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True) for _ in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __repr__(self) -> str:
+        return (
+            f"OutputWriter(threads={len(self._threads)}, written={len(self.written)},"
+            f" unchanged={len(self.unchanged)}, errors={len(self.errors)})"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def write(self, path: str, data: bytes):
+        if self.closed:
+            raise ValueError("Cannot write to a closed OutputWriter")
+        self._queue.put((path, data))
+
+    def _ensure_directory(self, directory: str):
+        if not directory or directory in self._directories:
+            return
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._directories.add(directory)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            path, data = item
+            try:
+                self._ensure_directory(os.path.dirname(path))
+                changed = write_if_changed(path, data)
+            except Exception as error:
+                with self._lock:
+                    self.errors[path] = error
+                continue
+            with self._lock:
+                (self.written if changed else self.unchanged).append(path)
+            if self.compressor is None:
+                if changed:
+                    remove_sidecars(path)
+            elif changed or self.compressor.sidecars_missing(path):
+                self.compressor.submit(path, data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
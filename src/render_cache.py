@@ -0,0 +1,151 @@
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from converters import CONVERTER_VERSION
+from manifest import hash_bytes
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+ENTRY_SUFFIX = ".html"
+# Entries from before the body was stored after a header line; they are never
+# read again but still count towards the size and get evicted
+LEGACY_SUFFIX = ".json"
+
+
+class RenderCache:
+    """On-disk cache of rendered page bodies keyed by markdown content.
+
+    Entries are keyed by the hash of the markdown, CONVERTER_VERSION and a
+    render context, so a page whose markdown is unchanged is never parsed
+    again. An entry is a line of JSON holding the title, headings and, when
+    the page was described, its PageInfo.to_dict(), followed by the raw body
+    HTML, which open_entry() lets the body be streamed into. Entries are
+    evicted least recently used first once the cache grows past max_bytes; a
+    hit refreshes the entry's mtime, which is what eviction orders by.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+
+    def __repr__(self) -> str:
+        return f"RenderCache(directory='{self.directory}', max_bytes={self.max_bytes})"
+
+    def __getstate__(self):
+        # Worker processes get their own copy and recount the size lazily
+        state = self.__dict__.copy()
+        state["_size"] = None
+        return state
+
+    def key(self, markdown: str, context: str = "") -> str:
+        """Key the render of markdown; context names anything else it depends on."""
+        return hash_bytes(f"{CONVERTER_VERSION}\0{context}\0{markdown}".encode())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[Tuple[str, str, List, Dict]]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as file:
+                entry = json.loads(file.readline())
+                html = file.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        headings = entry.get("headings", [])
+        return entry["title"], html, headings, entry.get("page", {})
+
+    @contextmanager
+    def open_entry(
+        self, key: str, title: str, headings: List = (), page_info: Dict = None
+    ):
+        """Open the entry for key to write its body HTML into.
+
+        The entry only replaces any previous one once the block completes, and
+        is discarded if the block raises.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        entry = {"title": title}
+        if headings:
+            entry["headings"] = list(headings)
+        if page_info:
+            entry["page"] = page_info
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as file:
+                file.write(json.dumps(entry) + "\n")
+                yield file
+            # Count the cache before the new entry lands, and replace the size
+            # of any entry it overwrites rather than adding to it
+            size = self.size()
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._size = size + os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def put(
+        self,
+        key: str,
+        title: str,
+        html: str,
+        headings: List = (),
+        page_info: Dict = None,
+    ):
+        with self.open_entry(key, title, headings, page_info) as file:
+            file.write(html)
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith((ENTRY_SUFFIX, LEGACY_SUFFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self):
+        for _, _, path in self._entries():
+            os.remove(path)
+        self._size = 0
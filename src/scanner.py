@@ -0,0 +1,126 @@
+import os
+from typing import Dict, List, Optional
+
+# Directory listings and stat calls release the GIL, so threads overlap the
+# filesystem round trips of sibling subtrees
+DEFAULT_SCAN_THREADS = 8
+
+
+class ScanEntry:
+    """A file or directory found by scan_tree.
+
+    path is the root joined with rel_path, rel_path is relative to the
+    scanned root, and stat is the file's os.stat() result, taken once during
+    the scan. Directories have no stat.
+    """
+
+    __slots__ = ("path", "rel_path", "is_dir", "stat")
+
+    def __init__(
+        self,
+        path: str,
+        rel_path: str,
+        is_dir: bool,
+        stat: Optional[os.stat_result] = None,
+    ):
+        self.path = path
+        self.rel_path = rel_path
+        self.is_dir = is_dir
+        self.stat = stat
+
+    def __repr__(self) -> str:
+        kind = "dir" if self.is_dir else "file"
+        return f"ScanEntry({kind}, {self.rel_path})"
+
+
+def _scan_directory(path: str, rel_path: str, suffix: Optional[str]) -> List[ScanEntry]:
+    """List one directory, sorted by name."""
+    try:
+        with os.scandir(path) as iterator:
+            found = sorted(iterator, key=lambda entry: entry.name)
+    except OSError:
+        # Like os.walk, skip directories that vanish or can't be read
+        return []
+    entries = []
+    for entry in found:
+        entry_rel_path = f"{rel_path}{os.sep}{entry.name}" if rel_path else entry.name
+        try:
+            # Symlinked directories are not followed, as with os.walk
+            if entry.is_dir(follow_symlinks=False):
+                entries.append(ScanEntry(entry.path, entry_rel_path, True))
+            elif entry.is_file() and (suffix is None or entry.name.endswith(suffix)):
+                entries.append(
+                    ScanEntry(entry.path, entry_rel_path, False, entry.stat())
+                )
+        except OSError:
+            # Deleted since the listing, or a broken symlink
+            continue
+    return entries
+
+
+def _scan_subtree(
+    path: str, rel_path: str, suffix: Optional[str]
+) -> Dict[str, List[ScanEntry]]:
+    """List a directory and everything under it, keyed by relative path."""
+    listings = {}
+    pending = [(path, rel_path)]
+    while pending:
+        path, rel_path = pending.pop()
+        listing = _scan_directory(path, rel_path, suffix)
+        listings[rel_path] = listing
+        pending.extend((e.path, e.rel_path) for e in listing if e.is_dir)
+    return listings
+
+
+def scan_tree(
+    root: str,
+    suffix: Optional[str] = None,
+    dirs: bool = False,
+    threads: int = DEFAULT_SCAN_THREADS,
+) -> List[ScanEntry]:
+    """Return the files under root in a stable depth-first order.
+
+    Each directory is listed once with os.scandir, its entries sorted by
+    name, and every file is stat'ed once. Only files ending in suffix are
+    returned if one is given, and directories are returned before their
+    contents if dirs is set. Separate subtrees are listed concurrently by up
+    to `threads` threads, but the result is always in the same order.
+    A missing root gives an empty list.
+    """
+    listings = {"": _scan_directory(root, "", suffix)}
+    subtrees = [entry for entry in listings[""] if entry.is_dir]
+    # List the top levels until there is a subtree for every thread
+    while threads > 1 and 0 < len(subtrees) < threads:
+        directories, subtrees = subtrees, []
+        for directory in directories:
+            listing = _scan_directory(directory.path, directory.rel_path, suffix)
+            listings[directory.rel_path] = listing
+            subtrees.extend(entry for entry in listing if entry.is_dir)
+    if threads > 1 and len(subtrees) > 1:
+        # Imported here as concurrent.futures is slow to import and small
+        # trees never need it
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(threads) as executor:
+            for listing in executor.map(
+                lambda entry: _scan_subtree(entry.path, entry.rel_path, suffix),
+                subtrees,
+            ):
+                listings.update(listing)
+    else:
+        for entry in subtrees:
+            listings.update(_scan_subtree(entry.path, entry.rel_path, suffix))
+
+    entries = []
+    stack = [iter(listings[""])]
+    while stack:
+        for entry in stack[-1]:
+            if entry.is_dir:
+                if dirs:
+                    entries.append(entry)
+                stack.append(iter(listings[entry.rel_path]))
+                break
+            entries.append(entry)
+        else:
+            stack.pop()
+    return entries
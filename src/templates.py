@@ -0,0 +1,70 @@
+import os
+import re
+from typing import Dict, List, Optional
+from htmlnode import HTMLNode
+
+TEMPLATE_SLOT_RGX = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Compiled templates keyed by absolute path, with the mtime and size they
+# were compiled from
+_template_cache: Dict[str, tuple] = {}
+
+
+class CompiledTemplate:
+    """A template parsed once into alternating literal and slot segments.
+
+    `literals` always holds one more entry than `slots`: rendering writes
+    literals[0], then each slot value followed by the literal after it. Slot
+    values can be strings or HTMLNodes; missing slots render as empty strings.
+    """
+
+    def __init__(self, source: str, path: Optional[str] = None):
+        self.path: Optional[str] = path
+        self.literals: List[str] = []
+        self.slots: List[str] = []
+        last_end = 0
+        for match in TEMPLATE_SLOT_RGX.finditer(source):
+            self.literals.append(source[last_end : match.start()])
+            self.slots.append(match.group(1))
+            last_end = match.end()
+        self.literals.append(source[last_end:])
+
+    def __repr__(self) -> str:
+        return f"CompiledTemplate(path='{self.path}', slots={self.slots})"
+
+    def render(self, values: Dict[str, object]) -> str:
+        parts = [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            value = values.get(name, "")
+            parts.append(value.to_html() if isinstance(value, HTMLNode) else value)
+            parts.append(literal)
+        return "".join(parts)
+
+    def render_to(self, out, values: Dict[str, object]):
+        """Write the rendered template to out, streaming HTMLNode slot values."""
+        write = out.write
+        write(self.literals[0])
+        for name, literal in zip(self.slots, self.literals[1:]):
+            value = values.get(name, "")
+            if isinstance(value, HTMLNode):
+                value.write_html(out)
+            else:
+                write(value)
+            write(literal)
+
+
+def load_template(path: str) -> CompiledTemplate:
+    """Return the compiled template at path, recompiling it only when it changes."""
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+    with open(key, "r") as template_file:
+        template = CompiledTemplate(template_file.read(), path)
+    _template_cache[key] = ((stat.st_mtime_ns, stat.st_size), template)
+    return template
+
+
+def clear_template_cache():
+    _template_cache.clear()
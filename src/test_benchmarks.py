@@ -0,0 +1,51 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from benchmarks import CORPUS_SHAPES, bench_suite, generate_corpus
+from file_utils import generate_pages_recursive
+from manifest import GENERATOR_VERSION
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_every_shape_builds(self):
+        for shape in CORPUS_SHAPES:
+            with tempfile.TemporaryDirectory() as tmp:
+                content = os.path.join(tmp, "content")
+                settings = generate_corpus(content, shape, pages=3, blocks=40)
+                self.assertEqual(settings["pages"], 3)
+                generated = generate_pages_recursive(
+                    content,
+                    os.path.join(os.path.dirname(__file__), "..", "template.html"),
+                    os.path.join(tmp, "public"),
+                )
+                self.assertEqual(len(generated), 3)
+
+    def test_corpus_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            generate_corpus(os.path.join(tmp, "a"), "inline-heavy", pages=2)
+            generate_corpus(os.path.join(tmp, "b"), "inline-heavy", pages=2)
+            for name in ["section0/page0.md", "section1/page1.md"]:
+                with open(os.path.join(tmp, "a", name)) as a:
+                    with open(os.path.join(tmp, "b", name)) as b:
+                        self.assertEqual(a.read(), b.read())
+
+
+class TestSuite(unittest.TestCase):
+    def test_suite_writes_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                bench_suite("many-small", path, pages=5)
+            with open(path) as file:
+                result = json.load(file)
+        self.assertEqual(result["generator_version"], GENERATOR_VERSION)
+        self.assertEqual(result["pages"], 5)
+        self.assertIn("parse_block", result["stages"])
+        self.assertIn("copy_files", result["stages"])
+
+
+if __name__ == "__main__":
+    unittest.main()
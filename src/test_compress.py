@@ -0,0 +1,204 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+from compress import Compressor
+from file_utils import generate_page, generate_pages_recursive, sync_files
+from manifest import BuildManifest
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class FakeBrotli:
+    @staticmethod
+    def compress(data, quality):
+        return b"br:" + data
+
+    class Compressor:
+        def __init__(self, quality):
+            self.started = False
+
+        def process(self, data):
+            prefix = b"" if self.started else b"br:"
+            self.started = True
+            return prefix + data
+
+        def finish(self):
+            return b"" if self.started else b"br:"
+
+
+class TestCompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name, data=None):
+        path = os.path.join(self.root, name)
+        if data is not None:
+            with open(path, "wb") as file:
+                file.write(data)
+        return path
+
+    def test_gzip_sidecars(self):
+        page = self.path("index.html", b"<p>hi</p>" * 100)
+        image = self.path("a.png", b"\x89PNG")
+        with Compressor(threads=2, use_brotli=False) as compressor:
+            self.assertTrue(compressor.sidecars_missing(page))
+            self.assertFalse(compressor.sidecars_missing(image))
+            compressor.submit(page)
+            compressor.submit(image)
+        with gzip.open(page + ".gz") as file:
+            self.assertEqual(file.read(), b"<p>hi</p>" * 100)
+        self.assertEqual(compressor.written, [page + ".gz"])
+        self.assertEqual(
+            sorted(os.listdir(self.root)), ["a.png", "index.html", "index.html.gz"]
+        )
+        self.assertEqual((compressor.files, compressor.input_bytes), (1, 900))
+        self.assertIn("Compressed 1 file(s) of 900 B to", compressor.summary())
+
+        # Sidecars are deterministic, so compressing again changes nothing
+        os.utime(page + ".gz", ns=(0, 0))
+        with Compressor(use_brotli=False) as compressor:
+            self.assertFalse(compressor.sidecars_missing(page))
+            compressor.submit(page, b"<p>hi</p>" * 100)
+        self.assertEqual(compressor.written, [])
+        self.assertEqual(os.stat(page + ".gz").st_mtime_ns, 0)
+
+    def test_brotli_sidecars_when_installed(self):
+        page = self.path("style.css", b"body {}")
+        with mock.patch("compress.brotli", FakeBrotli):
+            with Compressor() as compressor:
+                self.assertTrue(compressor.sidecars_missing(page))
+                compressor.submit(page, b"body {}")
+        with open(page + ".br", "rb") as file:
+            self.assertEqual(file.read(), b"br:body {}")
+        self.assertEqual(compressor.brotli_bytes, 10)
+        self.assertIn("10 B brotli", compressor.summary())
+
+    def test_files_are_compressed_in_chunks(self):
+        page = self.path("index.html", b"<p>hi</p>" * 1000)
+        with mock.patch("compress.brotli", FakeBrotli), mock.patch(
+            "compress.CHUNK_SIZE", 100
+        ):
+            with Compressor(threads=1) as compressor:
+                compressor.submit(page)
+        with gzip.open(page + ".gz") as file:
+            self.assertEqual(file.read(), b"<p>hi</p>" * 1000)
+        with open(page + ".br", "rb") as file:
+            self.assertEqual(file.read(), b"br:" + b"<p>hi</p>" * 1000)
+        self.assertEqual((compressor.files, compressor.input_bytes), (1, 9000))
+        self.assertEqual(compressor.gzip_bytes, os.path.getsize(page + ".gz"))
+        self.assertEqual(compressor.brotli_bytes, 9003)
+        self.assertEqual(sorted(os.listdir(self.root))[-1], "index.html.gz")
+
+        # The same bytes from memory leave the sidecars untouched
+        os.utime(page + ".gz", ns=(0, 0))
+        with mock.patch("compress.brotli", FakeBrotli):
+            with Compressor() as compressor:
+                compressor.submit(page, b"<p>hi</p>" * 1000)
+        self.assertEqual(compressor.written, [])
+        self.assertEqual(os.stat(page + ".gz").st_mtime_ns, 0)
+
+    def test_errors_are_collected(self):
+        missing = self.path("missing.html")
+        with Compressor() as compressor:
+            compressor.submit(missing)
+        self.assertEqual(list(compressor.errors), [missing])
+        with self.assertRaises(ValueError):
+            compressor.submit(missing)
+
+
+class TestCompressedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp = self.tmp.name
+        self.content = os.path.join(tmp, "content")
+        self.static = os.path.join(tmp, "static")
+        self.public = os.path.join(tmp, "public")
+        self.template = os.path.join(tmp, "template.html")
+        for path, text in [
+            (os.path.join(self.content, "index.md"), "# Home"),
+            (os.path.join(self.content, "blog", "post.md"), "# Post"),
+            (os.path.join(self.static, "index.css"), "body {}"),
+            (os.path.join(self.static, "logo.png"), "png"),
+            (self.template, TEMPLATE),
+        ]:
+            self.write(path, text)
+        self.manifest = BuildManifest()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def build(self, writer_threads=2, compress=True):
+        compressor = Compressor(use_brotli=False) if compress else None
+        sync_files(self.static, self.public, self.manifest, compressor=compressor)
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            self.manifest,
+            writer_threads=writer_threads,
+            compressor=compressor,
+        )
+        if compressor is None:
+            return []
+        compressor.close()
+        return sorted(os.path.relpath(p, self.public) for p in compressor.written)
+
+    def test_only_changed_outputs_are_compressed(self):
+        self.assertEqual(
+            self.build(),
+            [os.path.join("blog", "post.html.gz"), "index.css.gz", "index.html.gz"],
+        )
+        self.assertEqual(self.build(), [])
+
+        self.write(os.path.join(self.content, "index.md"), "# New home")
+        os.remove(os.path.join(self.public, "index.css.gz"))
+        self.assertEqual(
+            self.build(writer_threads=0), ["index.css.gz", "index.html.gz"]
+        )
+        with gzip.open(os.path.join(self.public, "index.html.gz")) as file:
+            self.assertIn(b"New home", file.read())
+
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+    def test_rewrites_without_compressor_drop_sidecars(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# New home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# New post")
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.build(compress=False)
+        self.write(os.path.join(self.content, "index.md"), "# Newer home")
+        self.build(writer_threads=0, compress=False)
+        self.assertEqual(self.sidecars(), [])
+
+        self.build()
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Streamed post")
+        generate_page(
+            post, self.template, self.public, self.content, stream_threshold=0
+        )
+        self.assertEqual(self.sidecars(), ["index.css.gz", "index.html.gz"])
+
+    def sidecars(self):
+        return sorted(
+            os.path.relpath(os.path.join(dirpath, name), self.public)
+            for dirpath, _, names in os.walk(self.public)
+            for name in names
+            if name.endswith(".gz")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
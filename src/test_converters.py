@@ -1,3 +1,5 @@
+import io
+import random
 import unittest
 from converters import *
 from textnode import TextNode, TextType
@@ -219,6 +221,82 @@ class TestFunctions(unittest.TestCase):
         )
 
 
+def chained_text_to_textnodes(text):
+    # The original five-pass pipeline, used as the reference implementation
+    nodes = split_nodes_delimiter([TextNode(text, TextType.TEXT)], "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "*", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+class TestInlineTokenizer(unittest.TestCase):
+    FRAGMENTS = [
+        "text",
+        " ",
+        "**",
+        "*",
+        "`",
+        "***",
+        "![alt](/img.png)",
+        "[link](https://boot.dev)",
+        "!",
+        "[",
+        "]",
+        "(x)",
+        "\n",
+    ]
+
+    def assertSameAsChained(self, text):
+        try:
+            expected = chained_text_to_textnodes(text)
+        except ValueError:
+            with self.assertRaises(ValueError, msg=repr(text)):
+                text_to_textnodes(text)
+            return
+        self.assertListEqual(text_to_textnodes(text), expected, msg=repr(text))
+
+    def test_matches_chained_pipeline_on_random_input(self):
+        rng = random.Random(1234)
+        for _ in range(5000):
+            fragments = rng.choices(self.FRAGMENTS, k=rng.randint(0, 12))
+            self.assertSameAsChained("".join(fragments))
+
+    def test_matches_chained_pipeline_on_edge_cases(self):
+        for text in [
+            "",
+            "****",
+            "a****b",
+            "***x***",
+            "*a**b**c*",
+            "`a*b` and *c*",
+            "*`a*`b`",
+            "**[link](/x) and `code`**",
+            "text after ![image](/a.png) **bold** and more text",
+            "[first](/1)[second](/2)",
+        ]:
+            self.assertSameAsChained(text)
+
+    def test_split_links_after_other_nodes(self):
+        # split_nodes_link used to carry match offsets over into later text nodes
+        nodes = text_to_textnodes("[a](/a) **b** trailing")
+        self.assertListEqual(
+            [
+                TextNode("a", TextType.LINK, "/a"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("b", TextType.BOLD),
+                TextNode(" trailing", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_unclosed_delimiters(self):
+        for text in ["**bold", "*italic", "`code", "`a*b`", "*a**b**"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+
 class TestMarkdownToHTML(unittest.TestCase):
     def test_markdown_to_blocks(self):
         md = """
@@ -265,17 +343,197 @@ This is the same paragraph on a new line
 
     def test_block_to_block_types(self):
         block = "# heading"
-        self.assertEqual(block_to_block_type(block), block_type_heading)
+        self.assertEqual(block_to_block_type(block), BlockType.HEADING)
         block = "```\ncode\n```"
-        self.assertEqual(block_to_block_type(block), block_type_code)
+        self.assertEqual(block_to_block_type(block), BlockType.CODE)
         block = "> quote\n> more quote"
-        self.assertEqual(block_to_block_type(block), block_type_quote)
+        self.assertEqual(block_to_block_type(block), BlockType.QUOTE)
         block = "* list\n* items"
-        self.assertEqual(block_to_block_type(block), block_type_ulist)
+        self.assertEqual(block_to_block_type(block), BlockType.UNORDERED_LIST)
         block = "1. list\n2. items"
-        self.assertEqual(block_to_block_type(block), block_type_olist)
+        self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
         block = "paragraph"
-        self.assertEqual(block_to_block_type(block), block_type_paragraph)
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_strip_md_block(self):
+        cases = [
+            ("## Sub heading", ("Sub heading", BlockType.HEADING)),
+            ("#######too deep", ("#######too deep", BlockType.PARAGRAPH)),
+            ("```\nprint(1)\n```", ("print(1)", BlockType.CODE)),
+            ("````", ("`", BlockType.CODE)),
+            ("> a\n> b", ("a\nb", BlockType.QUOTE)),
+            ("> a\nb", ("> a\nb", BlockType.PARAGRAPH)),
+            ("- a\n*  b\n+ c", ("a\nb\nc", BlockType.UNORDERED_LIST)),
+            ("- a\nb", ("- a\nb", BlockType.PARAGRAPH)),
+            ("1. a\n10.  b", ("a\nb", BlockType.ORDERED_LIST)),
+            ("1. a\n- b", ("1. a\n- b", BlockType.PARAGRAPH)),
+            ("  plain text  ", ("plain text", BlockType.PARAGRAPH)),
+        ]
+        for block, expected in cases:
+            self.assertEqual(strip_md_block(block), expected, msg=repr(block))
+
+
+class TestNestedBlocks(unittest.TestCase):
+    def html(self, md_block):
+        return parse_block(md_block).to_html()
+
+    def test_flat_quotes_and_lists_are_unchanged(self):
+        self.assertEqual(
+            self.html("> first **line**\n> second"),
+            "<blockquote>first <b>line</b>\nsecond</blockquote>",
+        )
+        self.assertEqual(self.html("- a\n- b"), "<ul><li>a</li><li>b</li></ul>")
+        self.assertEqual(self.html("1. a\n2. b"), "<ol><li>a</li><li>b</li></ol>")
+        self.assertEqual(self.html(">"), "<p>></p>")
+        self.assertEqual(self.html("- a\n1. b"), "<p>- a\n1. b</p>")
+
+    def test_nested_quotes(self):
+        self.assertEqual(
+            self.html("> a\n> > b\n> > c\n>\n> > d\n> e"),
+            "<blockquote><p>a</p><blockquote>b\nc</blockquote>"
+            "<blockquote>d</blockquote><p>e</p></blockquote>",
+        )
+        self.assertEqual(
+            self.html(">> deep\n> para\n>\n> - item"),
+            "<blockquote><blockquote>deep</blockquote><p>para</p>"
+            "<p>- item</p></blockquote>",
+        )
+
+    def test_quoted_text_is_not_parsed_as_blocks(self):
+        self.assertEqual(self.html("> # Note"), "<blockquote># Note</blockquote>")
+        self.assertEqual(self.html("> - a"), "<blockquote>- a</blockquote>")
+        self.assertEqual(self.html("> 1. one"), "<blockquote>1. one</blockquote>")
+        self.assertEqual(
+            self.html("> # Note\n>\n> > ## Deeper"),
+            "<blockquote><p># Note</p><blockquote>## Deeper</blockquote>"
+            "</blockquote>",
+        )
+
+    def test_nested_lists(self):
+        self.assertEqual(
+            self.html("- a\n  - b\n    1. c\n  - d\n- e"),
+            "<ul><li>a<ul><li>b<ol><li>c</li></ol></li><li>d</li></ul></li>"
+            "<li>e</li></ul>",
+        )
+        # Siblings must share their list's type
+        self.assertEqual(
+            self.html("- a\n  - b\n  1. c"), "<p>- a\n  - b\n  1. c</p>"
+        )
+
+    def test_deep_nesting(self):
+        depth = 2000
+        quote = "\n".join(">" * level + f" level {level}" for level in range(1, depth))
+        node = parse_block(quote)
+        for level in range(1, depth - 1):
+            self.assertEqual(node.children[0].to_html(), f"<p>level {level}</p>")
+            node = node.children[1]
+        self.assertEqual(node.to_html(), f"<blockquote>level {depth - 1}</blockquote>")
+        items = "\n".join(" " * level + f"- {level}" for level in range(depth))
+        self.assertEqual(self.html(items).count("<ul><li>"), depth)
+
+
+class TestHeadings(unittest.TestCase):
+    def test_levels_and_ids(self):
+        self.assertEqual(
+            parse_block("### The *Struggle* of Good vs. Evil!").to_html(),
+            '<h3 id="the-struggle-of-good-vs-evil">The <i>Struggle</i>'
+            " of Good vs. Evil!</h3>",
+        )
+        self.assertEqual(slugify(" Crafting Middle-earth -- "), "crafting-middle-earth")
+        self.assertEqual(slugify("???"), "section")
+        self.assertEqual(slugify("Númenor"), "númenor")
+
+    def test_outline_and_duplicate_ids(self):
+        markdown = "# Title\n\n## Notes\n\n### Notes\n\n## Notes-1\n\n## Notes"
+        memo = BlockMemo()
+        outline = Outline()
+        body = markdown_to_html(markdown, memo, outline).to_html()
+        self.assertEqual(outline.require_title(), "Title")
+        self.assertEqual(
+            [slug for _, _, slug in outline.headings],
+            ["title", "notes", "notes-1", "notes-1-1", "notes-2"],
+        )
+        self.assertIn('<h2 id="notes-2">Notes</h2>', body)
+        # The memoized node keeps its own id for the next page
+        self.assertEqual(memo.parse_block("## Notes").props, {"id": "notes"})
+        with self.assertRaises(ValueError):
+            Outline().require_title()
+
+    def test_table_of_contents(self):
+        outline = Outline()
+        markdown = "# T\n\n## A\n\n### B\n\n#### C\n\n## D\n\n### E"
+        markdown_to_html(markdown, outline=outline)
+        self.assertEqual(
+            table_of_contents(outline.headings).to_html(),
+            '<ul><li><a href="#a">A</a><ul><li><a href="#b">B</a>'
+            '<ul><li><a href="#c">C</a></li></ul></li></ul></li>'
+            '<li><a href="#d">D</a><ul><li><a href="#e">E</a></li></ul></li></ul>',
+        )
+        self.assertIsNone(table_of_contents([(1, "T", "t")]))
+
+
+class TestStreamingBlocks(unittest.TestCase):
+    FRAGMENTS = ["\n", "\n", "\n\n", "text", " ", "# Title", "\r", "* item\n"]
+
+    def lines(self, markdown):
+        # Files split lines on "\n" only once newlines have been translated
+        return io.StringIO(markdown, newline="\n")
+
+    def test_matches_markdown_to_blocks_on_random_input(self):
+        rng = random.Random(1234)
+        for _ in range(5000):
+            markdown = "".join(rng.choices(self.FRAGMENTS, k=rng.randint(0, 12)))
+            self.assertListEqual(
+                list(iter_markdown_blocks(self.lines(markdown))),
+                markdown_to_blocks(markdown),
+                msg=repr(markdown),
+            )
+
+    def test_extract_title_from_blocks(self):
+        for markdown in [
+            "# Title",
+            "```\n# comment\n```\n\n## Sub\n\n# **Title**\n\n# Second",
+        ]:
+            outline = Outline()
+            markdown_to_html(markdown, outline=outline)
+            self.assertEqual(
+                extract_title_from_blocks(iter_markdown_blocks(self.lines(markdown))),
+                outline.require_title(),
+            )
+        with self.assertRaises(ValueError):
+            extract_title_from_blocks(["```\n# comment\n```", "## Sub"])
+
+
+class TestBlockMemo(unittest.TestCase):
+    MARKDOWN = "# Title\n\nShared **footer**\n\n* a\n* b\n\nShared **footer**"
+
+    def test_same_output_as_unmemoized(self):
+        memo = BlockMemo()
+        for _ in range(2):
+            self.assertEqual(
+                markdown_to_html(self.MARKDOWN, memo).to_html(),
+                markdown_to_html(self.MARKDOWN).to_html(),
+            )
+        self.assertEqual(memo.stats()["misses"], 3)
+        self.assertEqual(memo.stats()["hits"], 5)
+
+    def test_least_recently_used_block_is_evicted(self):
+        memo = BlockMemo(maxsize=2)
+        first = memo.parse_block("first")
+        memo.parse_block("second")
+        self.assertIs(memo.parse_block("first"), first)
+        memo.parse_block("third")
+        self.assertEqual(memo.stats()["size"], 2)
+        memo.parse_block("first")
+        memo.parse_block("second")
+        self.assertEqual((memo.hits, memo.misses), (2, 4))
+
+    def test_errors_are_not_memoized(self):
+        memo = BlockMemo()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                memo.parse_block("**unclosed")
+        self.assertEqual(memo.stats()["size"], 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+from converters import markdown_to_html
+from depgraph import DependencyGraph, node_references, resolve_url
+from file_utils import generate_pages_recursive
+from manifest import BuildManifest
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestResolveUrl(unittest.TestCase):
+    def test_urls(self):
+        cases = [
+            ("/", "index.md", [("page", "index.md")]),
+            ("https://example.com/a.png", "index.md", []),
+            ("#section", "index.md", []),
+            ("/blog/", "index.md", [("page", "blog/index.md")]),
+            (
+                "/majesty",
+                "index.md",
+                [
+                    ("asset", "majesty"),
+                    ("page", "majesty.md"),
+                    ("page", "majesty/index.md"),
+                ],
+            ),
+            (
+                "images/a.png?v=2",
+                "blog/post.md",
+                [
+                    ("asset", "blog/images/a.png"),
+                    ("page", "blog/images/a.png.md"),
+                    ("page", "blog/images/a.png/index.md"),
+                ],
+            ),
+            (
+                "../about.html",
+                "blog/post.md",
+                [("asset", "about.html"), ("page", "about.md")],
+            ),
+        ]
+        for url, source, expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(resolve_url(url, source), expected)
+
+    def test_node_references(self):
+        markdown = "# Home\n\n[about](/about) and ![logo](/logo.png)\n\n* [x](/x)"
+        node = markdown_to_html(markdown)
+        self.assertEqual(node_references(node), (["/about"], ["/logo.png"]))
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph()
+        self.graph.record_page(
+            "index.md", "h1", "template.html", ["/about", "/gone"], ["/logo.png"]
+        )
+        self.graph.record_page("about.md", "h2", "other.html", ["/"], [])
+
+    def test_dependents(self):
+        self.assertEqual(
+            self.graph.dependents(changed_assets=["logo.png"]), {"index.md"}
+        )
+        self.assertEqual(self.graph.dependents(changed_assets=["other.png"]), set())
+        self.assertEqual(
+            self.graph.dependents(changed_templates=["./other.html"]), {"about.md"}
+        )
+        self.assertEqual(
+            self.graph.dependents(changed_pages=["about.md", "new.md"]), {"about.md"}
+        )
+
+    def test_broken_references(self):
+        self.assertEqual(
+            self.graph.broken_references(["logo.png"]), [("index.md", "/gone")]
+        )
+        self.assertEqual(
+            self.graph.broken_references([], ["index.md"]),
+            [("index.md", "/gone"), ("index.md", "/logo.png")],
+        )
+
+    def test_broken_anchors(self):
+        self.graph.record_page(
+            "guide.md",
+            "h3",
+            "template.html",
+            ["#setup", "#missing", "/about#team", "/about#nobody", "/gone#x"],
+            [],
+            ["setup"],
+        )
+        self.graph.record_page("about.md", "h2", "other.html", ["/"], [], ["team"])
+        self.assertEqual(self.graph.anchor_index()["about.md"], {"team"})
+        self.assertEqual(
+            self.graph.broken_references([], ["guide.md"]),
+            [
+                ("guide.md", "#missing"),
+                ("guide.md", "/about#nobody"),
+                ("guide.md", "/gone#x"),
+            ],
+        )
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "depgraph.json")
+            self.graph.save(path)
+            self.assertEqual(DependencyGraph.load(path).pages, self.graph.pages)
+            with open(path, "w") as file:
+                file.write("{broken")
+            self.assertEqual(DependencyGraph.load(path).pages, {})
+
+
+class TestBuildGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![map](/map.png)")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\n[home](/)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def build(self, manifest, graph, **kwargs):
+        generated = generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            manifest=manifest,
+            dependency_graph=graph,
+            **kwargs,
+        )
+        return sorted(os.path.relpath(path, self.public) for path in generated)
+
+    def test_graph_drives_rebuilds(self):
+        manifest, graph = BuildManifest(), DependencyGraph()
+        self.build(manifest, graph, workers=2)
+        self.assertEqual(graph.pages["index.md"]["images"], ["/map.png"])
+        self.assertEqual(graph.pages["about.md"]["links"], ["/"])
+        self.assertEqual(self.build(manifest, graph), [])
+        rebuild = graph.dependents(changed_assets=["map.png"])
+        self.assertEqual(self.build(manifest, graph, rebuild=rebuild), ["index.html"])
+
+        os.remove(os.path.join(self.content, "index.md"))
+        self.build(manifest, graph)
+        self.assertEqual(list(graph.pages), ["about.md"])
+        self.assertEqual(graph.broken_references([]), [("about.md", "/")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+from unittest import mock
+from devserver import DevServer, TreeWatcher, start_server
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestDevServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "about", "index.md"), "# About")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.server = DevServer(
+            self.content, self.static, self.template, self.public, log_to_console=False
+        )
+        self.server.build()
+        self.watcher = TreeWatcher([self.content, self.static, self.template])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        # Make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def rebuild(self):
+        written = self.server.rebuild(self.watcher.poll())
+        return sorted(os.path.relpath(path, self.public) for path in written)
+
+    def test_watcher_detects_changes(self):
+        page = os.path.join(self.content, "index.md")
+        self.assertEqual(self.watcher.poll(), set())
+        self.write(page, "# Changed")
+        new_page = os.path.join(self.content, "new.md")
+        self.write(new_page, "# New")
+        self.assertEqual(self.watcher.poll(), {page, new_page})
+        os.remove(page)
+        self.assertEqual(self.watcher.poll(), {page})
+
+    def test_only_edited_page_is_rebuilt(self):
+        self.write(os.path.join(self.content, "about", "index.md"), "# About us")
+        self.assertEqual(self.rebuild(), ["about/index.html"])
+        with open(os.path.join(self.public, "about", "index.html")) as file:
+            self.assertIn("About us", file.read())
+
+    def test_deleted_page_is_removed(self):
+        os.remove(os.path.join(self.content, "about", "index.md"))
+        self.assertEqual(self.rebuild(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "about")))
+
+    def test_asset_change_is_synced(self):
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.rebuild(), ["index.css"])
+
+    def test_embedded_image_change_rebuilds_page(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![map](/map.png)")
+        self.rebuild()
+        self.write(os.path.join(self.static, "map.png"), "png")
+        self.assertEqual(self.rebuild(), ["index.html", "map.png"])
+        assets = self.server.manifest.assets
+        self.assertEqual(self.server.graph.broken_references(assets), [])
+
+    def test_feeds_follow_rebuilds(self):
+        self.server.site_url = "https://example.com"
+        self.write(os.path.join(self.content, "new.md"), "# New page")
+        self.assertIn("sitemap.xml", self.rebuild())
+        with open(os.path.join(self.public, "sitemap.xml")) as file:
+            self.assertIn("https://example.com/new.html", file.read())
+
+    def test_template_change_rebuilds_pages(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.rebuild(), ["about/index.html", "index.html"])
+
+    def test_broken_page_does_not_stop_rebuilds(self):
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        self.assertEqual(self.rebuild(), [])
+        self.assertNotIn("index.md", self.server.manifest.pages)
+
+    def test_io_error_does_not_stop_rebuilds(self):
+        self.write(os.path.join(self.content, "index.md"), "# New home")
+        self.write(os.path.join(self.content, "about", "index.md"), "# New about")
+        with mock.patch("devserver.hash_file", side_effect=[OSError("locked"), "x"]):
+            self.assertEqual(self.rebuild(), ["index.html"])
+        self.assertNotIn(os.path.join("about", "index.md"), self.server.manifest.pages)
+
+    def test_server_serves_output(self):
+        server = start_server(self.public, port=0)
+        try:
+            url = f"http://localhost:{server.server_port}/about/"
+            with urllib.request.urlopen(url) as response:
+                self.assertIn(b"<title>About</title>", response.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
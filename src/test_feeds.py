@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+import unittest
+from converters import markdown_to_html
+from feeds import (
+    PageInfo,
+    SiteIndex,
+    build_search_index,
+    decode_search_index,
+    describe_markdown,
+    node_text,
+    page_url,
+    render_feed,
+    render_sitemap,
+    write_feeds,
+)
+from file_utils import generate_pages_recursive
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestPageInfo(unittest.TestCase):
+    def test_node_text_separates_blocks(self):
+        node = markdown_to_html("# Hi\n\n* one\n* two\n\nsome **bold**word")
+        self.assertEqual(
+            node_text(node).split(), ["Hi", "one", "two", "some", "boldword"]
+        )
+
+    def test_describe_markdown(self):
+        info = describe_markdown(
+            "# Rivendell\n\n![The valley](/images/rivendell.png)\n\n"
+            "The *Last*  Homely\nHouse, see [Elrond](/elrond) or the [map](/map.png)"
+        )
+        self.assertEqual(info["title"], "Rivendell")
+        self.assertEqual(info["links"], ["/elrond", "/map.png"])
+        self.assertEqual(info["images"], ["/images/rivendell.png"])
+        self.assertEqual(
+            info["summary"], "The Last Homely House, see Elrond or the map"
+        )
+        self.assertIn("valley", info["terms"])
+        self.assertNotIn("a", info["terms"])
+
+    def test_page_url(self):
+        self.assertEqual(page_url("public/index.html", "public"), "/")
+        self.assertEqual(page_url("public/blog/index.html", "public"), "/blog/")
+        self.assertEqual(page_url("public/blog/post.html", "public"), "/blog/post.html")
+
+
+class TestFeeds(unittest.TestCase):
+    def setUp(self):
+        self.index = SiteIndex()
+        pages = [
+            ("index.md", "/", 1_700_000_000, "Home & away", ["home", "tolkien"]),
+            ("blog/a.md", "/blog/a.html", 1_700_100_000, "A <post>", ["tolkien"]),
+            ("blog/b.md", "/blog/b.html", 1_600_000_000, "B", ["hobbit", "home"]),
+        ]
+        for source, url, date, title, terms in pages:
+            info = PageInfo(title)
+            info.terms.update(terms)
+            info.summary = f"About {title}"
+            self.index.record_page(source, "hash", url, date, info.to_dict())
+        self.info = self.index.pages["index.md"]
+
+    def test_search_index_round_trip(self):
+        data = build_search_index(self.index)
+        urls = [url for url, _ in data["pages"]]
+        self.assertEqual(data["suffixes"], ["hobbit", "me", "tolkien"])
+        self.assertEqual(data["prefixes"], [0, 2, 0])
+        terms = decode_search_index(data)
+        self.assertEqual(
+            {term: [urls[n] for n in numbers] for term, numbers in terms.items()},
+            {
+                "hobbit": ["/blog/b.html"],
+                "home": ["/blog/b.html", "/"],
+                "tolkien": ["/blog/a.html", "/"],
+            },
+        )
+
+    def test_sitemap_and_feed(self):
+        sitemap = render_sitemap(self.index, "https://example.com")
+        self.assertIn("<loc>https://example.com/blog/a.html</loc>", sitemap)
+        self.assertIn("<lastmod>2023-11-14</lastmod>", sitemap)
+        feed = render_feed(self.index, "https://example.com", limit=2)
+        self.assertIn("<title>Home &amp; away</title>", feed)
+        self.assertEqual(feed.count("<item>"), 2)
+        self.assertLess(
+            feed.index("A &lt;post&gt;"), feed.index("<title>Home &amp; away</title><")
+        )
+        self.assertNotIn("<title>B</title>", feed)
+
+    def test_unchanged_feeds_are_not_rewritten(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            site_url = "https://example.com/"
+            self.assertEqual(len(write_feeds(self.index, tmp, site_url)), 3)
+            self.assertEqual(write_feeds(self.index, tmp, site_url), [])
+            with open(os.path.join(tmp, "search_index.json")) as file:
+                self.assertEqual(json.load(file), build_search_index(self.index))
+
+    def test_feeds_are_skipped_while_the_index_is_unchanged(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "site_index.json")
+            write_feeds(self.index, tmp, "https://example.com")
+            self.index.save(path)
+            index = SiteIndex.load(path)
+            sitemap = os.path.join(tmp, "sitemap.xml")
+            os.remove(sitemap)
+            self.assertEqual(write_feeds(index, tmp, "https://example.com"), [sitemap])
+            self.assertEqual(write_feeds(index, tmp, "https://example.com/"), [])
+            index.record_page("index.md", "hash", "/", 1_700_000_000, self.info)
+            self.assertFalse(index.changed)
+            index.forget_page("blog/b.md")
+            self.assertTrue(index.changed)
+            self.assertEqual(len(write_feeds(index, tmp, "https://example.com")), 3)
+            index = SiteIndex(data={"pages": index.pages, "site_url": index.site_url})
+            written = write_feeds(index, tmp, "https://other.example")
+            self.assertEqual(
+                sorted(os.path.basename(path) for path in written),
+                ["rss.xml", "sitemap.xml"],
+            )
+
+
+class TestBuildSiteIndex(unittest.TestCase):
+    def test_pages_are_indexed_during_the_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            template = os.path.join(tmp, "template.html")
+            os.makedirs(os.path.join(content, "blog"))
+            for path, text in [
+                (template, TEMPLATE),
+                (os.path.join(content, "index.md"), "# Home\n\nWelcome home"),
+                (os.path.join(content, "blog", "post.md"), "# Post\n\nA hobbit"),
+            ]:
+                with open(path, "w") as file:
+                    file.write(text)
+            index = SiteIndex()
+            public = os.path.join(tmp, "public")
+            generate_pages_recursive(content, template, public, site_index=index)
+            self.assertEqual(
+                {entry["url"]: entry["title"] for entry in index.entries()},
+                {"/": "Home", "/blog/post.html": "Post"},
+            )
+            self.assertEqual(index.pages["blog/post.md"]["terms"], ["hobbit", "post"])
+
+            os.remove(os.path.join(content, "blog", "post.md"))
+            generate_pages_recursive(content, template, public, site_index=index)
+            self.assertEqual(list(index.pages), ["index.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
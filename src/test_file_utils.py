@@ -0,0 +1,266 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from file_utils import (
+    PageBuildError,
+    generate_page,
+    generate_pages_recursive,
+    sync_files,
+)
+from manifest import BuildManifest
+from render_cache import RenderCache
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        for i in range(6):
+            self.write(
+                os.path.join(self.content, f"dir{i % 2}", f"page{i}.md"),
+                f"# Page {i}\n\nSome **bold** text and a [link](/page{i})",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def read_tree(self, root):
+        result = {}
+        for dirpath, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                with open(path, "rb") as file:
+                    result[os.path.relpath(path, root)] = file.read()
+        return result
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        generate_pages_recursive(self.content, self.template, serial)
+        generated = generate_pages_recursive(
+            self.content, self.template, parallel, workers=3
+        )
+        self.assertEqual(len(generated), 6)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_parallel_summary_reports_speedup(self):
+        dest = os.path.join(self.tmp.name, "public")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive(
+                self.content, self.template, dest, log_to_console=True, workers=2
+            )
+        summary = out.getvalue().splitlines()[-1]
+        self.assertRegex(summary, r"with 2 worker\(s\) \(\d+\.\dx speedup\)")
+
+    def test_errors_are_collected_per_page(self):
+        self.write(os.path.join(self.content, "bad.md"), "no title here")
+        self.write(os.path.join(self.content, "worse.md"), "# Title\n\n**unclosed")
+        dest = os.path.join(self.tmp.name, "public")
+        with self.assertRaises(PageBuildError) as context:
+            generate_pages_recursive(self.content, self.template, dest, workers=2)
+        self.assertEqual(
+            sorted(os.path.basename(path) for path in context.exception.errors),
+            ["bad.md", "worse.md"],
+        )
+        # The healthy pages are still written
+        self.assertEqual(len(self.read_tree(dest)), 6)
+
+    def test_failed_pages_are_retried(self):
+        bad = os.path.join(self.content, "bad.md")
+        self.write(bad, "no title here")
+        dest = os.path.join(self.tmp.name, "public")
+        manifest = BuildManifest()
+        with self.assertRaises(PageBuildError):
+            generate_pages_recursive(
+                self.content, self.template, dest, manifest=manifest, workers=2
+            )
+        self.assertNotIn("bad.md", manifest.pages)
+        self.write(bad, "# Fixed")
+        generated = generate_pages_recursive(
+            self.content, self.template, dest, manifest=manifest, workers=2
+        )
+        self.assertEqual(generated, [os.path.join(dest, "bad.html")])
+
+    def test_writer_threads_match_direct_writes(self):
+        direct = os.path.join(self.tmp.name, "direct")
+        threaded = os.path.join(self.tmp.name, "threaded")
+        generate_pages_recursive(self.content, self.template, direct, writer_threads=0)
+        generate_pages_recursive(self.content, self.template, threaded, workers=2)
+        self.assertEqual(self.read_tree(direct), self.read_tree(threaded))
+
+    def test_unchanged_outputs_are_not_rewritten(self):
+        dest = os.path.join(self.tmp.name, "public")
+        generate_pages_recursive(self.content, self.template, dest)
+        output = os.path.join(dest, "dir0", "page0.html")
+        os.utime(output, ns=(0, 0))
+        generated = generate_pages_recursive(self.content, self.template, dest)
+        self.assertEqual(len(generated), 6)
+        self.assertEqual(os.stat(output).st_mtime_ns, 0)
+
+
+class TestStreamingPage(unittest.TestCase):
+    MARKDOWN = (
+        "intro with ![map](/map.png)\n\n# Big page\n\n"
+        + "Some *text* and a [link](/about)\n\n\n" * 50
+        + "```\ncode\n```\n"
+    )
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.source = os.path.join(root, "content", "big.md")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.dirname(self.source))
+        with open(self.template, "w") as file:
+            file.write(TEMPLATE)
+        with open(self.source, "w") as file:
+            file.write(self.MARKDOWN)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, dest, stream_threshold):
+        page_info = {}
+        output = generate_page(
+            self.source,
+            self.template,
+            os.path.join(self.tmp.name, dest),
+            os.path.dirname(self.source),
+            page_info=page_info,
+            stream_threshold=stream_threshold,
+        )
+        with open(output) as file:
+            return file.read(), page_info
+
+    def test_streamed_page_matches_regular_page(self):
+        streamed = self.render("streamed", 0)
+        self.assertEqual(streamed, self.render("regular", None))
+        self.assertEqual(len(streamed[1]["links"]), 50)
+        streamed_dir = os.path.join(self.tmp.name, "streamed")
+        self.assertEqual(os.listdir(streamed_dir), ["big.html"])
+
+    def test_title_ignores_code_blocks(self):
+        with open(self.source, "w") as file:
+            file.write("```\n# not the title\n```\n\n" + self.MARKDOWN)
+        streamed, page_info = self.render("streamed", 0)
+        self.assertEqual(page_info["title"], "Big page")
+        self.assertEqual(streamed, self.render("regular", None)[0])
+
+    def test_table_of_contents_slot(self):
+        with open(self.template, "w") as file:
+            file.write("{{ TableOfContents }}|{{ Content }}")
+        with open(self.source, "w") as file:
+            file.write("# Page\n\n## One\n\n### Two\n\ntext")
+        cache = RenderCache(os.path.join(self.tmp.name, "cache"))
+        pages = []
+        for _ in range(2):
+            output = generate_page(
+                self.source,
+                self.template,
+                os.path.join(self.tmp.name, "public"),
+                os.path.dirname(self.source),
+                render_cache=cache,
+            )
+            with open(output) as file:
+                pages.append(file.read())
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(pages[0], pages[1])
+        self.assertTrue(
+            pages[0].startswith(
+                '<ul><li><a href="#one">One</a><ul><li><a href="#two">Two</a>'
+                "</li></ul></li></ul>|<div>"
+            )
+        )
+
+    def test_failed_stream_keeps_previous_output(self):
+        before, _ = self.render("public", None)
+        with open(self.source, "a") as file:
+            file.write("\n\n**unclosed")
+        with self.assertRaises(ValueError):
+            self.render("public", 0)
+        public = os.path.join(self.tmp.name, "public")
+        with open(os.path.join(public, "big.html")) as file:
+            self.assertEqual(file.read(), before)
+        self.assertEqual(os.listdir(public), ["big.html"])
+
+
+class TestSyncFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.manifest = BuildManifest()
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png bytes")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def sync(self, **kwargs):
+        written = sync_files(self.static, self.public, manifest=self.manifest, **kwargs)
+        return sorted(os.path.relpath(path, self.public) for path in written)
+
+    def test_only_changed_files_are_copied(self):
+        self.assertEqual(self.sync(), ["images/a.png", "index.css"])
+        self.assertEqual(self.sync(), [])
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body { margin: 0 }")
+        self.assertEqual(self.sync(), ["index.css"])
+        with open(os.path.join(self.public, "index.css")) as file:
+            self.assertEqual(file.read(), "body { margin: 0 }")
+
+    def test_stale_outputs_are_removed(self):
+        self.sync()
+        self.write(os.path.join(self.public, "page.html"), "not an asset")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.sync(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        # Files the sync did not place are left alone
+        self.assertTrue(os.path.exists(os.path.join(self.public, "page.html")))
+
+    def test_hash_mode_ignores_touched_files(self):
+        self.sync(compare="hash")
+        css = os.path.join(self.static, "index.css")
+        os.utime(css, ns=(0, os.stat(css).st_mtime_ns + 10**9))
+        self.assertEqual(self.sync(compare="hash"), [])
+        self.assertEqual(self.sync(), ["index.css"])
+
+    def test_hardlinks(self):
+        self.sync(link="hardlink")
+        src = os.stat(os.path.join(self.static, "index.css"))
+        dest = os.stat(os.path.join(self.public, "index.css"))
+        self.assertEqual((src.st_dev, src.st_ino), (dest.st_dev, dest.st_ino))
+        self.assertEqual(self.sync(link="hardlink"), [])
+
+    def test_reflink_falls_back_to_copy(self):
+        self.assertEqual(self.sync(link="reflink"), ["images/a.png", "index.css"])
+        with open(os.path.join(self.public, "images", "a.png")) as file:
+            self.assertEqual(file.read(), "png bytes")
+
+    def test_invalid_modes(self):
+        with self.assertRaises(ValueError):
+            self.sync(compare="size")
+        with self.assertRaises(ValueError):
+            self.sync(link="symlink")
+
+
+if __name__ == "__main__":
+    unittest.main()
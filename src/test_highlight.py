@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+from converters import parse_block
+from feeds import node_text
+from unittest import mock
+from highlight import (
+    HighlightCache,
+    highlight_code,
+    highlight_python,
+    highlighter_fingerprint,
+    register_highlighter,
+    unregister_highlighter,
+)
+
+try:
+    import pygments
+except ImportError:
+    pygments = None
+
+
+def shout(code):
+    return f'<span class="k">{code.upper()}</span>'
+
+
+class TestCodeBlocks(unittest.TestCase):
+    def test_code_is_escaped_and_not_parsed_as_markdown(self):
+        node = parse_block("```\nif a < b and **c**:\n    `d` & _e_\n```")
+        self.assertEqual(
+            node.to_html(),
+            "<pre><code>if a &lt; b and **c**:\n    `d` &amp; _e_</code></pre>",
+        )
+
+    def test_language_without_highlighter(self):
+        node = parse_block("```nosuchlanguage\n<b>\n```")
+        self.assertEqual(
+            node.to_html(),
+            '<pre><code class="language-nosuchlanguage">&lt;b&gt;</code></pre>',
+        )
+
+    def test_empty_code_block(self):
+        self.assertEqual(
+            parse_block("```text\n```").to_html(),
+            '<pre><code class="language-text"></code></pre>',
+        )
+
+
+class TestHighlighters(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = HighlightCache(os.path.join(self.tmp.name, "highlight"))
+        register_highlighter("Shout", shout)
+
+    def tearDown(self):
+        unregister_highlighter("shout")
+        self.tmp.cleanup()
+
+    def test_registered_highlighter(self):
+        node = parse_block("```shout\nhello\n```")
+        self.assertEqual(
+            node.to_html(),
+            '<pre><code class="language-shout">'
+            '<span class="k">HELLO</span></code></pre>',
+        )
+        self.assertEqual(node_text(node), "HELLO\n")
+        self.assertIsNone(highlight_code("hello", "nosuchlanguage", self.cache))
+
+    def test_cache_round_trip(self):
+        calls = []
+
+        def counting(code):
+            calls.append(code)
+            return shout(code)
+
+        register_highlighter("shout", counting)
+        html = highlight_code("hello", "shout", self.cache)
+        self.assertEqual(highlight_code("hello", "shout", self.cache), html)
+        # A new cache over the same directory, as in the next build
+        cache = HighlightCache(self.cache.directory)
+        self.assertEqual(highlight_code("hello", "SHOUT", cache), html)
+        self.assertEqual(calls, ["hello"])
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+        highlight_code("bye", "shout", cache)
+        self.assertEqual(calls, ["hello", "bye"])
+        cache.clear()
+        self.assertEqual(os.listdir(cache.directory), [])
+
+    def test_key_depends_on_highlighter_version(self):
+        key = self.cache.key("shout", "test.shout:1", "hello")
+        self.assertNotEqual(key, self.cache.key("shout", "test.shout:2", "hello"))
+        self.assertNotEqual(key, self.cache.key("other", "test.shout:1", "hello"))
+        self.assertNotEqual(key, self.cache.key("shout", "test.shout:1", "bye"))
+
+    def test_fingerprint_follows_registry(self):
+        fingerprint = highlighter_fingerprint()
+        register_highlighter("shout", shout, version="2")
+        self.assertNotEqual(highlighter_fingerprint(), fingerprint)
+        register_highlighter("shout", shout)
+        self.assertEqual(highlighter_fingerprint(), fingerprint)
+
+    def test_builtin_python_highlighter(self):
+        html = highlight_python("def f(x):\n    return len(x) + 1  # <n>")
+        self.assertEqual(
+            html,
+            '<span class="k">def</span> f<span class="o">(</span>x'
+            '<span class="o">)</span><span class="o">:</span>\n'
+            '    <span class="k">return</span> <span class="nb">len</span>'
+            '<span class="o">(</span>x<span class="o">)</span> '
+            '<span class="o">+</span> <span class="m">1</span>  '
+            '<span class="c"># &lt;n&gt;</span>',
+        )
+        self.assertEqual(highlight_python('x = "<a'), 'x = "&lt;a')
+        # Used when Pygments is not installed
+        with mock.patch("highlight._pygments_highlighter", return_value=None):
+            node = parse_block("```python\nx = '<a>'\n```")
+        self.assertEqual(node_text(node), "x = '<a>'\n")
+        self.assertIn('<span class="s">', node.to_html())
+
+    @unittest.skipUnless(pygments, "needs pygments")
+    def test_pygments(self):
+        node = parse_block("```python\nx = '<a>'\n```", self.cache)
+        html = node.to_html()
+        self.assertTrue(html.startswith('<pre><code class="language-python"><span'))
+        self.assertNotIn("<a>", html)
+        self.assertEqual(node_text(node), "x = '<a>'\n")
+        self.assertEqual(len(os.listdir(self.cache.directory)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import io
 import unittest
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, render_html, render_tags
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -45,6 +46,15 @@ class TestLeafNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             LeafNode(tag="span")
 
+    def test_leaves_share_empty_children_and_props(self):
+        first = LeafNode(tag="b", value="one")
+        second = LeafNode(value="two")
+        self.assertIs(first.children, second.children)
+        self.assertIs(first.props, second.props)
+        self.assertEqual(first.props, {})
+        self.assertEqual(len(first.children), 0)
+        self.assertFalse(hasattr(first, "__dict__"))
+
     def test_to_html(self):
         leaf = LeafNode(tag="b", value="Bold text", props={"class": "bold"})
         expected_html = '<b class="bold">Bold text</b>'
@@ -126,6 +136,80 @@ class TestParentNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             ParentNode(tag="div").to_html()  # Children are required for ParentNode
 
+    def test_write_html_matches_to_html(self):
+        leaf = LeafNode(tag="b", value="Bold text")
+        inner = ParentNode(tag="span", children=[leaf], props={"class": "x"})
+        parent = ParentNode(
+            tag="article",
+            children=[
+                inner,
+                LeafNode(value="plain"),
+                LeafNode(tag="a", value="link", props={"href": "/"}),
+            ],
+        )
+        out = io.StringIO()
+        parent.write_html(out)
+        self.assertEqual(out.getvalue(), parent.to_html())
+
+    def test_write_html_writes_chunks(self):
+        chunks = []
+
+        class Sink:
+            def write(self, chunk):
+                chunks.append(chunk)
+
+        children = [LeafNode(tag="p", value=str(i)) for i in range(3)]
+        ParentNode(tag="div", children=children).write_html(Sink())
+        self.assertEqual(
+            chunks, ["<div>", "<p>0</p>", "<p>1</p>", "<p>2</p>", "</div>"]
+        )
+
+    def test_write_html_missing_tag_error(self):
+        child1 = LeafNode(tag="p", value="A paragraph")
+        with self.assertRaises(ValueError):
+            ParentNode(children=[child1]).write_html(io.StringIO())
+
+
+class TestRenderHTML(unittest.TestCase):
+    def test_deep_nesting_does_not_recurse(self):
+        node = LeafNode(tag="b", value="x")
+        for _ in range(20000):
+            node = ParentNode(tag="i", children=[node])
+        html = node.to_html()
+        self.assertEqual(html, "<i>" * 20000 + "<b>x</b>" + "</i>" * 20000)
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), html)
+
+    def test_generator_children_and_other_nodes(self):
+        class Raw(HTMLNode):
+            def to_html(self):
+                return "<hr>"
+
+        children = [LeafNode(tag="p", value=str(i)) for i in range(2)] + [Raw()]
+        node = ParentNode(
+            tag="div", children=iter(children), props={"id": "main", "class": "a b"}
+        )
+        self.assertEqual(
+            render_html(node), '<div id="main" class="a b"><p>0</p><p>1</p><hr></div>'
+        )
+
+    def test_tags_are_cached_by_props(self):
+        first = render_tags("a", {"href": "/", "title": "home"})
+        self.assertEqual(first, ('<a href="/" title="home">', "</a>"))
+        self.assertIs(render_tags("a", {"href": "/", "title": "home"}), first)
+        self.assertEqual(
+            render_tags("a", {"title": "home", "href": "/"})[0],
+            '<a title="home" href="/">',
+        )
+        self.assertEqual(render_tags("p", {}), ("<p>", "</p>"))
+
+    def test_missing_children_error_in_nested_node(self):
+        child = ParentNode(tag="span", children=[LeafNode(value="x")])
+        child.children = []
+        with self.assertRaises(ValueError):
+            ParentNode(tag="div", children=[child]).to_html()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,257 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+import images
+from converters import markdown_to_html
+from file_utils import generate_pages_recursive
+from images import (
+    PNG_SIGNATURE,
+    ImageIndex,
+    _paeth,
+    _png_chunk,
+    _unfilter_rows,
+    read_image_size,
+    resize_png,
+)
+from render_cache import RenderCache
+
+
+def filter_row(kind, row, previous, bpp):
+    left = bytes(bpp) + row[:-bpp]
+    up_left = bytes(bpp) + previous[:-bpp]
+    if kind == 0:
+        predictors = bytes(len(row))
+    elif kind == 1:
+        predictors = left
+    elif kind == 2:
+        predictors = previous
+    elif kind == 3:
+        predictors = [(a + b) >> 1 for a, b in zip(left, previous)]
+    else:
+        predictors = [_paeth(*p) for p in zip(left, previous, up_left)]
+    return bytes([kind]) + bytes((a - b) & 0xFF for a, b in zip(row, predictors))
+
+
+def make_png(rows, color_type=2, filters=(0,), palette=None):
+    """Encode rows of 8-bit pixels, cycling through the given filter types."""
+    bpp = images.PNG_CHANNELS[color_type]
+    width = len(rows[0]) // bpp
+    raw = []
+    previous = bytes(len(rows[0]))
+    for number, row in enumerate(rows):
+        raw.append(filter_row(filters[number % len(filters)], row, previous, bpp))
+        previous = row
+    header = struct.pack(">IIBBBBB", width, len(rows), 8, color_type, 0, 0, 0)
+    chunks = [PNG_SIGNATURE, _png_chunk(b"IHDR", header)]
+    if palette is not None:
+        chunks.append(_png_chunk(b"PLTE", palette))
+    chunks.append(_png_chunk(b"IDAT", zlib.compress(b"".join(raw))))
+    chunks.append(_png_chunk(b"IEND", b""))
+    return b"".join(chunks)
+
+
+def decode_png(data):
+    header, idat = None, []
+    for kind, body in images._png_chunks(data):
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            idat.append(body)
+    width, height, _, color_type, _, _, _ = header
+    bpp = images.PNG_CHANNELS[color_type]
+    raw = zlib.decompress(b"".join(idat))
+    return width, height, _unfilter_rows(raw, width * bpp, height, bpp)
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size_of(self, data):
+        path = os.path.join(self.tmp.name, "image")
+        with open(path, "wb") as file:
+            file.write(data)
+        return read_image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of(make_png([bytes(9)] * 2)), (3, 2))
+
+    def test_gif(self):
+        gif = b"GIF89a\x40\x01\xc8\x00" + bytes(20)
+        self.assertEqual(self.size_of(gif), (320, 200))
+
+    def test_jpeg(self):
+        app0 = b"\xff\xe0\x00\x10JFIF\x00" + bytes(9)
+        sof = b"\xff\xc0\x00\x11\x08\x01\xe0\x02\x80\x03" + bytes(9)
+        data = b"\xff\xd8" + app0 + b"\xff\xff" + sof + b"\xff\xda\x00\x02"
+        self.assertEqual(self.size_of(data), (640, 480))
+        # The scan starts before any frame header
+        self.assertIsNone(self.size_of(b"\xff\xd8" + app0 + b"\xff\xda\x00\x02"))
+
+    def test_other_files(self):
+        self.assertIsNone(self.size_of(b"<svg></svg>"))
+        self.assertIsNone(self.size_of(b"\xff\xd8\xff"))
+
+
+class TestResizePNG(unittest.TestCase):
+    def test_every_filter_type_is_undone(self):
+        rows = [bytes((x * 37 + y * 91) % 256 for x in range(12)) for y in range(10)]
+        data = make_png(rows, filters=(0, 1, 2, 3, 4))
+        self.assertEqual(decode_png(data), (4, 10, rows))
+
+    def test_pixels_are_averaged(self):
+        rows = [bytes([0, 0, 0, 100, 0, 0, 10, 20, 30, 10, 20, 31])] * 2
+        width, height, out = decode_png(resize_png(make_png(rows, filters=(2,)), 2))
+        self.assertEqual((width, height), (2, 1))
+        self.assertEqual(out, [bytes([50, 0, 0, 10, 20, 31])])
+
+    def test_palette_images_keep_their_palette(self):
+        rows = [bytes([0, 1, 2, 3])] * 4
+        palette = bytes(range(12))
+        data = resize_png(make_png(rows, 3, palette=palette), 2)
+        self.assertIn(_png_chunk(b"PLTE", palette), data)
+        self.assertEqual(decode_png(data), (2, 2, [bytes([0, 2])] * 2))
+
+    def test_unsupported_images(self):
+        with self.assertRaises(ValueError):
+            resize_png(b"GIF89a", 10)
+        with self.assertRaises(ValueError):
+            resize_png(make_png([bytes(6)]), 2)
+
+
+class TestImageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        rows = [bytes(range(y, y + 30)) for y in range(6)]
+        self.write(os.path.join("images", "photo.png"), make_png(rows))
+        self.write("logo.gif", b"GIF89a\x10\x00\x08\x00" + bytes(20))
+        self.write("index.css", b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, data):
+        path = os.path.join(self.static, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def variant(self, width):
+        return os.path.join(self.public, "images", f"photo-{width}w.png")
+
+    def read_variant(self, width):
+        with open(self.variant(width), "rb") as file:
+            return decode_png(file.read())
+
+    def test_update_writes_and_reuses_variants(self):
+        index = ImageIndex(os.path.join(self.tmp.name, "images.json"))
+        written = index.update(self.static, self.public, [5, 20], self.cache)
+        self.assertEqual(written, [self.variant(5)])
+        self.assertEqual(
+            index.changed_images, [os.path.join("images", "photo.png"), "logo.gif"]
+        )
+        photo = index.images[os.path.join("images", "photo.png")]
+        self.assertEqual(
+            (photo["width"], photo["height"], photo["variants"]), (10, 6, [5])
+        )
+        self.assertEqual(self.read_variant(5)[:2], (5, 3))
+        index.save()
+
+        # Unchanged images are not read or resized again, even into a new
+        # output directory
+        index = ImageIndex.load(index.path)
+        os.remove(self.variant(5))
+        with mock.patch.object(
+            images, "resize_png", side_effect=AssertionError
+        ), mock.patch.object(images, "read_image_size", side_effect=AssertionError):
+            written = index.update(self.static, self.public, [5], self.cache)
+            self.assertEqual(written, [self.variant(5)])
+            written = index.update(self.static, self.public, [5], self.cache)
+            self.assertEqual(written, [])
+        self.assertEqual(index.changed_images, [])
+
+        index.update(self.static, self.public, [8], self.cache)
+        self.assertFalse(os.path.exists(self.variant(5)))
+        self.assertTrue(os.path.exists(self.variant(8)))
+        self.assertEqual(index.changed_images, [os.path.join("images", "photo.png")])
+
+        os.remove(os.path.join(self.static, "images", "photo.png"))
+        index.update(self.static, self.public, [8], self.cache)
+        self.assertFalse(os.path.exists(self.variant(8)))
+        self.assertEqual(list(index.images), ["logo.gif"])
+
+    def test_annotate(self):
+        index = ImageIndex()
+        index.update(self.static, self.public, [5])
+        body = markdown_to_html(
+            "# Title\n\n![logo](logo.gif)\n\n> ![photo](/images/photo.png) and"
+            " ![missing](/missing.png)"
+        )
+        source = os.path.join("blog", "a.md")
+        blocks = [index.annotate(block, source) for block in body.children]
+        self.assertIs(blocks[0], body.children[0])
+        self.assertEqual(
+            blocks[1].to_html(),
+            '<p><img src="logo.gif" alt="logo"></img></p>',
+        )
+        self.assertEqual(
+            index.annotate(body.children[1], "index.md").to_html(),
+            '<p><img src="logo.gif" alt="logo" width="16" height="8"></img></p>',
+        )
+        self.assertEqual(
+            blocks[2].to_html(),
+            '<blockquote><img src="/images/photo.png" alt="photo" width="10"'
+            ' height="6" srcset="/images/photo-5w.png 5w, /images/photo.png 10w"'
+            ' sizes="(max-width: 10px) 100vw, 10px"></img> and <img'
+            ' src="/missing.png" alt="missing"></img></blockquote>',
+        )
+        # The parsed nodes, which the block memo may share, are left alone
+        self.assertNotIn("width", body.children[2].children[0].props)
+
+    def test_fingerprint_follows_attributes(self):
+        index = ImageIndex()
+        index.update(self.static, self.public)
+        fingerprint = index.fingerprint()
+        index.update(self.static, self.public)
+        self.assertEqual(index.fingerprint(), fingerprint)
+        index.update(self.static, self.public, [5])
+        self.assertNotEqual(index.fingerprint(), fingerprint)
+
+    def test_cached_pages_resolve_images_from_their_own_directory(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as file:
+            file.write("{{ Content }}")
+        for directory in ("a", "b"):
+            os.makedirs(os.path.join(content, directory))
+            with open(os.path.join(content, directory, "x.md"), "w") as file:
+                file.write("# X\n\n![i](logo.gif)")
+        self.write(os.path.join("a", "logo.gif"), b"GIF89a\x10\x00\x08\x00")
+        index = ImageIndex()
+        index.update(self.static, self.public)
+        generate_pages_recursive(
+            content,
+            template,
+            self.public,
+            render_cache=RenderCache(os.path.join(self.tmp.name, "render")),
+            images=index,
+        )
+        pages = []
+        for directory in ("a", "b"):
+            with open(os.path.join(self.public, directory, "x.html")) as file:
+                pages.append(file.read())
+        self.assertIn('width="16" height="8"', pages[0])
+        self.assertNotIn("width", pages[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
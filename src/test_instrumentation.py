@@ -0,0 +1,76 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from file_utils import generate_pages_recursive
+from instrumentation import NULL_PROFILER, ConsoleSink, JsonSink, Profiler
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage_totals_and_pages(self):
+        profiler = Profiler()
+        with profiler.stage("parse", "a.md"):
+            pass
+        with profiler.stage("parse", "b.md"):
+            pass
+        with profiler.stage("scan"):
+            pass
+        self.assertEqual(profiler.stages["parse"][1], 2)
+        self.assertEqual(set(profiler.pages), {"a.md", "b.md"})
+        self.assertEqual(len(profiler.slowest_pages(1)), 1)
+
+    def test_merge(self):
+        worker = Profiler()
+        with worker.stage("write", "a.md"):
+            pass
+        worker.count("bytes_written", 10)
+        profiler = Profiler()
+        profiler.count("bytes_written", 5)
+        profiler.merge(worker.snapshot())
+        profiler.merge(worker.snapshot())
+        self.assertEqual(profiler.counters["bytes_written"], 25)
+        self.assertEqual(profiler.stages["write"][1], 2)
+
+    def test_null_profiler_records_nothing(self):
+        with NULL_PROFILER.stage("parse", "a.md") as timer:
+            self.assertIsNotNone(timer)
+        NULL_PROFILER.count("pages")
+        self.assertFalse(NULL_PROFILER.enabled)
+
+
+class TestBuildProfile(unittest.TestCase):
+    def test_build_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as file:
+                file.write(TEMPLATE)
+            for name in ["a", "b"]:
+                with open(os.path.join(content, f"{name}.md"), "w") as file:
+                    file.write(f"# {name}\n\nSome *text*")
+            json_path = os.path.join(tmp, "profile.json")
+            profiler = Profiler([ConsoleSink(), JsonSink(json_path)])
+            generate_pages_recursive(
+                content, template, os.path.join(tmp, "public"), profiler=profiler
+            )
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                profiler.report()
+            with open(json_path) as file:
+                data = json.load(file)
+
+        self.assertIn("Slowest pages:", out.getvalue())
+        self.assertEqual(data["counters"]["pages"], 2)
+        self.assertGreater(data["counters"]["bytes_written"], 0)
+        for stage in ["scan", "read", "markdown_to_html", "write"]:
+            self.assertIn(stage, data["stages"])
+        self.assertEqual(len(data["pages"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
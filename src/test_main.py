@@ -0,0 +1,73 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import main
+
+
+class TestMain(unittest.TestCase):
+    def run_main(self, argv):
+        with mock.patch("main.build", return_value=0) as build:
+            self.assertEqual(main.main(argv), 0)
+        build.assert_called_once()
+        return build.call_args.args[0]
+
+    def test_builds_without_a_command(self):
+        options = self.run_main([])
+        self.assertEqual(options.command, "build")
+        self.assertFalse(options.profile)
+        options = self.run_main(["--profile"])
+        self.assertEqual(options.command, "build")
+        self.assertTrue(options.profile)
+
+    def test_asset_options(self):
+        options = self.run_main([])
+        self.assertEqual((options.asset_compare, options.asset_link), ("mtime", None))
+        options = self.run_main(["--asset-compare", "hash", "--asset-link", "reflink"])
+        self.assertEqual(
+            (options.asset_compare, options.asset_link), ("hash", "reflink")
+        )
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main.main(["--asset-link", "symlink"])
+
+    def test_help_is_not_rewritten(self):
+        for flag in ["-h", "--help"]:
+            with mock.patch("main.build") as build:
+                with contextlib.redirect_stdout(io.StringIO()) as out:
+                    with self.assertRaises(SystemExit):
+                        main.main([flag])
+            build.assert_not_called()
+            self.assertIn("command", out.getvalue())
+            self.assertNotIn("--workers", out.getvalue())
+
+    def test_clean(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "public")
+            cache_dir = os.path.join(tmp, ".cache")
+            argv = ["clean", "--output", output, "--cache-dir", cache_dir]
+            for keep_cache in [True, False]:
+                os.makedirs(output, exist_ok=True)
+                os.makedirs(cache_dir, exist_ok=True)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    main.main(argv + ["--keep-cache"] if keep_cache else argv)
+                self.assertFalse(os.path.exists(output))
+                self.assertEqual(os.path.isdir(cache_dir), keep_cache)
+
+    def test_image_widths(self):
+        self.assertEqual(main.parse_widths("480, 960"), [480, 960])
+        parser = main.build_parser()
+        self.assertEqual(
+            parser.parse_args(["build", "--image-widths", "480"]).image_widths, [480]
+        )
+        for text in ["0", "abc", "480,-1"]:
+            with self.subTest(text=text):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    with self.assertRaises(SystemExit):
+                        parser.parse_args(["build", "--image-widths", text])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from file_utils import generate_pages_recursive
+from highlight import register_highlighter, unregister_highlighter
+from manifest import BuildManifest, GENERATOR_VERSION
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+def shout(code):
+    return code.upper()
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.manifest_path = os.path.join(root, ".cache", "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nHello")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as file:
+            file.write(text)
+
+    def build(self):
+        manifest = BuildManifest.load(self.manifest_path)
+        generated = generate_pages_recursive(
+            self.content, self.template, self.public, manifest=manifest
+        )
+        manifest.save()
+        return sorted(os.path.relpath(path, self.public) for path in generated)
+
+    def test_first_build_generates_everything(self):
+        self.assertEqual(self.build(), ["blog/post.html", "index.html"])
+        manifest = BuildManifest.load(self.manifest_path)
+        self.assertEqual(manifest.generator_version, GENERATOR_VERSION)
+        self.assertEqual(set(manifest.pages), {"index.md", "blog/post.md"})
+
+    def test_unchanged_build_generates_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), [])
+
+    def test_only_changed_page_is_rebuilt(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nTypo fixed")
+        self.assertEqual(self.build(), ["index.html"])
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertIn("Typo fixed", file.read())
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(), ["blog/post.html", "index.html"])
+
+    def test_highlighter_change_rebuilds_everything(self):
+        self.build()
+        register_highlighter("shout", shout)
+        try:
+            self.assertEqual(self.build(), ["blog/post.html", "index.html"])
+            self.assertEqual(self.build(), [])
+        finally:
+            unregister_highlighter("shout")
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(os.path.join(self.public, "blog", "post.html"))
+        self.assertEqual(self.build(), ["blog/post.html"])
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.assertEqual(self.build(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_corrupt_manifest_is_ignored(self):
+        os.makedirs(os.path.dirname(self.manifest_path))
+        self.write(self.manifest_path, "{not json")
+        self.assertEqual(self.build(), ["blog/post.html", "index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
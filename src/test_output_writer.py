@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from output_writer import (
+    OutputWriter,
+    replace_if_changed,
+    temp_path,
+    write_if_changed,
+)
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def test_writes_files_and_directories(self):
+        with OutputWriter(threads=2, max_pending=2) as writer:
+            for i in range(10):
+                writer.write(self.path(f"dir{i % 3}", f"page{i}.html"), b"%d" % i)
+        self.assertEqual(len(writer.written), 10)
+        with open(self.path("dir1", "page4.html"), "rb") as file:
+            self.assertEqual(file.read(), b"4")
+        self.assertEqual(len(os.listdir(self.path("dir0"))), 4)
+
+    def test_identical_bytes_are_not_rewritten(self):
+        path = self.path("index.html")
+        self.assertTrue(write_if_changed(path, b"<p>hi</p>"))
+        os.utime(path, ns=(0, 0))
+        with OutputWriter() as writer:
+            writer.write(path, b"<p>hi</p>")
+        self.assertEqual(writer.unchanged, [path])
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(write_if_changed(path, b"<p>ho</p>"))
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+
+    def test_replace_if_changed(self):
+        path = self.path("index.html")
+        write_if_changed(path, b"<p>hi</p>")
+        os.utime(path, ns=(0, 0))
+        for text, changed in [(b"<p>hi</p>", False), (b"<p>ho</p>", True)]:
+            tmp_path = temp_path(path)
+            with open(tmp_path, "wb") as file:
+                file.write(text)
+            self.assertEqual(replace_if_changed(tmp_path, path), changed)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), b"<p>ho</p>")
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+
+    def test_errors_are_collected(self):
+        write_if_changed(self.path("file"), b"")
+        bad_path = self.path("file", "page.html")
+        with OutputWriter(threads=1) as writer:
+            writer.write(bad_path, b"x")
+            writer.write(self.path("good.html"), b"x")
+        self.assertEqual(list(writer.errors), [bad_path])
+        self.assertEqual(writer.written, [self.path("good.html")])
+
+    def test_closed_writer_rejects_writes(self):
+        writer = OutputWriter(threads=1)
+        writer.close()
+        with self.assertRaises(ValueError):
+            writer.write(self.path("late.html"), b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
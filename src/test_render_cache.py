@@ -0,0 +1,168 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import feeds
+import file_utils
+from depgraph import DependencyGraph
+from file_utils import generate_pages_recursive
+from instrumentation import Profiler
+from render_cache import RenderCache
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(os.path.join(self.tmp.name, "cache"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        key = self.cache.key("# Title")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", "<div><h1>Title</h1></div>")
+        self.assertEqual(
+            self.cache.get(key), ("Title", "<div><h1>Title</h1></div>", [], {})
+        )
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.cache.put(key, "Title", "<div></div>", [(1, "Title", "title")])
+        self.assertEqual(self.cache.get(key)[2], [[1, "Title", "title"]])
+        page_info = {"title": "Title", "links": ["/a"], "images": ["/b.png"]}
+        self.cache.put(key, "Title", "<div></div>", page_info=page_info)
+        self.assertEqual(self.cache.get(key)[3], page_info)
+
+    def test_key_depends_on_converter_version(self):
+        key = self.cache.key("# Title")
+        self.assertEqual(key, self.cache.key("# Title"))
+        self.assertNotEqual(key, self.cache.key("# Other"))
+        self.assertNotEqual(key, self.cache.key("# Title", "image sizes"))
+        with mock.patch("render_cache.CONVERTER_VERSION", -1):
+            self.assertNotEqual(key, self.cache.key("# Title"))
+
+    def test_size_counts_every_entry_once(self):
+        key = self.cache.key("# Title")
+        self.cache.put(key, "Title", "x" * 50)
+        self.cache.put(self.cache.key("# Other"), "Other", "y" * 70)
+        self.cache.put(key, "Title", "z" * 10)
+        on_disk = sum(
+            os.path.getsize(os.path.join(self.cache.directory, name))
+            for name in os.listdir(self.cache.directory)
+        )
+        self.assertEqual(self.cache.size(), on_disk)
+        # A fresh instance counts the directory lazily on its first put
+        cache = RenderCache(self.cache.directory)
+        cache.put(key, "Title", "w" * 30)
+        self.assertEqual(cache.size(), RenderCache(self.cache.directory).size())
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = RenderCache(self.cache.directory, max_bytes=250)
+        keys = [cache.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, "t", "x" * 60)
+            # Give each entry a distinct, increasing mtime
+            path = cache._path(key)
+            os.utime(path, ns=(0, time.time_ns() - (10 - i) * 10**9))
+        self.assertIsNotNone(cache.get(keys[0]))
+        cache.put(cache.key("3"), "t", "x" * 60)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertLessEqual(cache.size(), 250)
+
+
+class TestCachedBuild(unittest.TestCase):
+    def test_template_change_skips_parsing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            with open(os.path.join(content, "index.md"), "w") as file:
+                file.write("# Home\n\nSome **bold** text")
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as file:
+                file.write(TEMPLATE)
+            public = os.path.join(tmp, "public")
+            cache = RenderCache(os.path.join(tmp, "cache"))
+
+            generate_pages_recursive(content, template, public)
+            with open(os.path.join(public, "index.html")) as file:
+                uncached = file.read()
+            generate_pages_recursive(content, template, public, render_cache=cache)
+
+            profiler = Profiler()
+            with mock.patch.object(
+                file_utils, "markdown_to_html", side_effect=AssertionError
+            ):
+                generate_pages_recursive(
+                    content, template, public, render_cache=cache, profiler=profiler
+                )
+            with open(os.path.join(public, "index.html")) as file:
+                self.assertEqual(file.read(), uncached)
+            self.assertEqual(profiler.counters["render_cache_hits"], 1)
+            self.assertNotIn("markdown_to_html", profiler.stages)
+
+
+    def test_entries_do_not_depend_on_the_template(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            with open(os.path.join(content, "index.md"), "w") as file:
+                file.write("# Home\n\nSome text")
+            template = os.path.join(tmp, "template.html")
+            public = os.path.join(tmp, "public")
+            cache = RenderCache(os.path.join(tmp, "cache"))
+            # A misspelled slot, then the slot twice, each leave the cached
+            # body as it was parsed
+            for source in ["{{ content }}", "{{ Content }}{{ Content }}", TEMPLATE]:
+                with open(template, "w") as file:
+                    file.write(source)
+                generate_pages_recursive(content, template, public, render_cache=cache)
+            with open(os.path.join(public, "index.html")) as file:
+                self.assertEqual(
+                    file.read(),
+                    '<title>Home</title><body><div><h1 id="home">Home</h1>'
+                    "<p>Some text</p></div></body>",
+                )
+            self.assertEqual(cache.hits, 2)
+
+    def test_hit_for_new_page_is_described_without_parsing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            with open(os.path.join(content, "index.md"), "w") as file:
+                file.write("# Home\n\n[About](/about) and ![logo](/logo.png)")
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as file:
+                file.write(TEMPLATE)
+            public = os.path.join(tmp, "public")
+            cache = RenderCache(os.path.join(tmp, "cache"))
+            generate_pages_recursive(
+                content,
+                template,
+                public,
+                render_cache=cache,
+                dependency_graph=DependencyGraph(),
+            )
+
+            # A fresh graph has never seen the page, as after a clean
+            graph = DependencyGraph()
+            with mock.patch.object(
+                file_utils, "markdown_to_html", side_effect=AssertionError
+            ), mock.patch.object(
+                feeds, "markdown_to_html", side_effect=AssertionError
+            ):
+                generate_pages_recursive(
+                    content,
+                    template,
+                    public,
+                    render_cache=cache,
+                    dependency_graph=graph,
+                )
+            self.assertEqual(graph.pages["index.md"]["links"], ["/about"])
+            self.assertEqual(graph.pages["index.md"]["images"], ["/logo.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
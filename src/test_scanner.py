@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from scanner import scan_tree
+
+
+class TestScanTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        for path in [
+            "index.md",
+            "b.md",
+            "a-b.txt",
+            os.path.join("a", "z.md"),
+            os.path.join("a", "c", "x.md"),
+            os.path.join("a", "c", "y.png"),
+            os.path.join("d", "e", "f", "g.md"),
+        ]:
+            self.write(path, path)
+        os.makedirs(os.path.join(self.root, "empty"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def test_depth_first_sorted_order(self):
+        entries = scan_tree(self.root)
+        self.assertEqual(
+            [entry.rel_path for entry in entries],
+            [
+                os.path.join("a", "c", "x.md"),
+                os.path.join("a", "c", "y.png"),
+                os.path.join("a", "z.md"),
+                "a-b.txt",
+                "b.md",
+                os.path.join("d", "e", "f", "g.md"),
+                "index.md",
+            ],
+        )
+        for entry in entries:
+            self.assertEqual(entry.path, os.path.join(self.root, entry.rel_path))
+            self.assertEqual(entry.stat.st_size, len(entry.rel_path))
+
+    def test_suffix_and_directories(self):
+        self.assertEqual(
+            [entry.rel_path for entry in scan_tree(self.root, suffix=".md")],
+            [
+                os.path.join("a", "c", "x.md"),
+                os.path.join("a", "z.md"),
+                "b.md",
+                os.path.join("d", "e", "f", "g.md"),
+                "index.md",
+            ],
+        )
+        entries = scan_tree(self.root, suffix=".png", dirs=True)
+        self.assertEqual(
+            [(entry.rel_path, entry.is_dir) for entry in entries],
+            [
+                ("a", True),
+                (os.path.join("a", "c"), True),
+                (os.path.join("a", "c", "y.png"), False),
+                ("d", True),
+                (os.path.join("d", "e"), True),
+                (os.path.join("d", "e", "f"), True),
+                ("empty", True),
+            ],
+        )
+
+    def test_threads_do_not_change_the_result(self):
+        for i in range(40):
+            self.write(os.path.join(f"t{i % 7}", f"s{i % 3}", f"{i}.md"), "x")
+        serial = [entry.rel_path for entry in scan_tree(self.root, threads=1)]
+        for threads in (2, 3, 16):
+            self.assertEqual(
+                [entry.rel_path for entry in scan_tree(self.root, threads=threads)],
+                serial,
+            )
+        walked = {
+            os.path.relpath(os.path.join(dirpath, name), self.root)
+            for dirpath, _, files in os.walk(self.root)
+            for name in files
+        }
+        self.assertEqual(set(serial), walked)
+
+    def test_missing_root(self):
+        self.assertEqual(scan_tree(os.path.join(self.root, "missing")), [])
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "needs symlinks")
+    def test_symlinked_directories_are_not_followed(self):
+        os.symlink(os.path.join(self.root, "a"), os.path.join(self.root, "link"))
+        os.symlink(
+            os.path.join(self.root, "missing.md"), os.path.join(self.root, "dead.md")
+        )
+        rel_paths = [entry.rel_path for entry in scan_tree(self.root)]
+        self.assertNotIn("link", {path.split(os.sep)[0] for path in rel_paths})
+        self.assertNotIn("dead.md", rel_paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
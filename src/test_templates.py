@@ -0,0 +1,72 @@
+import io
+import os
+import tempfile
+import unittest
+from htmlnode import LeafNode, ParentNode
+from templates import CompiledTemplate, clear_template_cache, load_template
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_segments(self):
+        template = CompiledTemplate("<title>{{ Title }}</title>{{Content}}!")
+        self.assertEqual(template.literals, ["<title>", "</title>", "!"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render(self):
+        template = CompiledTemplate("<h1>{{ Title }}</h1><p>{{ date }}</p>")
+        self.assertEqual(
+            template.render({"Title": "Hello", "date": "2024-10-18"}),
+            "<h1>Hello</h1><p>2024-10-18</p>",
+        )
+
+    def test_missing_slot_renders_empty(self):
+        template = CompiledTemplate("<nav>{{ nav }}</nav>")
+        self.assertEqual(template.render({}), "<nav></nav>")
+
+    def test_repeated_slot(self):
+        template = CompiledTemplate("{{ Title }} - {{ Title }}")
+        self.assertEqual(template.render({"Title": "A"}), "A - A")
+
+    def test_no_slots(self):
+        template = CompiledTemplate("plain")
+        self.assertEqual(template.render({"Title": "unused"}), "plain")
+
+    def test_render_to_streams_html_nodes(self):
+        template = CompiledTemplate("<title>{{ Title }}</title>{{ Content }}")
+        content = ParentNode("div", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        values = {"Title": "T", "Content": content}
+        out = io.StringIO()
+        template.render_to(out, values)
+        expected = "<title>T</title><div><b>bold</b> text</div>"
+        self.assertEqual(out.getvalue(), expected)
+        self.assertEqual(template.render(values), expected)
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def setUp(self):
+        clear_template_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "template.html")
+        self.write("<title>{{ Title }}</title>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        clear_template_cache()
+
+    def write(self, text, mtime_ns=None):
+        with open(self.path, "w") as file:
+            file.write(text)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_cached_until_modified(self):
+        first = load_template(self.path)
+        self.assertIs(load_template(self.path), first)
+        self.write("<h1>{{ Title }}</h1>", mtime_ns=os.stat(self.path).st_mtime_ns + 1)
+        second = load_template(self.path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.render({"Title": "x"}), "<h1>x</h1>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -40,6 +40,12 @@ class TestTextNode(unittest.TestCase):
         # Test inequality when one URL is None
         self.assertNotEqual(node_with_none_url, node_with_url)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "not allowed"
+
     def test_comparison_with_different_object(self):
         node = TextNode("This is a text node", TextType.BOLD)
 
@@ -16,6 +16,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: Optional[str] = None):
         self.text: str = text
         if TextType.is_valid(text_type):